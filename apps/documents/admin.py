@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from apps.documents.models import DocumentEntity
+
+
+@admin.register(DocumentEntity)
+class DocumentEntityAdmin(admin.ModelAdmin):
+    list_display = ('document_id', 'document_type', 'field', 'value', 'value_number', 'value_date')
+    list_filter = ('document_type', 'field')
+    search_fields = ('document_id', 'value_text')
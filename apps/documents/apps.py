@@ -1,6 +1,7 @@
 from django.apps import AppConfig
 import logging
 from ml_pipeline.entity_extractor.extractor import get_entity_extractor
+from ml_pipeline.dataset.embeddings import get_embedding_function
 logger = logging.getLogger(__name__)
 
 
@@ -9,10 +10,21 @@ class DocumentsConfig(AppConfig):
     name = 'apps.documents'
 
     def ready(self):
-        """Initialize the entity extractor when Django starts up."""
+        """Initialize the entity extractor and the embedding model when Django starts up."""
         try:
             logger.info("Initializing Entity Extractor...")
             get_entity_extractor()
             logger.info("Entity Extractor initialized successfully.")
         except Exception as e:
             logger.error("Failed to initialize Entity Extractor", exc_info=True)
+        try:
+            from apps.documents.upload import sweep_orphaned_uploads
+            sweep_orphaned_uploads()
+        except Exception as e:
+            logger.error("Failed to sweep orphaned uploads", exc_info=True)
+        try:
+            logger.info("Initializing embedding model...")
+            get_embedding_function()
+            logger.info("Embedding model initialized successfully.")
+        except Exception as e:
+            logger.error("Failed to initialize embedding model", exc_info=True)
@@ -0,0 +1,185 @@
+"""Structured entity index: one DocumentEntity row per (document, field, value)."""
+
+import datetime
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+
+from apps.documents.models import DocumentEntity
+
+# (document id, document type, entities) as stored in the ChromaDB metadata.
+EntityRecord = Tuple[str, str, Dict[str, Any]]
+
+_NUMBER = re.compile(r"^[-+]?[$€£]?\s*[-+]?(\d+(\.\d*)?|\.\d+)%?$")
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%d %B %Y", "%d %b %Y")
+
+FILTER_OPERATORS = ("eq", "contains", "gt", "gte", "lt", "lte")
+
+
+def normalize_text(value: str) -> str:
+    return " ".join(value.lower().split())[:255]
+
+
+def normalize_number(value: str) -> Optional[float]:
+    """Parse amounts like "$1,250.00" or "15%"; returns None for anything that is not purely numeric."""
+    candidate = value.strip().replace(",", "")
+    if not _NUMBER.match(candidate):
+        return None
+    return float(re.sub(r"[$€£%\s]", "", candidate))
+
+
+def normalize_date(value: str) -> Optional[datetime.date]:
+    candidate = " ".join(value.strip().split())
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(candidate, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _flatten(field: str, value: Any) -> Iterator[Tuple[str, Any]]:
+    """Yield (field, scalar) pairs: one per list element, and one per key path ("address.city") of a dict."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(f"{field}.{key}", item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(field, item)
+    else:
+        yield field, value
+
+
+def entity_rows(document_id: str, document_type: str, entities: Dict[str, Any], model=DocumentEntity) -> List[Any]:
+    """
+    Build unsaved entity rows for one document; non-string scalars are stored as JSON.
+
+    A list gives one row per element under the same field, a dict one row per key path, so
+    each value can be filtered on. Keys that normalize to the same field and value (e.g.
+    "Total" and "total") give one row.
+    """
+    rows = []
+    seen = set()
+    pairs = (pair for field, raw_value in (entities or {}).items() for pair in _flatten(str(field), raw_value))
+    for field, raw_value in pairs:
+        if raw_value is None or raw_value == "":
+            continue
+        value = raw_value if isinstance(raw_value, str) else json.dumps(raw_value)
+        field = field.lower()[:64]
+        value_text = normalize_text(value)
+        if (field, value_text) in seen:
+            continue
+        seen.add((field, value_text))
+        rows.append(model(
+            document_id=document_id,
+            document_type=document_type,
+            field=field,
+            value=value,
+            value_text=value_text,
+            value_number=normalize_number(value),
+            value_date=normalize_date(value),
+        ))
+    return rows
+
+
+SNAPSHOT_COLUMNS = ("document_id", "document_type", "field", "value", "value_text", "value_number", "value_date")
+
+
+class EntityIndex:
+    """Writes entity rows after the vector store upsert succeeds."""
+
+    def write(self, records: Iterable[EntityRecord], upsert: Optional[Callable[[], None]] = None) -> None:
+        """
+        Run `upsert`, then replace the entity rows of the given documents in one transaction.
+
+        A failed upsert leaves the entity index untouched. The upsert (embedding and the
+        ChromaDB write) runs outside the transaction, so it does not hold the SQLite write lock.
+        """
+        records = list(records)
+        rows = [row for document_id, document_type, entities in records
+                for row in entity_rows(document_id, document_type, entities)]
+        if upsert is not None:
+            upsert()
+        with transaction.atomic():
+            DocumentEntity.objects.filter(document_id__in=[record[0] for record in records]).delete()
+            DocumentEntity.objects.bulk_create(rows)
+
+    def delete(self, document_ids: Iterable[str]) -> None:
+        DocumentEntity.objects.filter(document_id__in=list(document_ids)).delete()
+
+    def export_rows(self) -> Iterable[Dict[str, Any]]:
+        """Every entity row as a dict of its columns (for index snapshots)."""
+        return DocumentEntity.objects.order_by("id").values(*SNAPSHOT_COLUMNS).iterator()
+
+    def replace_all(self, rows: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """Replace the whole entity index with `rows` (as from `export_rows`) in one transaction."""
+        count = 0
+        with transaction.atomic():
+            DocumentEntity.objects.all().delete()
+            batch = []
+            for row in rows:
+                batch.append(DocumentEntity(**{column: row.get(column) for column in SNAPSHOT_COLUMNS}))
+                if len(batch) >= batch_size:
+                    DocumentEntity.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            DocumentEntity.objects.bulk_create(batch)
+            count += len(batch)
+        return count
+
+
+entity_index = EntityIndex()
+
+
+def parse_filter(expression: str) -> Tuple[str, str, str]:
+    """Parse a `field:operator:value` filter expression."""
+    parts = expression.split(":", 2)
+    if len(parts) != 3 or parts[1] not in FILTER_OPERATORS:
+        raise ValueError(f"Invalid filter '{expression}', expected field:operator:value with operator in {', '.join(FILTER_OPERATORS)}")
+    return parts[0].lower(), parts[1], parts[2]
+
+
+def _condition(operator: str, value: str) -> Dict[str, Any]:
+    if operator == "eq":
+        return {"value_text": normalize_text(value)}
+    if operator == "contains":
+        return {"value_text__contains": normalize_text(value)}
+    number = normalize_number(value)
+    if number is not None:
+        return {f"value_number__{operator}": number}
+    date = normalize_date(value)
+    if date is not None:
+        return {f"value_date__{operator}": date}
+    raise ValueError(f"Operator '{operator}' needs a numeric or date value, got '{value}'")
+
+
+def query_documents(
+    filters: Iterable[Tuple[str, str, str]],
+    document_type: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Return documents matching every (field, operator, value) filter, with their entities.
+    Each filter becomes an indexed subquery on DocumentEntity.
+    """
+    matches = DocumentEntity.objects.all()
+    if document_type:
+        matches = matches.filter(document_type=document_type)
+    for field, operator, value in filters:
+        matching_ids = DocumentEntity.objects.filter(field=field, **_condition(operator, value)).values("document_id")
+        matches = matches.filter(document_id__in=matching_ids)
+
+    document_ids = list(
+        matches.order_by("document_id").values_list("document_id", flat=True).distinct()[offset:offset + limit]
+    )
+    documents: Dict[str, Dict[str, Any]] = {
+        document_id: {"id": document_id, "document_type": None, "entities": {}} for document_id in document_ids
+    }
+    for row in DocumentEntity.objects.filter(document_id__in=document_ids):
+        document = documents[row.document_id]
+        document["document_type"] = row.document_type
+        document["entities"][row.field] = row.value
+    return list(documents.values())
@@ -1,7 +1,26 @@
+from django.http import Http404, HttpResponse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from services.metrics import multiprocess_dir, registry
+
 class HealthCheckView(APIView):
     def get(self, request):
-        return Response({"status": "healthy"}, status=status.HTTP_200_OK) 
\ No newline at end of file
+        return Response({"status": "healthy"}, status=status.HTTP_200_OK)
+
+
+class MetricsView(View):
+    """
+    Prometheus text exposition of the metrics of every gunicorn worker (404 when METRICS_ENABLED=0).
+
+    Without METRICS_MULTIPROC_DIR (e.g. runserver) only this process's metrics are served.
+    """
+
+    def get(self, request):
+        if not registry.enabled:
+            raise Http404("Metrics are disabled")
+        directory = multiprocess_dir()
+        text = registry.render_all(directory) if directory else registry.render()
+        return HttpResponse(text, content_type="text/plain; version=0.0.4; charset=utf-8")
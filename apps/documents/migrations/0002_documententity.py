@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentEntity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_id', models.CharField(max_length=255)),
+                ('document_type', models.CharField(max_length=64)),
+                ('field', models.CharField(max_length=64)),
+                ('value', models.TextField()),
+                ('value_text', models.CharField(max_length=255)),
+                ('value_number', models.FloatField(blank=True, null=True)),
+                ('value_date', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['document_type', 'field', 'value_text'], name='entity_type_field_text_idx'),
+                    models.Index(fields=['field', 'value_text'], name='entity_field_text_idx'),
+                    models.Index(fields=['field', 'value_number'], name='entity_field_number_idx'),
+                    models.Index(fields=['field', 'value_date'], name='entity_field_date_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('document_id', 'field'), name='unique_document_entity_field'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,121 @@
+import datetime
+import json
+import os
+import re
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+# Frozen copy of the row building in apps.documents.entities at the time of this migration,
+# so later changes to the app code do not change what the migration does.
+_NUMBER = re.compile(r"^[-+]?[$€£]?\s*[-+]?(\d+(\.\d*)?|\.\d+)%?$")
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%d %B %Y", "%d %b %Y")
+
+
+def _normalize_number(value):
+    candidate = value.strip().replace(",", "")
+    if not _NUMBER.match(candidate):
+        return None
+    return float(re.sub(r"[$€£%\s]", "", candidate))
+
+
+def _normalize_date(value):
+    candidate = " ".join(value.strip().split())
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(candidate, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _flatten(field, value):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(f"{field}.{key}", item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(field, item)
+    else:
+        yield field, value
+
+
+def _entity_rows(DocumentEntity, document_id, document_type, entities):
+    rows = []
+    seen = set()
+    for key, raw in entities.items():
+        for field, raw_value in _flatten(str(key), raw):
+            if raw_value is None or raw_value == "":
+                continue
+            value = raw_value if isinstance(raw_value, str) else json.dumps(raw_value)
+            field = field.lower()[:64]
+            value_text = " ".join(value.lower().split())[:255]
+            if (field, value_text) in seen:
+                continue
+            seen.add((field, value_text))
+            rows.append(DocumentEntity(
+                document_id=document_id,
+                document_type=document_type,
+                field=field,
+                value=value,
+                value_text=value_text,
+                value_number=_normalize_number(value),
+                value_date=_normalize_date(value),
+            ))
+    return rows
+
+
+def _is_test_database(connection):
+    """True when migrating a database created by the test runner, which must not read the real store."""
+    name = str(connection.settings_dict['NAME'])
+    test_name = connection.settings_dict.get('TEST', {}).get('NAME')
+    return name == ':memory:' or 'mode=memory' in name or name.startswith('test_') or (test_name and name == str(test_name))
+
+
+def backfill_entities(apps, schema_editor):
+    """Create entity rows from the JSON `entities` metadata of documents already in ChromaDB."""
+    if _is_test_database(schema_editor.connection):
+        return
+    db_path = os.path.join(settings.BASE_DIR, 'db')
+    # Opening a PersistentClient on a directory without a store would create one
+    if not os.path.isfile(os.path.join(db_path, 'chroma.sqlite3')):
+        return
+    try:
+        import chromadb
+    except ImportError:
+        return
+    client = chromadb.PersistentClient(path=db_path)
+    try:
+        collection = client.get_collection(name='documents')
+    except Exception:
+        return
+
+    DocumentEntity = apps.get_model('documents', 'DocumentEntity')
+    offset = 0
+    while True:
+        page = collection.get(include=['metadatas'], limit=BATCH_SIZE, offset=offset)
+        if not page['ids']:
+            break
+        rows = []
+        for document_id, metadata in zip(page['ids'], page['metadatas']):
+            try:
+                entities = json.loads((metadata or {}).get('entities') or '{}')
+            except ValueError:
+                continue
+            if isinstance(entities, dict):
+                rows.extend(_entity_rows(DocumentEntity, document_id, metadata.get('class', ''), entities))
+        DocumentEntity.objects.bulk_create(rows, ignore_conflicts=True)
+        offset += len(page['ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_documententity'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_entities, migrations.RunPython.noop),
+    ]
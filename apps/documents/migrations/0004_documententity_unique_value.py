@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_backfill_documententity'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='documententity',
+            name='unique_document_entity_field',
+        ),
+        migrations.AddConstraint(
+            model_name='documententity',
+            constraint=models.UniqueConstraint(fields=('document_id', 'field', 'value_text'), name='unique_document_entity_value'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class DocumentEntity(models.Model):
+    """
+    One extracted entity of a processed document: a (document, field, value) row.
+
+    `document_id` is the id of the document in the ChromaDB collection. Values are kept
+    as extracted, plus normalized text, numeric and date columns so field queries such as
+    "total_amount > 1000" run on indexes instead of parsing JSON metadata.
+    """
+    document_id = models.CharField(max_length=255)
+    document_type = models.CharField(max_length=64)
+    field = models.CharField(max_length=64)
+    value = models.TextField()
+    value_text = models.CharField(max_length=255)
+    value_number = models.FloatField(null=True, blank=True)
+    value_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['document_id', 'field', 'value_text'], name='unique_document_entity_value'),
+        ]
+        indexes = [
+            models.Index(fields=['document_type', 'field', 'value_text'], name='entity_type_field_text_idx'),
+            models.Index(fields=['field', 'value_text'], name='entity_field_text_idx'),
+            models.Index(fields=['field', 'value_number'], name='entity_field_number_idx'),
+            models.Index(fields=['field', 'value_date'], name='entity_field_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id}: {self.field}={self.value}"
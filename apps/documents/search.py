@@ -0,0 +1,179 @@
+"""Semantic search over the ChromaDB documents collection."""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from ml_pipeline.dataset.embeddings import get_embedding_function
+from ml_pipeline.dataset.utils import clean_text
+from services.metrics import registry, stage_timer
+
+# Fields that are only returned when requested through `include`.
+OPTIONAL_FIELDS = ("text", "embedding")
+
+QUERY_CACHE_LOOKUPS = registry.counter("query_embedding_cache_total", "Query embedding cache lookups.", ("result",))
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU cache of query embeddings keyed by the normalized query text."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, text: str, compute) -> List[float]:
+        with self._lock:
+            if text in self._entries:
+                self._entries.move_to_end(text)
+                self.hits += 1
+                QUERY_CACHE_LOOKUPS.inc(result="hit")
+                return self._entries[text]
+            self.misses += 1
+            QUERY_CACHE_LOOKUPS.inc(result="miss")
+        embedding = compute(text)
+        with self._lock:
+            self._entries[text] = embedding
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return embedding
+
+
+query_embedding_cache = QueryEmbeddingCache()
+
+
+def _embed_query(text: str) -> List[float]:
+    with stage_timer("search_embed"):
+        embedding = get_embedding_function()([text])[0]
+    return embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+
+
+def build_where(
+    document_class: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    filename: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Build a ChromaDB `where` filter; multiple conditions are combined with $and."""
+    conditions = []
+    if document_class:
+        conditions.append({"class": document_class})
+    if min_confidence is not None:
+        conditions.append({"confidence": {"$gte": min_confidence}})
+    if filename:
+        conditions.append({"filename": filename})
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def search_documents(
+    collection,
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    where: Optional[Dict[str, Any]] = None,
+    include: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Return one page of the top (offset + limit) nearest documents for a query.
+
+    The query is normalized the same way as indexed documents and its embedding is cached.
+    Document text and embeddings are fetched from ChromaDB only when listed in `include`.
+    """
+    include = set(include or [])
+    query_embedding = query_embedding_cache.get_or_compute(clean_text(query), _embed_query)
+
+    chroma_include = ["metadatas", "distances"]
+    if "text" in include:
+        chroma_include.append("documents")
+    if "embedding" in include:
+        chroma_include.append("embeddings")
+
+    with stage_timer("search_query"):
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=offset + limit,
+            where=where,
+            include=chroma_include,
+        )
+
+    ids = results["ids"][0][offset:]
+    metadatas = results["metadatas"][0][offset:]
+    distances = results["distances"][0][offset:]
+    documents = (results.get("documents") or [[]])[0][offset:] if "text" in include else []
+    embeddings = results.get("embeddings") if "embedding" in include else None
+    embeddings = list(embeddings[0])[offset:] if embeddings is not None else []
+
+    hits = []
+    for index, (doc_id, metadata, distance) in enumerate(zip(ids, metadatas, distances)):
+        hit = {
+            "id": doc_id,
+            "filename": metadata.get("filename"),
+            "document_type": metadata.get("class"),
+            "confidence": metadata.get("confidence"),
+            "distance": distance,
+            "entities": json.loads(metadata.get("entities") or "{}"),
+        }
+        if documents:
+            hit["text"] = documents[index]
+        if embeddings:
+            embedding = embeddings[index]
+            hit["embedding"] = embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+        hits.append(hit)
+    return hits
+
+
+def search_documents_by_chunks(
+    collection,
+    chunk_index,
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    where: Optional[Dict[str, Any]] = None,
+    include: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Like `search_documents`, but ranks parent documents by their best-matching chunks,
+    so text beyond the embedding model's input window is searchable.
+    """
+    include = set(include or [])
+    parents = chunk_index.query(clean_text(query), n_results=offset + limit, where=where)[offset:]
+    if not parents:
+        return []
+
+    chroma_include = ["metadatas"]
+    if "text" in include:
+        chroma_include.append("documents")
+    if "embedding" in include:
+        chroma_include.append("embeddings")
+    stored = collection.get(ids=[parent["id"] for parent in parents], include=chroma_include)
+    position = {doc_id: index for index, doc_id in enumerate(stored["ids"])}
+
+    hits = []
+    for parent in parents:
+        index = position.get(parent["id"])
+        if index is None:
+            continue
+        metadata = stored["metadatas"][index]
+        hit = {
+            "id": parent["id"],
+            "filename": metadata.get("filename"),
+            "document_type": metadata.get("class"),
+            "confidence": metadata.get("confidence"),
+            "distance": parent["distance"],
+            "score": parent["score"],
+            "entities": json.loads(metadata.get("entities") or "{}"),
+        }
+        if "text" in include:
+            hit["text"] = stored["documents"][index]
+        if "embedding" in include:
+            embedding = stored["embeddings"][index]
+            hit["embedding"] = embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+        hits.append(hit)
+    return hits
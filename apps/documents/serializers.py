@@ -0,0 +1,22 @@
+from rest_framework import serializers
+
+from apps.documents.search import OPTIONAL_FIELDS
+
+
+class DocumentSearchQuerySerializer(serializers.Serializer):
+    """Query parameters of the document search endpoint."""
+    q = serializers.CharField()
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    offset = serializers.IntegerField(min_value=0, max_value=1000, default=0)
+    document_type = serializers.CharField(required=False)
+    min_confidence = serializers.FloatField(min_value=0.0, max_value=1.0, required=False)
+    filename = serializers.CharField(required=False)
+    include = serializers.CharField(required=False, default="")
+    granularity = serializers.ChoiceField(choices=["document", "chunk"], default="document")
+
+    def validate_include(self, value):
+        fields = [field.strip() for field in value.split(",") if field.strip()]
+        unknown = set(fields) - set(OPTIONAL_FIELDS)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return fields
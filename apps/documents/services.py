@@ -0,0 +1,384 @@
+"""Document processing shared by the single-document and batch endpoints."""
+
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import chromadb
+from django.conf import settings
+
+from apps.documents.entities import EntityIndex, entity_index as default_entity_index
+from ml_pipeline.dataset.chunking import CHUNK_COLLECTION_NAME, ChunkIndex
+from ml_pipeline.dataset.dedup import NearDuplicateIndex, content_key
+from ml_pipeline.dataset.embeddings import get_embedding_function
+from ml_pipeline.dataset.utils import clean_text
+from ml_pipeline.entity_extractor.extractor import EntityExtractor
+from ml_pipeline.ocr.base import OCRResult
+from ml_pipeline.ocr.google_cloud_vision import GoogleCloudVisionOCRProcessor
+from ml_pipeline.ocr.pipeline import OCRPipeline
+from services.admission import bind_context, check_deadline
+from services.logger import logger
+from services.metrics import registry, stage_timer
+
+COLLECTION_NAME = "documents"
+CLASSIFICATION_NEIGHBOURS = 5
+
+CLASSIFICATION_REFINEMENTS = registry.counter(
+    "classification_refinements_total", "Pipelined documents whose full-text type differed from the first pages'.")
+
+# Preload the model ONCE at module load, using Ollama for entity extraction with gemma3:1b
+entity_extractor = EntityExtractor(use_ollama=True, ollama_model="gemma3:1b")
+
+_collections: Dict[str, Any] = {}
+_collection_lock = threading.Lock()
+_dedup_index: Optional[NearDuplicateIndex] = None
+
+
+def open_chroma_client():
+    """Open the persistent ChromaDB client on the `db/` directory."""
+    db_path = os.path.join(settings.BASE_DIR, "db")
+    return chromadb.PersistentClient(path=db_path,
+                settings=chromadb.Settings(allow_reset=True,
+                persist_directory=db_path, is_persistent=True))
+
+
+def _get_collection(name: str):
+    """Return a ChromaDB collection, opening the persistent client once per process."""
+    if name not in _collections:
+        with _collection_lock:
+            if name not in _collections:
+                client = open_chroma_client()
+                _collections[name] = client.get_or_create_collection(name=name, embedding_function=get_embedding_function())
+    return _collections[name]
+
+
+def get_documents_collection():
+    """Return the ChromaDB documents collection."""
+    return _get_collection(COLLECTION_NAME)
+
+
+def get_chunk_index() -> Optional[ChunkIndex]:
+    """Return the chunk-level index when CHUNK_INDEX_ENABLED is set, else None."""
+    if not settings.CHUNK_INDEX_ENABLED:
+        return None
+    return ChunkIndex(_get_collection(CHUNK_COLLECTION_NAME), settings.CHUNK_INDEX_CONFIG)
+
+
+def get_dedup_index() -> Optional[NearDuplicateIndex]:
+    """Return the process-wide near-duplicate index when DEDUP_ENABLED is set, else None."""
+    global _dedup_index
+    if not settings.DEDUP_ENABLED:
+        return None
+    if _dedup_index is None:
+        with _collection_lock:
+            if _dedup_index is None:
+                _dedup_index = NearDuplicateIndex(str(settings.DEDUP_INDEX_DIR), threshold=settings.DEDUP_THRESHOLD)
+    return _dedup_index
+
+
+def predict_type(neighbour_metadatas: List[Dict[str, Any]]) -> str:
+    """Majority vote over the classes of the nearest stored documents."""
+    classes = [metadata["class"] for metadata in neighbour_metadatas]
+    return max(set(classes), key=classes.count)
+
+
+@dataclass
+class DocumentInput:
+    """A document to process: a local file path and the client-facing filename."""
+    path: str
+    filename: str
+
+
+class DocumentProcessor:
+    """
+    Runs documents through OCR → clean → classify → extract → upsert.
+
+    Documents are stored under a content-derived id (see `content_key`). When a dedup index
+    is configured, a document whose cleaned text is a near-duplicate of a stored one skips
+    classification, extraction and the upsert, and reuses the stored type and entities.
+
+    `process_stream` OCRs documents concurrently and finishes them in batches of up to
+    `batch_size`: one embedding/query call to classify, one entity extraction batch and
+    one ChromaDB upsert per batch. Results are yielded as each batch finishes.
+
+    With `pipeline_pages`, `process` overlaps the stages of a multi-page document (see
+    `process_pipelined`), OCR'ing up to `page_prefetch` pages at a time.
+    """
+
+    def __init__(
+        self,
+        ocr_pipeline: Optional[OCRPipeline] = None,
+        extractor: Optional[EntityExtractor] = None,
+        collection=None,
+        max_workers: int = 4,
+        batch_size: int = 16,
+        entity_index: Optional[EntityIndex] = None,
+        chunk_index: Optional[ChunkIndex] = None,
+        dedup_index: Optional[NearDuplicateIndex] = None,
+        pipeline_pages: bool = False,
+        classify_pages: int = 1,
+        page_prefetch: int = 2,
+    ):
+        self.ocr_pipeline = ocr_pipeline or OCRPipeline(processor=GoogleCloudVisionOCRProcessor(config={"language_hints": ["en"], "box_levels": ["block", "word"]}))
+        self.extractor = extractor or entity_extractor
+        self.collection = collection if collection is not None else get_documents_collection()
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.entity_index = entity_index or default_entity_index
+        self.chunk_index = chunk_index if chunk_index is not None else get_chunk_index()
+        self.dedup_index = dedup_index if dedup_index is not None else get_dedup_index()
+        self.pipeline_pages = pipeline_pages
+        self.classify_pages = max(1, classify_pages)
+        self.page_prefetch = page_prefetch
+
+    def process(self, document: DocumentInput) -> Dict[str, Any]:
+        """Process a single document and return its response payload."""
+        if self.pipeline_pages:
+            return self.process_pipelined(document)
+        ocr_result = self.ocr_pipeline.process_file(document.path)
+        return self._finish_batch([(document, ocr_result)])[0]
+
+    def process_pipelined(self, document: DocumentInput) -> Dict[str, Any]:
+        """
+        Process one document with OCR and classification overlapped.
+
+        Pages are OCR'd in the background and collected as they complete. Once the first
+        `classify_pages` pages are in, they are classified while the remaining pages are
+        still being OCR'd. When all pages are done, entities are extracted from the full
+        text with that early type, while the full text is classified on a second thread.
+        If the full text gets a different type, extraction is re-run with it. The early type
+        only lets extraction start sooner; entities always come from the whole document.
+        """
+        page_results: "queue.Queue" = queue.Queue()
+
+        def ocr_pages() -> None:
+            try:
+                for page_result in self.ocr_pipeline.iter_page_results(document.path, prefetch=self.page_prefetch):
+                    page_results.put(page_result)
+            finally:
+                page_results.put(None)
+
+        pages: List[OCRResult] = []
+        early_type = None
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            ocr_future = pool.submit(bind_context(ocr_pages))
+            for page_result in iter(page_results.get, None):
+                pages.append(page_result)
+                if early_type is None and len(pages) == self.classify_pages:
+                    early_text = clean_text("\n".join(page.text for page in pages))
+                    check_deadline("classify")
+                    with stage_timer("classify"):
+                        early_type = self._classify([early_text])[0]
+            ocr_future.result()
+        ocr_result = OCRPipeline.combine_pages(pages)
+
+        if early_type is None or len(pages) == self.classify_pages:
+            # Nothing to overlap: fewer pages than `classify_pages`, or the early type already saw every page
+            return self._finish_batch([(document, ocr_result)])[0]
+        text = clean_text(ocr_result.text)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            early_entities = pool.submit(bind_context(self._timed_extract), [text], [early_type], [ocr_result.blocks])
+            check_deadline("classify")
+            with stage_timer("classify"):
+                document_type = self._classify([text])[0]
+            entities = early_entities.result()[0]
+        if document_type != early_type:
+            CLASSIFICATION_REFINEMENTS.inc()
+            logger.info("[DocumentProcessor] %s: first pages look like %s, full document like %s",
+                        document.filename, early_type, document_type, extra={"event": "classification_refined"})
+            entities = self._timed_extract([text], [document_type], [ocr_result.blocks])[0]
+        return self._finish_batch([(document, ocr_result)], known={0: (document_type, entities)})[0]
+
+    def _timed_extract(self, texts: List[str], document_types: List[str], blocks: List[Any]) -> List[Dict[str, Any]]:
+        check_deadline("extract")
+        with stage_timer("extract"):
+            return self.extractor.extract_entities_batch(texts, document_types, blocks=blocks)
+
+    def process_stream(self, documents: Iterable[DocumentInput]) -> Iterator[Dict[str, Any]]:
+        """Process many documents, yielding one result (or error) per document as batches complete."""
+        documents = list(documents)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.ocr_pipeline.process_file, doc.path): doc for doc in documents}
+            pending: List[Tuple[DocumentInput, OCRResult]] = []
+            remaining = len(futures)
+            for future in as_completed(futures):
+                remaining -= 1
+                document = futures[future]
+                try:
+                    pending.append((document, future.result()))
+                except Exception as e:
+                    logger.error(f"[DocumentProcessor] OCR failed for {document.filename}: {e}")
+                    yield {"filename": document.filename, "error": str(e)}
+                if pending and (len(pending) >= self.batch_size or remaining == 0):
+                    yield from self._finish_batch_safely(pending)
+                    pending = []
+
+    def _finish_batch_safely(self, batch: List[Tuple[DocumentInput, OCRResult]]) -> List[Dict[str, Any]]:
+        try:
+            return self._finish_batch(batch)
+        except Exception as e:
+            logger.error(f"[DocumentProcessor] Batch of {len(batch)} documents failed: {e}")
+            return [{"filename": document.filename, "error": str(e)} for document, _ in batch]
+
+    def _classify(self, cleaned_texts: List[str]) -> List[str]:
+        """Predict document types from the nearest stored documents (or chunks, when chunk indexing is on)."""
+        if self.chunk_index is None:
+            return self._classify_documents(cleaned_texts)
+        types: List[Optional[str]] = []
+        for text in cleaned_texts:
+            parents = self.chunk_index.query(text, n_results=CLASSIFICATION_NEIGHBOURS)
+            types.append(predict_type([parent["metadata"] for parent in parents]) if parents else None)
+        # No chunk neighbours (chunk collection not backfilled yet, see `index_chunks`): use whole documents
+        missing = [i for i, document_type in enumerate(types) if document_type is None]
+        if missing:
+            for i, document_type in zip(missing, self._classify_documents([cleaned_texts[i] for i in missing])):
+                types[i] = document_type
+        return types
+
+    def _classify_documents(self, cleaned_texts: List[str]) -> List[str]:
+        # Query the ChromaDB for similar documents, one query for the whole batch
+        results = self.collection.query(query_texts=cleaned_texts, n_results=CLASSIFICATION_NEIGHBOURS)
+        return [predict_type(metadatas) for metadatas in results["metadatas"]]
+
+    def _find_duplicates(self, cleaned_texts: List[str]) -> Tuple[Dict[int, Tuple[str, float, Dict[str, Any]]], List[Any]]:
+        """
+        Match each text against the dedup index.
+
+        Returns the MinHash signatures and, by batch position, (stored id, similarity, stored metadata)
+        for texts whose near-duplicate is still present in the collection.
+        """
+        if self.dedup_index is None:
+            return {}, []
+        signatures = [self.dedup_index.hasher.signature(text) for text in cleaned_texts]
+        matches = {}
+        for i, signature in enumerate(signatures):
+            # Blank texts have no signature and are never near-duplicates
+            match = self.dedup_index.query(signature) if signature is not None else None
+            if match is not None:
+                matches[i] = match
+        if not matches:
+            return {}, signatures
+        stored = self.collection.get(ids=list({key for key, _ in matches.values()}), include=["metadatas"])
+        metadata_by_id = dict(zip(stored["ids"], stored["metadatas"]))
+        duplicates = {
+            i: (key, similarity, metadata_by_id[key])
+            for i, (key, similarity) in matches.items() if key in metadata_by_id
+        }
+        return duplicates, signatures
+
+    def _finish_batch(
+        self,
+        batch: List[Tuple[DocumentInput, OCRResult]],
+        known: Optional[Dict[int, Tuple[str, Dict[str, Any]]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Classify, extract and upsert a batch of OCR'd documents, short-circuiting near-duplicates.
+
+        `known` maps batch positions to an already computed (document type, entities) pair;
+        those documents skip classification and extraction.
+        """
+        known = known or {}
+        with stage_timer("clean"):
+            cleaned_texts = [clean_text(ocr_result.text) for _, ocr_result in batch]
+            doc_ids = [content_key(text) for text in cleaned_texts]
+        with stage_timer("dedup"):
+            duplicates, signatures = self._find_duplicates(cleaned_texts)
+        if duplicates:
+            logger.info("[DocumentProcessor] %d of %d documents are near-duplicates of stored documents", len(duplicates), len(batch))
+
+        fresh = [i for i in range(len(batch)) if i not in duplicates]
+        predicted_types: Dict[int, str] = {}
+        all_entities: Dict[int, Dict[str, Any]] = {}
+        if fresh:
+            pending = [i for i in fresh if i not in known]
+            if pending:
+                pending_texts = [cleaned_texts[i] for i in pending]
+                check_deadline("classify")
+                with stage_timer("classify"):
+                    pending_types = self._classify(pending_texts)
+                logger.info("[DocumentProcessor] Predicted types: %s", pending_types, extra={"event": "predicted_types"})
+                pending_entities = self._timed_extract(pending_texts, pending_types, [batch[i][1].blocks for i in pending])
+                predicted_types = dict(zip(pending, pending_types))
+                all_entities = dict(zip(pending, pending_entities))
+            for i in fresh:
+                if i in known:
+                    predicted_types[i], all_entities[i] = known[i]
+            self._store(batch, fresh, doc_ids, cleaned_texts, predicted_types, all_entities)
+            if self.dedup_index is not None:
+                for i in fresh:
+                    if signatures[i] is not None:
+                        self.dedup_index.add(doc_ids[i], signatures[i])
+                # Appends this batch's signatures only; the log is compacted by save()
+                self.dedup_index.flush()
+
+        results = []
+        for i, ((document, ocr_result), cleaned_text) in enumerate(zip(batch, cleaned_texts)):
+            result = {"filename": document.filename, "document_id": doc_ids[i]}
+            if i in duplicates:
+                duplicate_id, similarity, metadata = duplicates[i]
+                result.update({
+                    "document_id": duplicate_id,
+                    "document_type": metadata["class"],
+                    "text": cleaned_text,
+                    "entities": json.loads(metadata.get("entities") or "{}"),
+                    "confidence": ocr_result.confidence,
+                    "duplicate_of": duplicate_id,
+                    "similarity": similarity,
+                })
+            else:
+                result.update({
+                    "document_type": predicted_types[i],
+                    "text": cleaned_text,
+                    "entities": all_entities[i],
+                    "confidence": ocr_result.confidence,
+                })
+            results.append(result)
+        return results
+
+    def _store(
+        self,
+        batch: List[Tuple[DocumentInput, OCRResult]],
+        positions: List[int],
+        doc_ids: List[str],
+        cleaned_texts: List[str],
+        predicted_types: Dict[int, str],
+        all_entities: Dict[int, Dict[str, Any]],
+    ) -> None:
+        """
+        Upsert the documents at `positions` into ChromaDB, then replace their entity rows.
+
+        The ChromaDB upsert (and chunk indexing) runs first, outside any transaction; the entity
+        rows are then replaced atomically. A failed upsert leaves the entity rows untouched, but a
+        failure in the entity write leaves the upserted documents in ChromaDB with stale rows.
+        """
+        # Ids must be unique within one upsert, so identical texts keep the last document, as sequential upserts would.
+        documents_by_id, metadatas_by_id, entity_records = {}, {}, {}
+        for i in positions:
+            document, ocr_result = batch[i]
+            doc_id = doc_ids[i]
+            documents_by_id[doc_id] = cleaned_texts[i]
+            metadatas_by_id[doc_id] = {
+                "class": predicted_types[i],
+                "filename": document.filename,
+                "confidence": ocr_result.confidence,
+                "entities": json.dumps(all_entities[i])
+            }
+            entity_records[doc_id] = (doc_id, predicted_types[i], all_entities[i])
+
+        def upsert():
+            self.collection.upsert(
+                documents=list(documents_by_id.values()),
+                metadatas=list(metadatas_by_id.values()),
+                ids=list(documents_by_id)
+            )
+            if self.chunk_index is not None:
+                for doc_id, text in documents_by_id.items():
+                    self.chunk_index.index(doc_id, text, metadatas_by_id[doc_id])
+
+        # The structured entity rows are replaced once the upsert succeeds.
+        with stage_timer("upsert"):
+            self.entity_index.write(entity_records.values(), upsert=upsert)
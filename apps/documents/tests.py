@@ -1 +1,254 @@
+import datetime
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+from django.core.files.uploadhandler import StopUpload
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from apps.documents.entities import entity_index, normalize_date, normalize_number, parse_filter, query_documents
+from apps.documents.models import DocumentEntity
+from apps.documents.search import QueryEmbeddingCache, build_where
+from apps.documents.services import DocumentInput, DocumentProcessor
+from ml_pipeline.dataset.dedup import NearDuplicateIndex
+from apps.documents.upload import StreamingUploadHandler, sweep_orphaned_uploads
+from apps.documents.views import DocumentProcessingView
+from ml_pipeline.ocr.base import OCRResult
+from services.admission import AdmissionController
 
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+class StreamingUploadHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(UPLOAD_TEMP_DIR=self.temp_dir.name, DOCUMENT_UPLOAD_MAX_BYTES=64)
+        self.override.enable()
+        self.request = RequestFactory().post("/api/documents/process/")
+        self.handler = StreamingUploadHandler(self.request)
+        self.handler.new_file("file", "scan.png", "image/png", None)
+
+    def tearDown(self):
+        self.override.disable()
+        self.temp_dir.cleanup()
+
+    def test_streams_and_hashes(self):
+        self.handler.receive_data_chunk(PNG_HEADER + b"a" * 8, 0)
+        self.handler.receive_data_chunk(b"b" * 8, 16)
+        uploaded = self.handler.file_complete(24)
+        self.assertEqual(uploaded.detected_format, "png")
+        self.assertEqual(len(uploaded.content_hash), 64)
+        path = uploaded.temporary_file_path()
+        self.assertTrue(path.endswith(".png"))
+        uploaded.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_rejects_unknown_magic_bytes(self):
+        with self.assertRaises(StopUpload):
+            self.handler.receive_data_chunk(b"MZ\x90\x00 not a document", 0)
+        self.assertEqual(self.request.upload_error[0], 415)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_rejects_oversized_upload(self):
+        self.handler.receive_data_chunk(PNG_HEADER + b"a" * 32, 0)
+        with self.assertRaises(StopUpload):
+            self.handler.receive_data_chunk(b"a" * 32, 40)
+        self.assertEqual(self.request.upload_error[0], 413)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_empty_file_is_skipped_in_batch_mode(self):
+        handler = StreamingUploadHandler(self.request, skip_invalid=True)
+        handler.new_file("files", "empty.png", "image/png", None)
+        self.assertIsNone(handler.file_complete(0))
+        self.assertEqual(self.request.skipped_uploads, [("empty.png", 400, "Empty file")])
+        self.assertFalse(hasattr(self.request, "upload_error"))
+
+    def test_sweep_removes_files_of_dead_workers(self):
+        open(os.path.join(self.temp_dir.name, "upload-999999999-abc.pdf"), "wb").close()
+        open(os.path.join(self.temp_dir.name, f"upload-{os.getpid()}-abc.pdf"), "wb").close()
+        self.assertEqual(sweep_orphaned_uploads(), 1)
+        self.assertEqual(os.listdir(self.temp_dir.name), [f"upload-{os.getpid()}-abc.pdf"])
+
+
+class DocumentProcessorTests(SimpleTestCase):
+    def setUp(self):
+        self.ocr_pipeline = MagicMock()
+        self.ocr_pipeline.process_file.side_effect = lambda path: OCRResult(text=f"Text of {path}", confidence=0.9)
+        self.extractor = MagicMock()
+        self.extractor.extract_entities_batch.side_effect = lambda texts, types, blocks=None: [{"date": "2023-01-01"} for _ in texts]
+        self.entity_index = MagicMock()
+        self.entity_index.write.side_effect = lambda records, upsert: upsert()
+        self.collection = MagicMock()
+        self.collection.query.side_effect = lambda query_texts, n_results: {
+            "metadatas": [[{"class": "invoice"}, {"class": "invoice"}, {"class": "memo"}] for _ in query_texts]
+        }
+
+    def make_processor(self, batch_size):
+        return DocumentProcessor(self.ocr_pipeline, self.extractor, self.collection, max_workers=2,
+                                 batch_size=batch_size, entity_index=self.entity_index, dedup_index=NearDuplicateIndex())
+
+    def test_process_stream_batches_classification_and_upsert(self):
+        documents = [DocumentInput(path=f"/tmp/{i}.png", filename=f"{i}.png") for i in range(5)]
+        results = list(self.make_processor(batch_size=5).process_stream(documents))
+        self.assertEqual(sorted(r["filename"] for r in results), [f"{i}.png" for i in range(5)])
+        self.assertTrue(all(r["document_type"] == "invoice" for r in results))
+        self.assertEqual(self.collection.query.call_count, 1)
+        self.assertEqual(self.collection.upsert.call_count, 1)
+        self.assertEqual(len(self.collection.upsert.call_args.kwargs["ids"]), 5)
+
+    def test_classify_falls_back_to_documents_without_chunk_neighbours(self):
+        chunk_index = MagicMock()
+        chunk_index.query.side_effect = lambda text, n_results: [] if text == "new" else [{"metadata": {"class": "memo"}}]
+        processor = DocumentProcessor(self.ocr_pipeline, self.extractor, self.collection, chunk_index=chunk_index)
+        self.assertEqual(processor._classify(["new", "known"]), ["invoice", "memo"])
+        self.assertEqual(self.collection.query.call_args.kwargs["query_texts"], ["new"])
+
+    def test_ocr_failure_reported_per_document(self):
+        def process_file(path):
+            if path.endswith("bad.png"):
+                raise ValueError("unreadable")
+            return OCRResult(text="ok", confidence=0.9)
+        self.ocr_pipeline.process_file.side_effect = process_file
+        documents = [DocumentInput("/tmp/bad.png", "bad.png"), DocumentInput("/tmp/good.png", "good.png")]
+        results = {r["filename"]: r for r in self.make_processor(batch_size=16).process_stream(documents)}
+        self.assertEqual(results["bad.png"]["error"], "unreadable")
+        self.assertEqual(results["good.png"]["document_type"], "invoice")
+
+    def test_near_duplicates_reuse_stored_entities(self):
+        text = " ".join(f"word{i}" for i in range(300))
+        self.ocr_pipeline.process_file.side_effect = lambda path: OCRResult(
+            text=text if path.endswith("a.png") else text.replace("word7 ", "w0rd7 "), confidence=0.9)
+        processor = self.make_processor(batch_size=16)
+        first = processor.process(DocumentInput("/tmp/a.png", "a.png"))
+        self.collection.get.return_value = {
+            "ids": [first["document_id"]],
+            "metadatas": [{"class": "invoice", "entities": '{"date": "2023-01-01"}'}],
+        }
+        second = processor.process(DocumentInput("/tmp/b.png", "b.png"))
+        self.assertEqual(second["duplicate_of"], first["document_id"])
+        self.assertEqual(second["entities"], {"date": "2023-01-01"})
+        self.assertEqual(self.collection.upsert.call_count, 1)
+        self.assertEqual(self.extractor.extract_entities_batch.call_count, 1)
+
+    def test_blank_documents_are_not_near_duplicates(self):
+        self.ocr_pipeline.process_file.side_effect = lambda path: OCRResult(text="  ", confidence=0.1)
+        processor = self.make_processor(batch_size=16)
+        first = processor.process(DocumentInput("/tmp/a.png", "a.png"))
+        self.collection.get.return_value = {"ids": [first["document_id"]], "metadatas": [{"class": "invoice"}]}
+        second = processor.process(DocumentInput("/tmp/b.png", "b.png"))
+        self.assertNotIn("duplicate_of", second)
+        self.assertEqual(len(processor.dedup_index), 0)
+
+    def make_pipelined_processor(self, pages):
+        self.ocr_pipeline.iter_page_results.side_effect = lambda path, prefetch: iter(
+            OCRResult(text=text, confidence=0.9, blocks=[], metadata={"page": page})
+            for page, text in enumerate(pages, start=1))
+        return DocumentProcessor(self.ocr_pipeline, self.extractor, self.collection, entity_index=self.entity_index,
+                                 dedup_index=NearDuplicateIndex(), pipeline_pages=True)
+
+    def test_pipelined_extracts_from_full_text_when_type_agrees(self):
+        result = self.make_pipelined_processor(["Invoice 1 of 2", "Total due"]).process(DocumentInput("/tmp/a.pdf", "a.pdf"))
+        self.assertEqual(result["document_type"], "invoice")
+        self.assertEqual(result["text"], "invoice 1 of 2 total due")
+        self.assertEqual(result["entities"], {"date": "2023-01-01"})
+        self.assertEqual(self.extractor.extract_entities_batch.call_args.args[:2], (["invoice 1 of 2 total due"], ["invoice"]))
+        self.assertEqual(self.extractor.extract_entities_batch.call_count, 1)
+        self.assertEqual(self.collection.upsert.call_count, 1)
+
+    def test_pipelined_re_extracts_when_full_text_changes_type(self):
+        self.collection.query.side_effect = lambda query_texts, n_results: {
+            "metadatas": [[{"class": "memo" if "memo" in text else "invoice"}] for text in query_texts]
+        }
+        result = self.make_pipelined_processor(["Cover page", "Memo to staff"]).process(DocumentInput("/tmp/a.pdf", "a.pdf"))
+        self.assertEqual(result["document_type"], "memo")
+        self.assertEqual(self.extractor.extract_entities_batch.call_count, 2)
+        self.assertEqual(self.extractor.extract_entities_batch.call_args.args[:2], (["cover page memo to staff"], ["memo"]))
+
+
+class DocumentProcessingViewTests(SimpleTestCase):
+    def test_rejects_with_retry_after_when_saturated(self):
+        controller = AdmissionController(max_concurrent=1, max_queued=0, max_wait=1)
+        request = RequestFactory().post("/api/documents/process/")
+        with patch("apps.documents.views.admission_controller", controller), controller.admit():
+            response = DocumentProcessingView.as_view()(request)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+class SearchTests(SimpleTestCase):
+    def test_build_where(self):
+        self.assertIsNone(build_where())
+        self.assertEqual(build_where(document_class="invoice"), {"class": "invoice"})
+        self.assertEqual(
+            build_where(document_class="invoice", min_confidence=0.8),
+            {"$and": [{"class": "invoice"}, {"confidence": {"$gte": 0.8}}]},
+        )
+
+    def test_query_embedding_cache_evicts_least_recent(self):
+        cache = QueryEmbeddingCache(maxsize=2)
+        compute = MagicMock(side_effect=lambda text: [float(len(text))])
+        cache.get_or_compute("a", compute)
+        cache.get_or_compute("bb", compute)
+        cache.get_or_compute("a", compute)
+        cache.get_or_compute("ccc", compute)
+        cache.get_or_compute("bb", compute)
+        self.assertEqual(compute.call_count, 4)
+        self.assertEqual(cache.hits, 1)
+
+
+class EntityIndexTests(TestCase):
+    def test_normalization(self):
+        self.assertEqual(normalize_number("$1,250.00"), 1250.0)
+        self.assertEqual(normalize_number("15%"), 15.0)
+        self.assertIsNone(normalize_number("12 Main Street"))
+        self.assertEqual(normalize_date("2023-01-05"), datetime.date(2023, 1, 5))
+        self.assertEqual(normalize_date("January 5, 2023"), datetime.date(2023, 1, 5))
+        self.assertIsNone(normalize_date("next week"))
+
+    def test_write_replaces_rows_and_runs_upsert(self):
+        upsert = MagicMock()
+        entity_index.write([("a.pdf", "invoice", {"total_amount": "$500", "customer_name": "Acme"})], upsert=upsert)
+        entity_index.write([("a.pdf", "invoice", {"total_amount": "$1,500"})], upsert=upsert)
+        self.assertEqual(upsert.call_count, 2)
+        self.assertEqual(DocumentEntity.objects.filter(document_id="a.pdf").count(), 1)
+
+    def test_fields_differing_in_case_give_one_row(self):
+        entity_index.write([("a.pdf", "invoice", {"Total_Amount": "$500", "total_amount": "$500", "TOTAL_AMOUNT": "$600"})])
+        rows = DocumentEntity.objects.filter(document_id="a.pdf", field="total_amount")
+        self.assertEqual(sorted(rows.values_list("value", flat=True)), ["$500", "$600"])
+
+    def test_list_and_dict_values_give_one_row_per_value(self):
+        entity_index.write([("a.pdf", "invoice", {
+            "emails": ["a@acme.com", "b@acme.com", "a@acme.com"],
+            "address": {"city": "Springfield", "lines": ["1 Main St", ""]},
+            "paid": True,
+        })])
+        self.assertEqual(sorted(DocumentEntity.objects.values_list("field", "value")), [
+            ("address.city", "Springfield"), ("address.lines", "1 Main St"),
+            ("emails", "a@acme.com"), ("emails", "b@acme.com"), ("paid", "true"),
+        ])
+
+    def test_failed_upsert_rolls_back(self):
+        with self.assertRaises(RuntimeError):
+            entity_index.write([("a.pdf", "invoice", {"total_amount": "$500"})], upsert=MagicMock(side_effect=RuntimeError))
+        self.assertFalse(DocumentEntity.objects.exists())
+
+    def test_snapshot_rows_round_trip(self):
+        entity_index.write([("a.pdf", "invoice", {"total_amount": "$500", "invoice_date": "2023-01-05"})])
+        rows = [json.loads(json.dumps(row, default=str)) for row in entity_index.export_rows()]
+        entity_index.write([("b.pdf", "memo", {"sender": "Bob"})])
+        self.assertEqual(entity_index.replace_all(rows, batch_size=1), 2)
+        self.assertEqual(sorted(DocumentEntity.objects.values_list("document_id", "field")),
+                         [("a.pdf", "invoice_date"), ("a.pdf", "total_amount")])
+        self.assertEqual(DocumentEntity.objects.get(field="invoice_date").value_date, datetime.date(2023, 1, 5))
+
+    def test_query_documents(self):
+        entity_index.write([
+            ("a.pdf", "invoice", {"total_amount": "$500", "customer_name": "Acme Corp"}),
+            ("b.pdf", "invoice", {"total_amount": "$2,000", "customer_name": "Acme Corp"}),
+            ("c.pdf", "invoice", {"total_amount": "$3,000", "customer_name": "Globex"}),
+        ])
+        results = query_documents([parse_filter("total_amount:gt:1000"), parse_filter("customer_name:contains:acme")])
+        self.assertEqual([r["id"] for r in results], ["b.pdf"])
+        self.assertEqual(results[0]["entities"]["total_amount"], "$2,000")
+        with self.assertRaises(ValueError):
+            parse_filter("total_amount:between:1")
@@ -0,0 +1,217 @@
+"""Streaming upload handling for document uploads."""
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+import zipfile
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+
+from ml_pipeline.ocr.payload import sniff_format
+from services.logger import logger
+from services.metrics import BYTES_BUCKETS, registry
+
+ALLOWED_UPLOAD_FORMATS = {"jpeg", "png", "gif", "bmp", "tiff", "webp", "pdf"}
+_EXTENSIONS = {"jpeg": "jpg", "tiff": "tif"}
+# Temp files are named upload-<pid>-<random><ext>, so orphans can be traced back to their worker.
+_UPLOAD_NAME = re.compile(r"^upload-(\d+)-")
+
+UPLOAD_BYTES = registry.histogram("upload_bytes", "Size of accepted document uploads.", ("format",), buckets=BYTES_BUCKETS)
+
+
+def upload_temp_dir() -> str:
+    directory = str(getattr(settings, "UPLOAD_TEMP_DIR", os.path.join(settings.FILES_ROOT, "uploads")))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+class HashedUploadedFile(UploadedFile):
+    """An upload streamed to a temp file, with its SHA-256 and sniffed format. The temp file is deleted on close."""
+
+    def __init__(self, file, name: str, content_type: str, size: int, charset: Optional[str],
+                 content_hash: str, detected_format: str):
+        super().__init__(file, name, content_type, size, charset)
+        self.content_hash = content_hash
+        self.detected_format = detected_format
+
+    def temporary_file_path(self) -> str:
+        return self.file.name
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    """
+    Streams an uploaded document to a temp file chunk by chunk while hashing it,
+    checking its magic bytes against ALLOWED_UPLOAD_FORMATS and enforcing
+    DOCUMENT_UPLOAD_MAX_BYTES. Rejections are recorded on `request.upload_error`
+    as (HTTP status, message). With `skip_invalid`, a rejected file is skipped
+    instead, recorded in `request.skipped_uploads`, and the other files go on.
+    """
+
+    def __init__(self, request=None, allowed_formats: Optional[Iterable[str]] = None, skip_invalid: bool = False):
+        super().__init__(request)
+        self.max_bytes = getattr(settings, "DOCUMENT_UPLOAD_MAX_BYTES", 50 * 1024 * 1024)
+        self.allowed_formats = set(allowed_formats or ALLOWED_UPLOAD_FORMATS)
+        self.skip_invalid = skip_invalid
+        self.temp_file = None
+        self.hasher = None
+        self.detected_format = None
+        if request is not None and skip_invalid:
+            request.skipped_uploads = []
+
+    def _reject(self, status_code: int, message: str, connection_reset: bool = False):
+        self._discard()
+        if self.skip_invalid:
+            if self.request is not None:
+                self.request.skipped_uploads.append((self.file_name, status_code, message))
+            raise SkipFile()
+        if self.request is not None:
+            self.request.upload_error = (status_code, message)
+        raise StopUpload(connection_reset=connection_reset)
+
+    def _discard(self):
+        if self.temp_file is not None:
+            self.temp_file.close()
+            self.temp_file = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.content_length and self.content_length > self.max_bytes:
+            self._reject(413, f"File exceeds the {self.max_bytes} byte limit", connection_reset=True)
+        self.hasher = hashlib.sha256()
+        self.detected_format = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.temp_file is None:
+            # First chunk: check the magic bytes before anything touches the disk.
+            self.detected_format = sniff_format(raw_data)
+            if self.detected_format not in self.allowed_formats:
+                self._reject(415, "Unsupported file type")
+            extension = _EXTENSIONS.get(self.detected_format, self.detected_format)
+            self.temp_file = new_upload_temp_file(suffix=f".{extension}")
+        if start + len(raw_data) > self.max_bytes:
+            self._reject(413, f"File exceeds the {self.max_bytes} byte limit", connection_reset=True)
+        self.hasher.update(raw_data)
+        self.temp_file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.temp_file is None:
+            if self.request is not None:
+                if self.skip_invalid:
+                    self.request.skipped_uploads.append((self.file_name, 400, "Empty file"))
+                else:
+                    self.request.upload_error = (400, "Empty file")
+            return None
+        self.temp_file.flush()
+        self.temp_file.seek(0)
+        UPLOAD_BYTES.observe(file_size, format=self.detected_format)
+        uploaded = HashedUploadedFile(
+            file=self.temp_file,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_hash=self.hasher.hexdigest(),
+            detected_format=self.detected_format,
+        )
+        self.temp_file = None
+        return uploaded
+
+    def upload_interrupted(self):
+        self._discard()
+
+
+def new_upload_temp_file(suffix: str = ""):
+    """Create a temp file in the upload directory, deleted on close and named so the sweep can find it."""
+    return tempfile.NamedTemporaryFile(prefix=f"upload-{os.getpid()}-", suffix=suffix, dir=upload_temp_dir())
+
+
+def extract_zip_documents(path: str, max_files: int, max_total_bytes: int) -> Tuple[List[Tuple[str, object]], List[Tuple[str, str]]]:
+    """
+    Extract the supported documents of a zip archive into upload temp files.
+
+    Returns (documents, skipped): documents are (member name, open temp file) pairs and
+    skipped are (member name, reason) pairs. Sizes are checked against the bytes actually
+    written, not the sizes the archive claims, to guard against zip bombs.
+    """
+    documents, skipped = [], []
+    total_bytes = 0
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                if len(documents) >= max_files:
+                    skipped.append((member.filename, f"More than {max_files} files in archive"))
+                    continue
+                with archive.open(member) as source:
+                    header = source.read(16)
+                    detected_format = sniff_format(header)
+                    if detected_format not in ALLOWED_UPLOAD_FORMATS:
+                        skipped.append((member.filename, "Unsupported file type"))
+                        continue
+                    extension = _EXTENSIONS.get(detected_format, detected_format)
+                    temp_file = new_upload_temp_file(suffix=f".{extension}")
+                    temp_file.write(header)
+                    remaining = max_total_bytes - total_bytes - len(header)
+                    written = len(header) + _copy_limited(source, temp_file, remaining)
+                    if total_bytes + written > max_total_bytes:
+                        temp_file.close()
+                        skipped.append((member.filename, f"Archive exceeds the {max_total_bytes} byte limit"))
+                        break
+                    total_bytes += written
+                    temp_file.flush()
+                    documents.append((member.filename, temp_file))
+    except zipfile.BadZipFile:
+        skipped.append((os.path.basename(path), "Invalid zip archive"))
+    return documents, skipped
+
+
+def _copy_limited(source, target, limit: int) -> int:
+    """Copy at most limit + 1 bytes, so the caller can tell when the limit was exceeded."""
+    copied = 0
+    while copied <= limit:
+        chunk = source.read(min(1024 * 1024, limit + 1 - copied))
+        if not chunk:
+            break
+        target.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_orphaned_uploads(max_age_seconds: float = 24 * 3600) -> int:
+    """
+    Delete upload temp files left behind by crashed workers: files whose owning
+    pid is gone, and any file older than `max_age_seconds`. Returns the number removed.
+    """
+    directory = upload_temp_dir()
+    removed = 0
+    now = time.time()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        match = _UPLOAD_NAME.match(name)
+        try:
+            orphaned = (match and not _pid_alive(int(match.group(1)))) or now - os.path.getmtime(path) > max_age_seconds
+            if orphaned:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    if removed:
+        logger.info(f"[Upload] Removed {removed} orphaned upload temp files from {directory}")
+    return removed
@@ -1,10 +1,13 @@
 from django.urls import path
-from .views import DocumentProcessingView
+from .views import DocumentBatchProcessingView, DocumentEntityQueryView, DocumentProcessingView, DocumentSearchView
 from .health import HealthCheckView
 
 app_name = 'documents'
 
 urlpatterns = [
     path('process/', DocumentProcessingView.as_view(), name='process_document'),
+    path('process/batch/', DocumentBatchProcessingView.as_view(), name='process_documents_batch'),
+    path('search/', DocumentSearchView.as_view(), name='search_documents'),
+    path('entities/', DocumentEntityQueryView.as_view(), name='query_entities'),
     path('health/', HealthCheckView.as_view(), name='health_check')
 ]
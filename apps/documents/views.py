@@ -1,92 +1,240 @@
-import uuid
+import json
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.core.files.storage import default_storage
-import os
-import chromadb
-from django.conf import settings
 from rest_framework.parsers import MultiPartParser, FormParser
-from ml_pipeline.ocr.google_cloud_vision import GoogleCloudVisionOCRProcessor
-from ml_pipeline.ocr.pipeline import OCRPipeline
-from ml_pipeline.dataset.utils import clean_text
+from apps.documents.entities import parse_filter, query_documents
+from apps.documents.search import build_where, search_documents, search_documents_by_chunks
+from apps.documents.serializers import DocumentSearchQuerySerializer
+from apps.documents.services import DocumentInput, DocumentProcessor, get_chunk_index, get_documents_collection
+from apps.documents.upload import ALLOWED_UPLOAD_FORMATS, StreamingUploadHandler, extract_zip_documents
+from services.admission import AdmissionController, Deadline, DeadlineExceeded, Overloaded, deadline_scope
 from services.logger import logger
-from ml_pipeline.entity_extractor.extractor import EntityExtractor
-import json
+from services.profiling import ProfileStore, RequestProfiler
+
+# Per worker process: gunicorn threads beyond these slots wait in the queue or are turned away
+admission_controller = AdmissionController(
+    max_concurrent=settings.DOCUMENT_MAX_CONCURRENT,
+    max_queued=settings.DOCUMENT_MAX_QUEUED,
+    max_wait=settings.DOCUMENT_QUEUE_WAIT_SECONDS,
+    min_service_seconds=settings.DOCUMENT_MIN_SERVICE_SECONDS,
+)
+
+# Profiles requests sent with X-Profile-Token: PROFILE_TOKEN, and a PROFILE_SAMPLE_RATE fraction of the rest
+request_profiler = RequestProfiler(
+    ProfileStore(settings.PROFILE_DIR, max_files=settings.PROFILE_MAX_FILES, max_bytes=settings.PROFILE_MAX_BYTES),
+    sample_rate=settings.PROFILE_SAMPLE_RATE,
+    token=settings.PROFILE_TOKEN,
+    mode=settings.PROFILE_MODE,
+    interval=settings.PROFILE_INTERVAL_MS / 1000,
+)
+
+
+def request_deadline(request) -> Deadline:
+    """The request's deadline: DOCUMENT_REQUEST_DEADLINE_SECONDS, or a shorter X-Request-Timeout from the client."""
+    seconds = settings.DOCUMENT_REQUEST_DEADLINE_SECONDS
+    try:
+        seconds = min(seconds, float(request.headers.get('X-Request-Timeout', seconds)))
+    except ValueError:
+        pass
+    return Deadline(seconds)
 
-# Preload the model ONCE at module load, using Ollama for entity extraction with gemma3:1b
-enity_extractor = EntityExtractor(use_ollama=True, ollama_model="gemma3:1b")
 
 class DocumentProcessingView(APIView):
-    """API view to process a single document, identify its type, and extract entities."""
+    """
+    API view to process a single document, identify its type, and extract entities.
+
+    Requests are admitted by `admission_controller` before the upload is read, and processed
+    under a deadline; see services/admission.py. Profiled requests (services/profiling.py)
+    get an X-Profile-Id response header naming the stored profile.
+    """
     parser_classes = (MultiPartParser, FormParser)
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Stream uploads to a hashed temp file instead of Django's default memory/disk handlers.
+        request.upload_handlers = [StreamingUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def post(self, request):
-        logger.info(f"Request: {request}")
+        logger.info("Request: %s %s", request.method, request.path, extra={"event": "request"})
+        deadline = request_deadline(request)
+        try:
+            with admission_controller.admit(deadline), deadline_scope(deadline), \
+                    request_profiler.profile(request.headers.get('X-Profile-Token'), path=request.path) as profile:
+                response = self.process_upload(request, deadline)
+                if profile is not None:
+                    body = response.data if isinstance(response.data, dict) else {}
+                    profile.labels.update(status=response.status_code, filename=body.get("filename"),
+                                          document_type=body.get("document_type"))
+                    response['X-Profile-Id'] = profile.profile_id
+                return response
+        except Overloaded as e:
+            logger.warning("[DocumentProcessingView] Rejected with %d: %s", e.status, e, extra={"event": "request_rejected"})
+            return Response({'error': str(e)}, status=e.status, headers={'Retry-After': str(e.retry_after)})
+
+    def process_upload(self, request, deadline: Deadline):
         file = request.FILES.get('file')
-        logger.info(f"File: {file.name}")
+        upload_error = getattr(request, 'upload_error', None)
+        if upload_error:
+            error_status, message = upload_error
+            return Response({'error': message}, status=error_status)
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Save the file temporarily
-        safe_filename = f"{uuid.uuid4().hex}.{file.name.split('.')[-1]}"
-        relative_path = os.path.join('files', safe_filename)  # 'files/uuid.jpg'
-        file_path = default_storage.save(relative_path, file)
-        absolute_file_path = os.path.join(settings.FILES_ROOT, safe_filename)
-        
+        logger.info("File: %s, size: %d, sha256: %s", file.name, file.size, file.content_hash, extra={"event": "upload"})
+
         try:
-            ocr_pipeline = OCRPipeline(processor=GoogleCloudVisionOCRProcessor(config={"language_hints": ["en"]}))
-            ocr_result = ocr_pipeline.process_file(absolute_file_path)
-            cleaned_text = clean_text(ocr_result.text)
-
-            # Query the ChromaDB for similar documents
-            client = chromadb.PersistentClient(path=os.path.join(settings.BASE_DIR, "db"), 
-                        settings=chromadb.Settings(allow_reset=True, 
-                        persist_directory=os.path.join(settings.BASE_DIR, "db"), is_persistent=True))
-            collection = client.get_or_create_collection(name="documents")
-            results = collection.query(
-                query_texts=[cleaned_text],
-                n_results=5,
-            )
-            predicted_type = max(
-                set(results["metadatas"][0][i]["class"] for i in range(len(results["metadatas"][0]))),
-                key=lambda x: results["metadatas"][0].count(x)
+            # OCR reads straight from the streamed temp file.
+            processor = DocumentProcessor(
+                pipeline_pages=settings.DOCUMENT_PIPELINED_PAGES,
+                classify_pages=settings.DOCUMENT_CLASSIFY_PAGES,
+                page_prefetch=settings.DOCUMENT_PAGE_PREFETCH,
             )
-            logger.info(f"[DocumentProcessingView] Predicted type: {predicted_type}")
-
-            # Remove per-request instantiation
-            # entity_extractor = EntityExtractor()
-            entities = enity_extractor.extract_entities(cleaned_text, predicted_type)
-            logger.info(f"[DocumentProcessingView] Entities: {entities}")
-
-            # Store processed document, type, and entities in ChromaDB
-            collection.upsert(
-                documents=[cleaned_text],
-                metadatas=[{
-                    "class": predicted_type,
-                    "filename": file.name,
-                    "confidence": ocr_result.confidence,
-                    "entities": json.dumps(entities)
-                }],
-                ids=[file.name]
-            )
-
-            # Response
-            response = {
-                "filename": file.name,
-                "document_type": predicted_type,
-                "text": cleaned_text,
-                "entities": entities,
-                "confidence": ocr_result.confidence
-            }
-
+            response = processor.process(DocumentInput(path=file.temporary_file_path(), filename=file.name))
+            # Field names only: entity values are document content and can be large.
+            logger.info("[DocumentProcessingView] %s: %s with %d entity fields %s", file.name, response["document_type"],
+                        len(response["entities"]), sorted(response["entities"]), extra={"event": "document_processed"})
+            if deadline.degraded:
+                response["degraded"] = sorted(deadline.degraded)
             return Response(response, status=status.HTTP_200_OK)
-        
+
         except Exception as e:
+            # A backend timeout surfaces as its own error type; the deadline tells them apart
+            if isinstance(e, DeadlineExceeded) or deadline.expired:
+                logger.warning("[DocumentProcessingView] %s: deadline exceeded: %s", file.name, e, extra={"event": "deadline_exceeded"})
+                return Response({'error': f"Processing did not finish in time: {e}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                headers={'Retry-After': str(admission_controller.retry_after())})
             logger.error(f"Error processing document: {e}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         finally:
-            if file_path:
-                default_storage.delete(file_path)               
+            # Closing the upload deletes its temp file.
+            file.close()
+
+
+class DocumentBatchProcessingView(APIView):
+    """
+    API view to process many documents in one request.
+
+    Accepts any number of `files` parts (documents or zip archives of documents) and
+    streams one NDJSON line per document as it finishes.
+    """
+    parser_classes = (MultiPartParser, FormParser)
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [
+            StreamingUploadHandler(request, allowed_formats=ALLOWED_UPLOAD_FORMATS | {"zip"}, skip_invalid=True)
+        ]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def post(self, request):
+        uploads = request.FILES.getlist('files')
+        skipped = [
+            {"filename": name, "error": message}
+            for name, _, message in getattr(request, 'skipped_uploads', [])
+        ]
+        if not uploads and not skipped:
+            return Response({'error': 'No files provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_files = settings.DOCUMENT_BATCH_MAX_FILES
+        documents, open_files = [], list(uploads)
+        for upload in uploads:
+            if upload.detected_format == "zip":
+                members, zip_skipped = extract_zip_documents(
+                    upload.temporary_file_path(),
+                    max_files=max_files - len(documents),
+                    max_total_bytes=settings.DOCUMENT_BATCH_MAX_BYTES,
+                )
+                open_files.extend(temp_file for _, temp_file in members)
+                documents.extend(DocumentInput(path=temp_file.name, filename=name) for name, temp_file in members)
+                skipped.extend({"filename": name, "error": reason} for name, reason in zip_skipped)
+            elif len(documents) < max_files:
+                documents.append(DocumentInput(path=upload.temporary_file_path(), filename=upload.name))
+            else:
+                skipped.append({"filename": upload.name, "error": f"More than {max_files} files in batch"})
+        logger.info(f"[DocumentBatchProcessingView] {len(documents)} documents, {len(skipped)} skipped")
+
+        def stream():
+            try:
+                for result in skipped:
+                    yield json.dumps(result) + "\n"
+                if documents:
+                    processor = DocumentProcessor(
+                        max_workers=settings.DOCUMENT_BATCH_OCR_WORKERS,
+                        batch_size=settings.DOCUMENT_BATCH_SIZE,
+                    )
+                    for result in processor.process_stream(documents):
+                        yield json.dumps(result) + "\n"
+            finally:
+                # Runs when the response is closed, even if the client disconnects mid-stream.
+                for open_file in open_files:
+                    open_file.close()
+
+        return StreamingHttpResponse(stream(), content_type="application/x-ndjson")
+
+
+class DocumentSearchView(APIView):
+    """
+    API view for top-k semantic search over processed documents.
+
+    Query parameters: `q`, `limit`, `offset`, `document_type`, `min_confidence`, `filename`,
+    `include` (comma-separated: `text`, `embedding`) and `granularity` (`document` or `chunk`,
+    which ranks documents by their best chunks and needs CHUNK_INDEX_ENABLED).
+    """
+
+    def get(self, request):
+        serializer = DocumentSearchQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
 
+        where = build_where(
+            document_class=params.get("document_type"),
+            min_confidence=params.get("min_confidence"),
+            filename=params.get("filename"),
+        )
+        search_kwargs = dict(limit=params["limit"], offset=params["offset"], where=where, include=params["include"])
+        try:
+            if params["granularity"] == "chunk":
+                chunk_index = get_chunk_index()
+                if chunk_index is None:
+                    return Response({'error': 'Chunk index is not enabled'}, status=status.HTTP_400_BAD_REQUEST)
+                results = search_documents_by_chunks(get_documents_collection(), chunk_index, params["q"], **search_kwargs)
+            else:
+                results = search_documents(get_documents_collection(), params["q"], **search_kwargs)
+        except Exception as e:
+            logger.error(f"Error searching documents: {e}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            "query": params["q"],
+            "limit": params["limit"],
+            "offset": params["offset"],
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+
+class DocumentEntityQueryView(APIView):
+    """
+    API view for structured queries over extracted entities.
+
+    Query parameters: `document_type`, repeated `filter=field:operator:value`
+    (operators: eq, contains, gt, gte, lt, lte), `limit` and `offset`.
+    Example: `?document_type=invoice&filter=total_amount:gt:1000&filter=customer_name:contains:acme`
+    """
+
+    def get(self, request):
+        try:
+            filters = [parse_filter(expression) for expression in request.query_params.getlist("filter")]
+            limit = min(int(request.query_params.get("limit", 100)), 1000)
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+            results = query_documents(
+                filters,
+                document_type=request.query_params.get("document_type"),
+                limit=limit,
+                offset=offset,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"limit": limit, "offset": offset, "results": results}, status=status.HTTP_200_OK)
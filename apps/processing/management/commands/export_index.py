@@ -0,0 +1,38 @@
+"""Django command to export the ChromaDB collections as a versioned snapshot"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.documents.entities import entity_index
+from apps.documents.services import COLLECTION_NAME, open_chroma_client
+from ml_pipeline.dataset.chunking import CHUNK_COLLECTION_NAME
+from ml_pipeline.dataset.embeddings import EMBEDDING_MODEL_NAME, get_embedding_function
+from ml_pipeline.dataset.snapshot import export_snapshot
+from services.logger import logger
+
+class Command(BaseCommand):
+    """Write the documents (and chunk) collections, entity rows and dedup index to a checksummed snapshot."""
+    help = ("Export ChromaDB documents and embeddings, the structured entity rows and the near-duplicate index "
+            "to a versioned snapshot that import_index loads without re-embedding (the ingestion manifest is not included)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", type=str, default=None,
+                            help="Snapshot directory (default: INDEX_SNAPSHOT_DIR); a new version is created inside it")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Documents read per ChromaDB call")
+
+    def handle(self, *args, **options):
+        output = options["output"] or str(settings.INDEX_SNAPSHOT_DIR)
+        try:
+            client = open_chroma_client()
+            names = {collection.name if hasattr(collection, "name") else collection for collection in client.list_collections()}
+            collections = {
+                name: client.get_collection(name=name, embedding_function=get_embedding_function())
+                for name in (COLLECTION_NAME, CHUNK_COLLECTION_NAME) if name in names
+            }
+            snapshot_dir = export_snapshot(collections, output, EMBEDDING_MODEL_NAME, batch_size=options["batch_size"],
+                                           entities=entity_index.export_rows(), dedup_dir=str(settings.DEDUP_INDEX_DIR))
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error exporting index: {str(e)}"))
+            return
+        logger.info(f"[export_index] Wrote snapshot {snapshot_dir}")
+        self.stdout.write(self.style.SUCCESS(f"Wrote snapshot {snapshot_dir}"))
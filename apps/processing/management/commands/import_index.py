@@ -0,0 +1,67 @@
+"""Django command to load a ChromaDB snapshot written by export_index"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.documents.entities import entity_index
+from apps.documents.services import COLLECTION_NAME, open_chroma_client
+from ml_pipeline.dataset.embeddings import EMBEDDING_MODEL_NAME, get_embedding_function
+from ml_pipeline.dataset.snapshot import (
+    SnapshotError, import_snapshot, read_snapshot_entities, resolve_snapshot, restore_dedup_index, verify_snapshot,
+)
+from services.logger import logger
+
+class Command(BaseCommand):
+    """Verify a snapshot and load it, replacing the collections, entity rows and dedup index it contains."""
+    help = ("Verify and load an index snapshot: ChromaDB collections (stored embeddings are used as-is, nothing is "
+            "re-embedded), structured entity rows and the near-duplicate index. The ingestion manifest is not restored")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--snapshot", type=str, default=None,
+                            help="Snapshot version directory, or a directory whose LATEST file names one "
+                                 "(default: INDEX_SNAPSHOT_DIR)")
+        parser.add_argument("--verify-only", action="store_true", help="Check checksums and shapes without loading")
+        parser.add_argument("--if-empty", action="store_true",
+                            help="Skip the import when the documents collection already has documents (for startup)")
+        parser.add_argument("--optional", action="store_true", help="A missing snapshot is not an error")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Documents added per ChromaDB call")
+
+    def handle(self, *args, **options):
+        path = options["snapshot"] or str(settings.INDEX_SNAPSHOT_DIR)
+        try:
+            snapshot_dir = resolve_snapshot(path)
+        except SnapshotError as e:
+            if options["optional"]:
+                self.stdout.write(f"{e}; starting without a snapshot")
+                return
+            self.stderr.write(self.style.ERROR(str(e)))
+            return
+
+        start = time.perf_counter()
+        try:
+            if options["verify_only"]:
+                manifest = verify_snapshot(snapshot_dir, EMBEDDING_MODEL_NAME)
+                self.stdout.write(self.style.SUCCESS(f"Snapshot {manifest['version']} is valid"))
+                return
+            client = open_chroma_client()
+            if options["if_empty"]:
+                documents = client.get_or_create_collection(name=COLLECTION_NAME, embedding_function=get_embedding_function())
+                if documents.count():
+                    self.stdout.write(f"Index already has {documents.count()} documents; snapshot not loaded")
+                    return
+            manifest = import_snapshot(snapshot_dir, client, get_embedding_function(), EMBEDDING_MODEL_NAME,
+                                       batch_size=options["batch_size"])
+            if "entities" in manifest:
+                entity_index.replace_all(read_snapshot_entities(snapshot_dir), batch_size=options["batch_size"])
+            if "dedup" in manifest:
+                restore_dedup_index(snapshot_dir, str(settings.DEDUP_INDEX_DIR))
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error importing index: {str(e)}"))
+            return
+        counts = {name: entry["count"] for name, entry in manifest["collections"].items()}
+        counts.update({key: manifest[key]["count"] for key in ("entities", "dedup") if key in manifest})
+        seconds = time.perf_counter() - start
+        logger.info(f"[import_index] Loaded snapshot {manifest['version']} {counts} in {seconds:.1f}s")
+        self.stdout.write(self.style.SUCCESS(f"Loaded snapshot {manifest['version']} {counts} in {seconds:.1f}s"))
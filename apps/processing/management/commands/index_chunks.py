@@ -0,0 +1,27 @@
+"""Django command to chunk documents that were indexed before chunk indexing was enabled"""
+
+from django.core.management.base import BaseCommand
+
+from apps.documents.services import get_chunk_index, get_documents_collection
+from services.logger import logger
+
+class Command(BaseCommand):
+    """Backfill the `document_chunks` collection from the documents already stored in ChromaDB."""
+    help = "Chunk stored ChromaDB documents that have no chunks yet (requires CHUNK_INDEX_ENABLED=1)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=256, help="Documents read per ChromaDB call")
+        parser.add_argument("--reindex", action="store_true", help="Re-chunk documents that already have chunks")
+
+    def handle(self, *args, **options):
+        chunk_index = get_chunk_index()
+        if chunk_index is None:
+            self.stderr.write(self.style.ERROR("Chunk indexing is disabled; set CHUNK_INDEX_ENABLED=1"))
+            return
+        try:
+            counts = chunk_index.backfill(get_documents_collection(), batch_size=options["batch_size"], reindex=options["reindex"])
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error chunking documents: {str(e)}"))
+            return
+        logger.info(f"[index_chunks] Chunked {counts['indexed']} of {counts['documents']} documents")
+        self.stdout.write(self.style.SUCCESS(f"Chunked {counts['indexed']} of {counts['documents']} documents"))
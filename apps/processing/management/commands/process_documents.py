@@ -1,22 +1,22 @@
 """Django command to process documents"""
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 import os
+import signal
 
+from apps.documents.entities import entity_index
+from apps.documents.services import get_dedup_index
 from ml_pipeline.dataset.generator import TextDatasetGenerator
-from ml_pipeline.ocr.google_cloud_vision import GoogleCloudVisionOCRProcessor
-from ml_pipeline.ocr.pipeline import OCRPipeline
+from ml_pipeline.dataset.sharded import OCR_ENGINES, ShardedIngestor, build_ocr_pipeline
+from ml_pipeline.dataset.watcher import WatchIngestor, open_watcher, write_metrics
 from services.logger import logger
+from services.metrics import registry
 
 class Command(BaseCommand):
     """Django management command to process documents and upsert into ChromaDB."""
     help = "Process documents in class-based subfolders and upsert into ChromaDB"
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.ocr_processor = GoogleCloudVisionOCRProcessor()
-        self.ocr_pipeline = OCRPipeline(processor=self.ocr_processor)
-
     def add_arguments(self, parser):
         parser.add_argument(
             "--input_dir",
@@ -24,6 +24,26 @@ class Command(BaseCommand):
             required=True,
             help="Directory containing document images in class-based subfolders"
         )
+        parser.add_argument("--ocr", choices=OCR_ENGINES, default="vision", help="OCR engine")
+        parser.add_argument("--processes", type=int, default=1,
+                            help="Worker processes for OCR and entity extraction; results are written by this process")
+        parser.add_argument("--prometheus-textfile", type=str, default=None,
+                            help="Write stage latencies and counters in Prometheus text format to this file when done "
+                                 "(and every --metrics-interval in watch mode)")
+        parser.add_argument("--watch", action="store_true",
+                            help="After the initial pass, keep watching --input_dir and ingest files as they land")
+        parser.add_argument("--workers", type=int, default=2, help="Watch mode: files processed concurrently")
+        parser.add_argument("--queue-size", type=int, default=64,
+                            help="Watch mode: files waiting for a worker before the watcher blocks")
+        parser.add_argument("--debounce", type=float, default=2.0,
+                            help="Watch mode: seconds a file must stay unchanged before it is ingested")
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="Watch mode: rescan interval when inotify is unavailable")
+        parser.add_argument("--no-inotify", action="store_true", help="Watch mode: always poll")
+        parser.add_argument("--metrics-file", type=str, default=None,
+                            help="Watch mode: write queue depth and ingest lag as JSON to this file")
+        parser.add_argument("--metrics-interval", type=float, default=30.0,
+                            help="Watch mode: seconds between metrics log lines and --metrics-file updates")
 
     def handle(self, *args, **options):
         input_dir = options["input_dir"]
@@ -32,13 +52,72 @@ class Command(BaseCommand):
         if not os.path.isdir(input_dir):
             self.stderr.write(self.style.ERROR(f"Input directory {input_dir} does not exist"))
             return
+        if options["watch"] and options["processes"] > 1:
+            self.stderr.write(self.style.ERROR("--watch and --processes cannot be combined; use --workers in watch mode"))
+            return
 
         try:
             generator = TextDatasetGenerator(
                 input_dir=input_dir,
-                config={"language_hints": ["en"], "ocr_processor_pipeline": self.ocr_pipeline}
+                config={
+                    "language_hints": ["en"],
+                    "ocr_processor_pipeline": build_ocr_pipeline(options["ocr"]),
+                    "entity_index": entity_index,
+                    "chunk_index": settings.CHUNK_INDEX_CONFIG if settings.CHUNK_INDEX_ENABLED else None,
+                    "dedup_index": get_dedup_index(),
+                    "manifest_path": str(settings.INGESTION_MANIFEST_PATH),
+                }
             )
-            generator.generate()
+            if options["watch"]:
+                self.watch(generator, options)
+            elif options["processes"] > 1:
+                ShardedIngestor(generator, options["processes"], ocr_engine=options["ocr"]).run()
+            else:
+                generator.generate()
             self.stdout.write(self.style.SUCCESS(f"Successfully processed documents from {input_dir}"))
         except Exception as e:
-            self.stderr.write(self.style.ERROR(f"Error processing documents: {str(e)}"))
\ No newline at end of file
+            self.stderr.write(self.style.ERROR(f"Error processing documents: {str(e)}"))
+        finally:
+            if options["prometheus_textfile"] and registry.enabled:
+                registry.write_textfile(options["prometheus_textfile"])
+
+    def watch(self, generator: TextDatasetGenerator, options) -> None:
+        """Ingest existing files, then new or changed ones as they land, until SIGINT/SIGTERM."""
+        manifest = generator.open_manifest()
+
+        def process(path: str) -> str:
+            entry = generator.entry_for_path(path)
+            if entry is None:
+                return "ignored"
+            outcome = generator.process_file(manifest, *entry)
+            manifest.commit()
+            return outcome
+
+        def on_tick(ingestor: WatchIngestor) -> None:
+            snapshot = ingestor.metrics.snapshot()
+            logger.info(f"[process_documents] Watch metrics: {snapshot}")
+            if options["metrics_file"]:
+                write_metrics(options["metrics_file"], ingestor.metrics)
+            if options["prometheus_textfile"] and registry.enabled:
+                registry.write_textfile(options["prometheus_textfile"])
+            if generator.dedup_index is not None:
+                generator.dedup_index.flush()
+
+        ingestor = WatchIngestor(
+            open_watcher(generator.input_dir, options["poll_interval"], use_inotify=not options["no_inotify"]),
+            process,
+            workers=options["workers"],
+            queue_size=options["queue_size"],
+            debounce_seconds=options["debounce"],
+            on_tick=on_tick,
+            tick_seconds=options["metrics_interval"],
+        )
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: ingestor.stop())
+        logger.info(f"[process_documents] Watching {generator.input_dir} with {options['workers']} workers")
+        try:
+            ingestor.run(initial_paths=[path for _, _, _, path in generator.iter_files()])
+        finally:
+            manifest.close()
+            if generator.dedup_index is not None:
+                generator.dedup_index.save()
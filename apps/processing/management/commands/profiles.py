@@ -0,0 +1,66 @@
+"""Django command to list and summarize stored request profiles"""
+
+import io
+import pstats
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from services.profiling import ProfileStore
+
+
+class Command(BaseCommand):
+    """List the slowest profiled requests in PROFILE_DIR, or show where one of them spent its time."""
+    help = "List the slowest stored request profiles, or summarize one with --id"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", type=str, default=None, help="Profile directory (default: PROFILE_DIR)")
+        parser.add_argument("--limit", type=int, default=10, help="Number of profiles to list, slowest first")
+        parser.add_argument("--top", type=int, default=1, help="Top functions shown per listed profile")
+        parser.add_argument("--id", type=str, default=None, help="Show one profile in detail")
+
+    def handle(self, *args, **options):
+        store = ProfileStore(options["dir"] or str(settings.PROFILE_DIR))
+        summaries = store.summaries()
+        if options["id"]:
+            summary = next((s for s in summaries if s["id"] == options["id"]), None)
+            if summary is None:
+                self.stderr.write(self.style.ERROR(f"No profile {options['id']} in {store.directory}"))
+                return
+            self._show(store, summary)
+            return
+        if not summaries:
+            self.stdout.write(f"No profiles in {store.directory}")
+            return
+        self.stdout.write(f"{len(summaries)} profiles in {store.directory}, slowest first:")
+        for summary in summaries[:options["limit"]]:
+            labels = summary.get("labels", {})
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(summary.get("started_at", 0)))
+            self.stdout.write(
+                f"{summary['id']}  {summary['seconds']:8.3f}s  {started}  status={labels.get('status')}  "
+                f"{summary.get('trigger')}/{summary.get('mode')}  {labels.get('filename') or labels.get('path', '')}")
+            for row in summary.get("top", [])[:options["top"]]:
+                self.stdout.write(f"    {self._format_row(summary, row)}")
+
+    def _format_row(self, summary, row) -> str:
+        if summary.get("mode") == "cprofile":
+            return f"{row['self_seconds']:8.3f}s self {row['total_seconds']:8.3f}s total {row['calls']:>8} calls  {row['frame']}"
+        samples = summary.get("samples") or 1
+        return f"{row['self'] / samples:7.1%} self {row['total'] / samples:7.1%} total  {row['frame']}"
+
+    def _show(self, store: ProfileStore, summary) -> None:
+        self.stdout.write(f"Profile {summary['id']}: {summary['seconds']:.3f}s, {summary.get('trigger')}/{summary.get('mode')}")
+        for key, value in sorted(summary.get("labels", {}).items()):
+            self.stdout.write(f"  {key}: {value}")
+        data_path = store.data_path(summary["id"])
+        if summary.get("mode") == "cprofile" and data_path:
+            output = io.StringIO()
+            pstats.Stats(data_path, stream=output).sort_stats("cumulative").print_stats(25)
+            self.stdout.write(output.getvalue())
+        else:
+            self.stdout.write("Top functions by self time:")
+            for row in summary.get("top", []):
+                self.stdout.write(f"  {self._format_row(summary, row)}")
+        if data_path:
+            self.stdout.write(f"Data: {data_path}")
@@ -0,0 +1,30 @@
+"""Django command to re-apply the current text normalization to stored documents"""
+
+from django.core.management.base import BaseCommand
+
+from apps.documents.services import get_chunk_index, get_documents_collection
+from ml_pipeline.dataset.utils import renormalize_documents
+from services.logger import logger
+
+class Command(BaseCommand):
+    """Re-clean every document in ChromaDB with `clean_text` so stored and query text match."""
+    help = "Re-normalize stored ChromaDB documents with the current clean_text (re-embeds changed documents)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=256, help="Documents read and updated per ChromaDB call")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the documents that would change")
+
+    def handle(self, *args, **options):
+        try:
+            counts = renormalize_documents(
+                get_documents_collection(),
+                chunk_index=get_chunk_index(),
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+            )
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error re-normalizing documents: {str(e)}"))
+            return
+        action = "would change" if options["dry_run"] else "updated"
+        logger.info(f"[renormalize_documents] {counts['changed']} of {counts['documents']} documents {action}")
+        self.stdout.write(self.style.SUCCESS(f"{counts['changed']} of {counts['documents']} documents {action}"))
@@ -0,0 +1,156 @@
+"""
+Overload test for the processing endpoint's admission control and deadlines.
+
+Requests arrive open-loop at `--rate` per second for `--seconds`, each on its own thread,
+like connections piling up in a worker. Every request runs OCR → extract against the fake
+Vision and Ollama servers (benchmarks/fakes.py). Both modes process `--max-concurrent` requests
+at a time, so they have the same capacity:
+
+- unbounded: everyone waits for a slot, with no deadline (the old behaviour)
+- admission: AdmissionController with a bounded queue, plus a per-request Deadline that lowers
+  backend timeouts and skips the Ollama call when less than `--llm-min-seconds` is left
+
+Reports status counts, goodput and p50/p99 latency (from arrival) per mode as JSON. Under
+overload, the unbounded p99 keeps growing with the run length. With admission control it stays
+near the deadline, and the excess is turned away quickly with 429/503.
+
+Usage:
+    python -m benchmarks.admission_load --rate 6 --seconds 30 --max-concurrent 2 --vision-ms 150 --ollama-ms 800
+    python -m benchmarks.admission_load --modes admission --deadline 5 --max-queued 4
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fakes import FakeOllamaServer, FakeVisionServer
+from benchmarks.pipeline_e2e import percentile, sample_files
+from ml_pipeline.dataset.sharded import build_ocr_pipeline
+from ml_pipeline.dataset.utils import clean_text
+from ml_pipeline.entity_extractor.extractor import EntityExtractor
+from ml_pipeline.ocr.pipeline import OCRPipeline
+from services.admission import AdmissionController, Deadline, DeadlineExceeded, Overloaded, deadline_scope
+
+
+class LoadTest:
+    """Fires requests at a fixed rate and records (status, latency) for each."""
+
+    def __init__(self, ocr_pipeline: OCRPipeline, extractor: EntityExtractor, files: List[str]):
+        self.ocr_pipeline = ocr_pipeline
+        self.extractor = extractor
+        self.files = files
+        self.results: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def work(self, path: str) -> None:
+        ocr_result = self.ocr_pipeline.process_file(path)
+        self.extractor.extract_entities(clean_text(ocr_result.text), "invoice", blocks=ocr_result.blocks)
+
+    def unbounded(self, slots: threading.Semaphore) -> Callable[[str], str]:
+        def handle(path: str) -> str:
+            with slots:
+                self.work(path)
+            return "200"
+        return handle
+
+    def admission(self, controller: AdmissionController, deadline_seconds: float) -> Callable[[str], str]:
+        def handle(path: str) -> str:
+            deadline = Deadline(deadline_seconds)
+            try:
+                with controller.admit(deadline), deadline_scope(deadline):
+                    self.work(path)
+            except Overloaded as e:
+                return str(e.status)
+            except Exception as e:
+                if isinstance(e, DeadlineExceeded) or deadline.expired:
+                    return "503"
+                return "500"
+            return "200 degraded" if deadline.degraded else "200"
+        return handle
+
+    def run(self, handle: Callable[[str], str], rate: float, seconds: float) -> Dict:
+        self.results = []
+        threads = []
+
+        def request(path: str, arrived: float) -> None:
+            status = handle(path)
+            with self._lock:
+                self.results.append((status, time.perf_counter() - arrived))
+
+        start = time.perf_counter()
+        for i in range(int(rate * seconds)):
+            # Open loop: arrivals do not wait for earlier requests to finish
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            thread = threading.Thread(target=request, args=(self.files[i % len(self.files)], time.perf_counter()))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return self.report(time.perf_counter() - start)
+
+    def report(self, elapsed: float) -> Dict:
+        statuses = Counter(status for status, _ in self.results)
+        ok = [latency for status, latency in self.results if status.startswith("200")]
+        rejected = [latency for status, latency in self.results if status in ("429", "503")]
+        return {
+            "requests": len(self.results),
+            "statuses": dict(sorted(statuses.items())),
+            "seconds": round(elapsed, 2),
+            "goodput_per_second": round(len(ok) / elapsed, 2),
+            "ok_p50_ms": round(percentile(ok, 50) * 1000, 1) if ok else None,
+            "ok_p99_ms": round(percentile(ok, 99) * 1000, 1) if ok else None,
+            "rejected_p99_ms": round(percentile(rejected, 99) * 1000, 1) if rejected else None,
+            "all_p99_ms": round(percentile([latency for _, latency in self.results], 99) * 1000, 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default="samples")
+    parser.add_argument("--modes", nargs="+", choices=["unbounded", "admission"], default=["unbounded", "admission"])
+    parser.add_argument("--rate", type=float, default=6.0, help="Arrivals per second")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Length of the arrival phase")
+    parser.add_argument("--max-concurrent", type=int, default=2, help="Requests processed at once (both modes)")
+    parser.add_argument("--max-queued", type=int, default=4)
+    parser.add_argument("--max-wait", type=float, default=5.0, help="Longest queue wait, seconds")
+    parser.add_argument("--deadline", type=float, default=8.0, help="Request deadline, seconds")
+    parser.add_argument("--min-service-seconds", type=float, default=1.0)
+    parser.add_argument("--llm-min-seconds", type=float, default=2.0, help="Skip Ollama with less time than this left")
+    parser.add_argument("--vision-ms", type=float, default=150.0, help="Fake Vision latency")
+    parser.add_argument("--ollama-ms", type=float, default=800.0, help="Fake Ollama latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform jitter added to both fakes")
+    args = parser.parse_args()
+
+    files = sample_files(args.samples)
+    if not files:
+        raise SystemExit(f"No sample files found in {args.samples}")
+
+    report: Dict[str, Optional[Dict]] = {
+        "config": {k: getattr(args, k) for k in ("rate", "seconds", "max_concurrent", "max_queued", "max_wait", "deadline",
+                                                 "llm_min_seconds", "vision_ms", "ollama_ms", "jitter_ms")},
+    }
+    with FakeVisionServer(args.vision_ms, args.jitter_ms) as vision, FakeOllamaServer(args.ollama_ms, args.jitter_ms) as ollama:
+        load_test = LoadTest(
+            build_ocr_pipeline("vision", vision.url),
+            EntityExtractor(use_ollama=True, ollama_url=ollama.url, llm_min_seconds=args.llm_min_seconds),
+            files,
+        )
+        # Warm up connections outside the measured runs.
+        load_test.work(files[0])
+        for mode in args.modes:
+            if mode == "unbounded":
+                handle = load_test.unbounded(threading.Semaphore(args.max_concurrent))
+            else:
+                controller = AdmissionController(args.max_concurrent, args.max_queued, args.max_wait, args.min_service_seconds)
+                handle = load_test.admission(controller, args.deadline)
+            report[mode] = load_test.run(handle, args.rate, args.seconds)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
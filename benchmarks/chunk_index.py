@@ -0,0 +1,96 @@
+"""
+Index size and query latency of chunk-level vs. whole-document indexing.
+
+Builds throwaway collections from synthetic multi-page documents for several
+window/overlap settings and reports chunks stored, build time, on-disk size and
+query latency, next to the single-embedding-per-document baseline.
+
+Usage:
+    python -m benchmarks.chunk_index --documents 200 --words 3000 --windows 120:20 180:40 240:60
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from ml_pipeline.dataset.chunking import ChunkIndex
+from ml_pipeline.dataset.embeddings import get_embedding_function
+
+VOCABULARY = (
+    "invoice total amount due customer payment date memo report budget department approval "
+    "contract agreement signature tobacco research study results analysis form questionnaire "
+    "letter dear sincerely product price company market advertisement fiscal year summary"
+).split()
+
+
+def synthetic_documents(count: int, words: int, rng: random.Random):
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(words)) for _ in range(count)]
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def percentiles(latencies):
+    return {f"p{q}_ms": round(float(np.percentile(latencies, q)) * 1000, 2) for q in (50, 95)}
+
+
+def run(documents, queries, window_words=None, overlap_words=None):
+    with tempfile.TemporaryDirectory() as path:
+        client = chromadb.PersistentClient(path=path)
+        collection = client.create_collection(name="bench", embedding_function=get_embedding_function())
+        start = time.perf_counter()
+        if window_words is None:
+            for i in range(0, len(documents), 64):
+                batch = documents[i:i + 64]
+                collection.add(documents=batch, ids=[f"doc-{i + j}" for j in range(len(batch))],
+                               metadatas=[{"class": "bench"} for _ in batch])
+            query = lambda text: collection.query(query_texts=[text], n_results=5)
+        else:
+            index = ChunkIndex(collection, {"window_words": window_words, "overlap_words": overlap_words})
+            for i, text in enumerate(documents):
+                index.index(f"doc-{i}", text, {"class": "bench"})
+            query = lambda text: index.query(text, n_results=5)
+        build_seconds = time.perf_counter() - start
+
+        latencies = []
+        for text in queries:
+            start = time.perf_counter()
+            query(text)
+            latencies.append(time.perf_counter() - start)
+        return {
+            "mode": "document" if window_words is None else f"chunks {window_words}/{overlap_words}",
+            "vectors": collection.count(),
+            "build_seconds": round(build_seconds, 2),
+            "disk_bytes": directory_size(path),
+            **percentiles(latencies),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--words", type=int, default=3000, help="Words per document (~10 pages)")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--windows", nargs="+", default=["120:20", "180:40", "240:60"], help="window:overlap in words")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    documents = synthetic_documents(args.documents, args.words, rng)
+    queries = synthetic_documents(args.queries, 400, rng)
+
+    report = [run(documents, queries)]
+    for window in args.windows:
+        window_words, overlap_words = (int(v) for v in window.split(":"))
+        report.append(run(documents, queries, window_words, overlap_words))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
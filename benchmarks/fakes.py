@@ -0,0 +1,184 @@
+"""
+Local stand-ins for Google Cloud Vision (REST `images:annotate`) and Ollama (`/api/generate`).
+
+Both answer with canned, realistically shaped payloads after a configurable latency, so the
+pipeline can be benchmarked end to end without network access, credentials or a local LLM:
+
+    with FakeVisionServer(latency_ms=150) as vision, FakeOllamaServer(latency_ms=800) as ollama:
+        processor = GoogleCloudVisionOCRProcessor({"api_endpoint": vision.url})
+        extractor = EntityExtractor(use_ollama=True, ollama_url=ollama.url)
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+DOCUMENT_TEXTS = [
+    "INVOICE\nInvoice Number: INV-10432\nDate: 2023-01-01\nBill To: Acme Corporation\n12 Main Street, Springfield\n"
+    "Description Qty Unit Price Amount\nConsulting services 10 $100.00 $1,000.00\nTotal Amount Due: $1,000.00",
+    "MEMORANDUM\nTo: Research Department\nFrom: J. Smith\nDate: March 3, 1998\nSubject: Budget approval for fiscal year 1999\n"
+    "Please review the attached budget summary and confirm the department totals before Friday.",
+    "NEW! Try the smooth taste of Springfield Lights today.\nAvailable at all participating stores.\n"
+    "Limited time offer: save $1.00 on any two packs. Call 1-800-555-0199 for details.",
+]
+
+ENTITY_RESPONSES = {
+    "invoice": {"invoice_number": "INV-10432", "date": "2023-01-01", "total_amount": "$1,000.00", "customer_name": "Acme Corporation"},
+    "memo": {"to": "Research Department", "from": "J. Smith", "date": "March 3, 1998", "subject": "Budget approval"},
+}
+
+
+def _sleep(latency_ms: float, jitter_ms: float) -> None:
+    delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+    if delay > 0:
+        time.sleep(delay / 1000.0)
+
+
+def _vision_box(x: int, y: int, width: int, height: int) -> Dict:
+    return {"vertices": [{"x": x, "y": y}, {"x": x + width, "y": y},
+                         {"x": x + width, "y": y + height}, {"x": x, "y": y + height}]}
+
+
+def vision_annotation(text: str, lines_per_block: int = 1) -> Dict:
+    """
+    A fullTextAnnotation in the Vision REST JSON shape: `lines_per_block` lines per block, one
+    symbol per character, word boxes, and detected breaks marking the end of each line.
+    """
+    lines = text.splitlines()
+    blocks: List[Dict] = []
+    for first in range(0, len(lines), lines_per_block):
+        block_lines = lines[first:first + lines_per_block]
+        words = []
+        for offset, line in enumerate(block_lines):
+            y = 40 + 30 * (first + offset)
+            x = 40
+            line_words = line.split()
+            for index, word in enumerate(line_words):
+                symbols = [{"text": character} for character in word]
+                break_type = "EOL_SURE_SPACE" if index == len(line_words) - 1 else "SPACE"
+                symbols[-1]["property"] = {"detectedBreak": {"type": break_type}}
+                words.append({"confidence": 0.97, "boundingBox": _vision_box(x, y, 12 * len(word), 24), "symbols": symbols})
+                x += 12 * (len(word) + 1)
+        width = 12 * max(len(line) for line in block_lines)
+        blocks.append({
+            "blockType": "TEXT",
+            "confidence": 0.97,
+            "boundingBox": _vision_box(40, 40 + 30 * first, width, 30 * len(block_lines) - 6),
+            "paragraphs": [{"words": words}],
+        })
+    return {
+        "text": text + "\n",
+        "pages": [{
+            "width": 1700,
+            "height": 2200,
+            "property": {"detectedLanguages": [{"languageCode": "en", "confidence": 0.99}]},
+            "blocks": blocks,
+        }],
+    }
+
+
+class _FakeServer:
+    """Runs a ThreadingHTTPServer on an ephemeral local port in a daemon thread."""
+
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        handler = type(self.handler_class.__name__, (self.handler_class,), {"fake": self})
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "_FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    fake: _FakeServer
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, body: Dict, status: int = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _VisionHandler(_JSONHandler):
+    def do_POST(self) -> None:
+        if not self.path.startswith("/v1/images:annotate"):
+            self._send_json({"error": {"code": 404, "message": f"Unknown path {self.path}"}}, status=404)
+            return
+        body = self._read_json()
+        self.fake.count_request()
+        _sleep(self.fake.latency_ms, self.fake.jitter_ms)
+        responses = []
+        for request in body.get("requests", []):
+            content = request.get("image", {}).get("content", "")
+            # The same image always gets the same text; different images spread over the templates.
+            text = DOCUMENT_TEXTS[int(hashlib.sha1(content.encode()).hexdigest(), 16) % len(DOCUMENT_TEXTS)]
+            responses.append({"fullTextAnnotation": vision_annotation(text)})
+        self._send_json({"responses": responses})
+
+
+class _OllamaHandler(_JSONHandler):
+    def do_POST(self) -> None:
+        if self.path != "/api/generate":
+            self._send_json({"error": f"Unknown path {self.path}"}, status=404)
+            return
+        body = self._read_json()
+        self.fake.count_request()
+        _sleep(self.fake.latency_ms, self.fake.jitter_ms)
+        prompt = body.get("prompt", "")
+        document_type = next((t for t in ENTITY_RESPONSES if f"for a {t}" in prompt), None)
+        entities = ENTITY_RESPONSES.get(document_type, {"title": "Untitled"})
+        self._send_json({
+            "model": body.get("model"),
+            "response": "Here are the extracted fields:\n" + json.dumps(entities),
+            "done": True,
+        })
+
+
+class FakeVisionServer(_FakeServer):
+    """Answers POST /v1/images:annotate with a full text annotation of a canned document."""
+    handler_class = _VisionHandler
+
+
+class FakeOllamaServer(_FakeServer):
+    """Answers POST /api/generate with a JSON object of canned entities for the prompted document type."""
+    handler_class = _OllamaHandler
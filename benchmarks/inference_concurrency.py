@@ -0,0 +1,65 @@
+"""
+Measure inference server throughput under concurrent clients.
+
+Start the server first:
+    python -m ml_pipeline.inference.server --max-wait-ms 5
+
+Then run:
+    python -m benchmarks.inference_concurrency --url http://127.0.0.1:8765 --clients 1 4 16
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ml_pipeline.inference.client import InferenceClient
+
+SAMPLE_TEXT = (
+    "Invoice 10432 from Acme Corporation, 12 Main Street, Springfield, dated 2023-01-01. "
+    "Bill to John Doe. Total amount due $1,250.00."
+)
+
+
+def run(url: str, endpoint: str, clients: int, requests_per_client: int) -> dict:
+    def worker(_):
+        client = InferenceClient(url)
+        call = client.embed if endpoint == "embed" else client.ner
+        latencies = []
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            call([SAMPLE_TEXT])
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = sorted(l for ls in pool.map(worker, range(clients)) for l in ls)
+    elapsed = time.perf_counter() - start
+    return {
+        "endpoint": endpoint,
+        "clients": clients,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    args = parser.parse_args()
+
+    results = [
+        run(args.url, endpoint, clients, args.requests)
+        for endpoint in ("embed", "ner")
+        for clients in args.clients
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Ingestion throughput vs. number of worker processes on a Tesseract corpus.
+
+Replicates the `samples/` tree (class subfolders) to `--images` files, then ingests it
+into a throwaway ChromaDB directory sequentially and with `ShardedIngestor` for each
+process count, reporting wall time, documents/second and speedup over the sequential run.
+Entity extraction uses NER (`use_ollama=False`) so a local LLM does not bound throughput.
+
+Usage:
+    python -m benchmarks.ingestion_scaling --images 2000 --processes 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from ml_pipeline.dataset.generator import TextDatasetGenerator
+from ml_pipeline.dataset.sharded import ShardedIngestor, build_ocr_pipeline
+from ml_pipeline.entity_extractor.extractor import EntityExtractor
+
+
+def replicate_samples(samples_dir: str, target_dir: str, images: int) -> int:
+    """Hard-link (or copy) sample files into target_dir/<class>/ until `images` files exist."""
+    sources = [
+        (class_name, os.path.join(samples_dir, class_name, filename))
+        for class_name in sorted(os.listdir(samples_dir)) if os.path.isdir(os.path.join(samples_dir, class_name))
+        for filename in sorted(os.listdir(os.path.join(samples_dir, class_name)))
+    ]
+    if not sources:
+        raise SystemExit(f"No sample files found in {samples_dir}")
+    for i in range(images):
+        class_name, source = sources[i % len(sources)]
+        os.makedirs(os.path.join(target_dir, class_name), exist_ok=True)
+        target = os.path.join(target_dir, class_name, f"{i:06d}-{os.path.basename(source)}")
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+    return images
+
+
+def run(corpus_dir: str, processes: int) -> dict:
+    with tempfile.TemporaryDirectory() as db_path:
+        generator = TextDatasetGenerator(corpus_dir, {"ocr_processor_pipeline": build_ocr_pipeline("tesseract"), "db_path": db_path})
+        start = time.perf_counter()
+        if processes == 0:
+            generator.entity_extractor = EntityExtractor(use_ollama=False)
+            counts = generator.generate()
+        else:
+            counts = ShardedIngestor(generator, processes, ocr_engine="tesseract",
+                                     extractor_kwargs={"use_ollama": False}).run()
+        documents = counts["processed"] + counts["duplicate"]
+        elapsed = time.perf_counter() - start
+    return {"processes": processes or "sequential", "files": documents, "errors": counts["error"], "seconds": round(elapsed, 2),
+            "docs_per_second": round(documents / elapsed, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default="samples")
+    parser.add_argument("--images", type=int, default=2000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        replicate_samples(args.samples, corpus_dir, args.images)
+        results = [run(corpus_dir, 0)] + [run(corpus_dir, n) for n in args.processes]
+    baseline = results[0]["seconds"]
+    for result in results:
+        result["speedup"] = round(baseline / result["seconds"], 2)
+    print(json.dumps({"images": args.images, "cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Report per-worker PSS for gunicorn with 1/2/4 workers, with and without preloading.
+
+Usage:
+    python -m benchmarks.memory_workers [--workers 1 2 4] [--settle 60]
+
+Reads /proc/<pid>/smaps_rollup, so it only runs on Linux.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+
+def read_pss_kb(pid: int) -> int:
+    """Return the proportional set size of a process in kB."""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def child_pids(pid: int) -> List[int]:
+    """Return the direct children of a process."""
+    path = f"/proc/{pid}/task/{pid}/children"
+    with open(path) as f:
+        return [int(p) for p in f.read().split()]
+
+
+def measure(workers: int, preload: bool, settle: float, port: int) -> Dict[str, object]:
+    """Start gunicorn, wait for the workers to settle and collect PSS for master and workers."""
+    env = dict(os.environ)
+    env.update({
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_PRELOAD": "1" if preload else "0",
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "config/gunicorn_conf.py", "config.wsgi:application"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        # Workers load their models lazily without preload, so wait the full settle time in both modes.
+        time.sleep(settle)
+        worker_pids = child_pids(proc.pid)
+        master_kb = read_pss_kb(proc.pid)
+        workers_kb = [read_pss_kb(pid) for pid in worker_pids]
+        return {
+            "workers": workers,
+            "preload": preload,
+            "master_pss_mb": round(master_kb / 1024, 1),
+            "worker_pss_mb": [round(kb / 1024, 1) for kb in workers_kb],
+            "total_pss_mb": round((master_kb + sum(workers_kb)) / 1024, 1),
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--settle", type=float, default=60.0, help="Seconds to wait for model loading")
+    parser.add_argument("--port", type=int, default=8091)
+    args = parser.parse_args()
+
+    results = []
+    for preload in (False, True):
+        for workers in args.workers:
+            results.append(measure(workers, preload, args.settle, args.port))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+End-to-end pipeline benchmark: OCR → clean → dedup → classify → extract → upsert over `samples/`.
+
+Each file goes through the service's DocumentProcessor. Vision and Ollama are replaced by local
+fakes (benchmarks/fakes.py) with configurable latency; ChromaDB runs in a throwaway directory
+seeded with one document per class, and entity rows go to a throwaway test database. Near-duplicate
+detection is off unless `--dedup` is given, since repeated passes would otherwise skip classification
+and extraction. Reports per-stage p50/p95/p99 latency (from every stage timer observation),
+throughput and peak RSS as JSON. Pass `--output` to save a run and `--baseline` to add per-stage
+p95 changes against a saved run.
+
+Usage:
+    python -m benchmarks.pipeline_e2e --repeat 5 --workers 4 --vision-ms 150 --ollama-ms 800 --output run.json
+    python -m benchmarks.pipeline_e2e --repeat 5 --workers 4 --baseline run.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import chromadb
+
+from benchmarks.fakes import DOCUMENT_TEXTS, FakeOllamaServer, FakeVisionServer
+from ml_pipeline.dataset.dedup import NearDuplicateIndex
+from ml_pipeline.dataset.embeddings import get_embedding_function
+from ml_pipeline.dataset.sharded import build_ocr_pipeline
+from ml_pipeline.dataset.utils import clean_text
+from ml_pipeline.entity_extractor.extractor import EntityExtractor
+from services.metrics import STAGE_SECONDS
+
+STAGES = ["ocr", "clean", "dedup", "classify", "extract", "upsert", "total"]
+# Class labels as stored in the index: the samples/ folder names
+SEED_CLASSES = ["invoice", "memo", "advertisiment"]
+
+
+def sample_files(samples_dir: str) -> List[str]:
+    return [
+        os.path.join(samples_dir, class_name, filename)
+        for class_name in sorted(os.listdir(samples_dir)) if os.path.isdir(os.path.join(samples_dir, class_name))
+        for filename in sorted(os.listdir(os.path.join(samples_dir, class_name)))
+    ]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def summarize(timings: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        stage: {f"p{q}_ms": round(percentile(values, q) * 1000, 2) for q in (50, 95, 99)}
+        for stage, values in timings.items() if values
+    }
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageRecorder:
+    """Keeps every STAGE_SECONDS observation of the stages in STAGES, so percentiles are exact rather than bucketed."""
+
+    def __init__(self):
+        self.timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, stage: str = "", **labels) -> None:
+        self._observe(value, stage=stage, **labels)
+        self.record(stage, value)
+
+    def record(self, stage: str, seconds: float) -> None:
+        if stage in self.timings:
+            with self._lock:
+                self.timings[stage].append(seconds)
+
+    def reset(self) -> None:
+        self.timings = {stage: [] for stage in STAGES}
+
+    def __enter__(self):
+        self._observe = STAGE_SECONDS.observe
+        STAGE_SECONDS.observe = self.observe
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        del STAGE_SECONDS.observe
+        return False
+
+
+def setup_django(database_path: str):
+    """Set up Django with a throwaway SQLite database for the entity rows; returns its teardown."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+    from django.db import connection
+    original_name = connection.settings_dict["NAME"]
+    connection.settings_dict["TEST"]["NAME"] = database_path
+    # Tables from the models: the entity backfill migration would read the real db/ index
+    connection.settings_dict["TEST"]["MIGRATE"] = False
+    connection.creation.create_test_db(verbosity=0)
+    return lambda: connection.creation.destroy_test_db(original_name, verbosity=0)
+
+
+def build_processor(args, vision_url: str, ollama_url: str, collection):
+    """The service's DocumentProcessor on the fakes and the throwaway collection (no chunk index)."""
+    # Imported once Django is set up (apps.documents needs its models)
+    from django.test import override_settings
+    from apps.documents.services import DocumentProcessor
+    with override_settings(CHUNK_INDEX_ENABLED=False, DEDUP_ENABLED=False):
+        return DocumentProcessor(
+            build_ocr_pipeline(args.ocr, vision_url),
+            EntityExtractor(use_ollama=True, ollama_url=ollama_url),
+            collection,
+            dedup_index=NearDuplicateIndex() if args.dedup else None,
+        )
+
+
+class PipelineBenchmark:
+    """Runs each document through DocumentProcessor.process and records its total time."""
+
+    def __init__(self, processor, recorder: StageRecorder):
+        self.processor = processor
+        self.recorder = recorder
+
+    def process(self, path: str) -> None:
+        from apps.documents.services import DocumentInput
+        start = time.perf_counter()
+        self.processor.process(DocumentInput(path=path, filename=os.path.basename(path)))
+        self.recorder.record("total", time.perf_counter() - start)
+
+
+def compare(current: Dict, baseline: Dict) -> Dict[str, float]:
+    """Per-stage p95 change in percent (positive = slower than the baseline)."""
+    changes = {}
+    for stage, stats in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {}).get("p95_ms")
+        if before:
+            changes[stage] = round((stats["p95_ms"] - before) / before * 100, 1)
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default="samples")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the sample files")
+    parser.add_argument("--workers", type=int, default=1, help="Documents processed concurrently")
+    parser.add_argument("--ocr", choices=["vision", "tesseract", "tesserocr"], default="vision",
+                        help="vision uses the fake Vision server; tesseract (subprocess) and tesserocr run locally")
+    parser.add_argument("--vision-ms", type=float, default=150.0, help="Fake Vision latency")
+    parser.add_argument("--ollama-ms", type=float, default=800.0, help="Fake Ollama latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform jitter added to both fakes")
+    parser.add_argument("--dedup", action="store_true", help="Enable near-duplicate detection (repeats become duplicates)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Previous JSON report to compare p95 latencies against")
+    args = parser.parse_args()
+
+    files = sample_files(args.samples) * args.repeat
+    if not files:
+        raise SystemExit(f"No sample files found in {args.samples}")
+
+    with FakeVisionServer(args.vision_ms, args.jitter_ms) as vision, \
+            FakeOllamaServer(args.ollama_ms, args.jitter_ms) as ollama, \
+            tempfile.TemporaryDirectory() as db_path, \
+            StageRecorder() as recorder:
+        teardown_database = setup_django(os.path.join(db_path, "entities.sqlite3"))
+        try:
+            collection = chromadb.PersistentClient(path=db_path).create_collection(
+                name="documents", embedding_function=get_embedding_function())
+            collection.upsert(
+                ids=[f"seed-{c}" for c in SEED_CLASSES],
+                documents=[clean_text(text) for text in DOCUMENT_TEXTS],
+                metadatas=[{"class": c} for c in SEED_CLASSES],
+            )
+            benchmark = PipelineBenchmark(build_processor(args, vision.url, ollama.url, collection), recorder)
+            # Warm up model loading and connections outside the measured run.
+            benchmark.process(files[0])
+            recorder.reset()
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                list(pool.map(benchmark.process, files))
+            elapsed = time.perf_counter() - start
+        finally:
+            teardown_database()
+
+    report = {
+        "config": {k: getattr(args, k) for k in ("ocr", "workers", "repeat", "vision_ms", "ollama_ms", "jitter_ms", "dedup")},
+        "documents": len(files),
+        "seconds": round(elapsed, 2),
+        "throughput_docs_per_second": round(len(files) / elapsed, 2),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "stages": summarize(recorder.timings),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["p95_change_percent"] = compare(report, json.load(f))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-page cost of each OCRPreprocessor step over the sample images.
+
+Usage:
+    python -m benchmarks.preprocessing_steps [--samples samples] [--repeat 5]
+
+Reports mean milliseconds per page for each step and the PNG size before and after preprocessing.
+"""
+
+import argparse
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from PIL import Image
+
+from ml_pipeline.ocr.preprocessor import OCRPreprocessor
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".gif"}
+
+
+def png_size(image: Image.Image) -> int:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.tell()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default="samples")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--binarize", default="otsu", choices=["otsu", "adaptive"])
+    args = parser.parse_args()
+
+    preprocessor = OCRPreprocessor({"binarize": args.binarize})
+    steps = [
+        ("downscale", preprocessor.downscale_step),
+        ("grayscale", preprocessor.grayscale_step),
+        ("deskew", preprocessor.deskew_step),
+        ("binarize", preprocessor.binarize_step),
+    ]
+    timings: Dict[str, List[float]] = {name: [] for name, _ in steps}
+    bytes_before, bytes_after = [], []
+
+    paths = sorted(p for p in Path(args.samples).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+    for path in paths:
+        original = Image.open(path)
+        original.load()
+        for _ in range(args.repeat):
+            image = original
+            for name, step in steps:
+                start = time.perf_counter()
+                image = step(image)
+                timings[name].append((time.perf_counter() - start) * 1000)
+        bytes_before.append(png_size(original))
+        bytes_after.append(png_size(image))
+
+    report = {
+        "pages": len(paths),
+        "repeat": args.repeat,
+        "binarize": args.binarize,
+        "mean_ms_per_page": {name: round(statistics.mean(values), 2) for name, values in timings.items() if values},
+        "mean_png_bytes_before": int(statistics.mean(bytes_before)) if bytes_before else 0,
+        "mean_png_bytes_after": int(statistics.mean(bytes_after)) if bytes_after else 0,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Search latency of the documents collection at increasing corpus sizes.
+
+Builds throwaway persistent collections with random 384-dimensional embeddings
+(the all-MiniLM-L6-v2 size) and realistic metadata, then times top-k queries with
+and without metadata filters. The embedding model is not involved, so the numbers
+isolate ChromaDB query cost; query embeddings are cached in production anyway.
+
+Usage:
+    python -m benchmarks.search_latency --sizes 10000 100000 1000000 --queries 200
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from apps.documents.search import build_where
+
+DIMENSION = 384
+CLASSES = ["invoice", "memo", "letter", "form", "email", "resume", "budget", "advertisement"]
+INSERT_BATCH = 5000
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 2)
+
+
+def build_collection(path: str, size: int, rng: np.random.Generator):
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection(name="documents", metadata={"hnsw:space": "l2"})
+    for start in range(0, size, INSERT_BATCH):
+        count = min(INSERT_BATCH, size - start)
+        embeddings = rng.standard_normal((count, DIMENSION), dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        collection.add(
+            ids=[f"doc-{start + i}" for i in range(count)],
+            embeddings=embeddings.tolist(),
+            metadatas=[{
+                "class": CLASSES[(start + i) % len(CLASSES)],
+                "filename": f"doc-{start + i}.pdf",
+                "confidence": float(rng.uniform(0.5, 1.0)),
+                "entities": "{}",
+            } for i in range(count)],
+        )
+    return collection
+
+
+def time_queries(collection, queries, where, k):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        collection.query(query_embeddings=[query.tolist()], n_results=k, where=where, include=["metadatas", "distances"])
+        latencies.append(time.perf_counter() - start)
+    return {"p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95), "p99_ms": percentile(latencies, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, DIMENSION), dtype=np.float32)
+    filters = {
+        "none": None,
+        "class": build_where(document_class="invoice"),
+        "class_and_confidence": build_where(document_class="invoice", min_confidence=0.9),
+    }
+
+    report = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as path:
+            start = time.perf_counter()
+            collection = build_collection(path, size, rng)
+            build_seconds = time.perf_counter() - start
+            report.append({
+                "documents": size,
+                "build_seconds": round(build_seconds, 1),
+                "latency": {name: time_queries(collection, queries, where, args.k) for name, where in filters.items()},
+            })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
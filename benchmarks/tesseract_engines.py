@@ -0,0 +1,121 @@
+"""
+Pages per second of the Tesseract backends: one `tesseract` process per page (pytesseract,
+TesseractOCRProcessor) against pooled in-process engines (tesserocr, TesseractEngineOCRProcessor).
+
+Pages are rendered from the fake documents' texts (benchmarks/fakes.py), or taken from real
+files with `--files` (PDF pages are rasterized first, outside the timing). Each backend OCRs every
+page once to warm up, then `--repeat` more times on 1..N threads. `word_agreement` is the
+fraction of the subprocess words that the engine also produced.
+
+Usage:
+    python -m benchmarks.tesseract_engines --pages 20 --threads 1 4
+    python -m benchmarks.tesseract_engines --files samples/invoice/invoice1.pdf --threads 1 2 4 --pool-size 4
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from PIL import Image, ImageDraw, ImageFont
+
+from benchmarks.fakes import DOCUMENT_TEXTS
+from benchmarks.pipeline_e2e import percentile
+from ml_pipeline.ocr.base import BaseOCRProcessor
+from ml_pipeline.ocr.page_source import open_page_source
+
+
+def render_page(text: str, width: int = 1700, height: int = 2200) -> Image.Image:
+    """A white letter-size page at 200 dpi with `text` in 28 px type."""
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=28)
+    for i, line in enumerate(text.splitlines()):
+        draw.text((120, 150 + 48 * i), line, fill=0, font=font)
+    return page
+
+
+def load_pages(files: List[str]) -> List[Image.Image]:
+    pages = []
+    for path in files:
+        with open_page_source(path) as source:
+            pages.extend(page.copy() for page in source.iter_pages())
+    return pages
+
+
+def run(processor: BaseOCRProcessor, pages: List[Image.Image], threads: int, repeat: int) -> Dict:
+    def ocr(page):
+        start = time.perf_counter()
+        result = processor.extract_text(page)
+        return time.perf_counter() - start, result.text
+
+    work = pages * repeat
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(ocr, work))
+    elapsed = time.perf_counter() - start
+    latencies = [seconds for seconds, _ in outcomes]
+    return {
+        "threads": threads,
+        "pages": len(work),
+        "pages_per_second": round(len(work) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "texts": [text for _, text in outcomes[:len(pages)]],
+    }
+
+
+def word_agreement(expected: List[str], actual: List[str]) -> float:
+    matched = total = 0
+    for a, b in zip(expected, actual):
+        want = Counter(a.split())
+        matched += sum((want & Counter(b.split())).values())
+        total += sum(want.values())
+    return round(matched / total, 4) if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="*", default=[], help="Images or PDFs to OCR instead of rendered pages")
+    parser.add_argument("--pages", type=int, default=12, help="Rendered pages when no --files are given")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=2, help="Timed passes over the pages")
+    parser.add_argument("--pool-size", type=int, default=None, help="tesserocr engines (default: max --threads)")
+    parser.add_argument("--language", default="eng")
+    parser.add_argument("--tesseract-config", default="--oem 3 --psm 6")
+    args = parser.parse_args()
+
+    pages = load_pages(args.files) if args.files else [
+        render_page(DOCUMENT_TEXTS[i % len(DOCUMENT_TEXTS)]) for i in range(args.pages)]
+    config = {"language": args.language, "tesseract_config": args.tesseract_config}
+
+    from ml_pipeline.ocr.tesseract import TesseractOCRProcessor
+    from ml_pipeline.ocr.tesseract_engine import TesseractEngineOCRProcessor
+    backends = {
+        "subprocess": TesseractOCRProcessor(config),
+        "tesserocr": TesseractEngineOCRProcessor({**config, "pool_size": args.pool_size or max(args.threads)}),
+    }
+
+    report: Dict = {"config": {"pages": len(pages), "repeat": args.repeat, "language": args.language,
+                               "tesseract_config": args.tesseract_config}}
+    texts: Dict[str, List[str]] = {}
+    for name, processor in backends.items():
+        # Warm-up: loads the engines (tesserocr) and the page cache (both)
+        texts[name] = run(processor, pages, max(args.threads), 1)["texts"]
+        report[name] = []
+        for threads in args.threads:
+            result = run(processor, pages, threads, args.repeat)
+            del result["texts"]
+            report[name].append(result)
+    report["word_agreement"] = word_agreement(texts["subprocess"], texts["tesserocr"])
+    report["speedup"] = {
+        str(sub["threads"]): round(eng["pages_per_second"] / sub["pages_per_second"], 2)
+        for sub, eng in zip(report["subprocess"], report["tesserocr"])
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Cost of `clean_text` on large multi-page OCR texts, against the previous regex implementation.
+
+Usage:
+    python -m benchmarks.text_normalization [--pages 50] [--repeat 20] [--accented]
+
+Pages are built from the fake Vision documents (benchmarks/fakes.py); `--accented` mixes in
+non-ASCII text so the Unicode path is measured too. Reports mean milliseconds per document
+and MB/s for each implementation.
+"""
+
+import argparse
+import json
+import re
+import statistics
+import time
+import unicodedata
+from typing import Callable, Dict
+
+from benchmarks.fakes import DOCUMENT_TEXTS
+from ml_pipeline.dataset.utils import clean_text
+
+ACCENTED_TEXT = "Reçu n° 42 — Café Müller, Straße 7\tTotal: 1 234,50 €\x0cPágina 2 · ﬁnal naïve résumé"
+
+
+def regex_clean_text(text: str) -> str:
+    """The regex implementation `clean_text` replaced, kept here as the baseline."""
+    text = unicodedata.normalize('NFKC', text)
+    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    text = re.sub(r'[\r\n\t\x0b\x0c]', ' ', text)
+    text = re.sub(r'\s+', ' ', text.strip())
+    text = text.lower()
+    text = re.sub(r'[^\w\s.,!?]', '', text)
+    return text
+
+
+def build_document(pages: int, accented: bool) -> str:
+    page_texts = DOCUMENT_TEXTS + ([ACCENTED_TEXT] if accented else [])
+    return "\x0c".join(page_texts[page % len(page_texts)] * 10 for page in range(pages))
+
+
+def measure(fn: Callable[[str], str], text: str, repeat: int) -> Dict[str, float]:
+    fn(text)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - start)
+    mean = statistics.mean(timings)
+    return {"mean_ms": round(mean * 1000, 3), "mb_per_second": round(len(text.encode()) / mean / 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--accented", action="store_true", help="Include non-ASCII pages")
+    args = parser.parse_args()
+
+    text = build_document(args.pages, args.accented)
+    report = {
+        "pages": args.pages,
+        "characters": len(text),
+        "accented": args.accented,
+        "clean_text": measure(clean_text, text, args.repeat),
+        "regex_baseline": measure(regex_clean_text, text, args.repeat),
+    }
+    report["speedup"] = round(report["regex_baseline"]["mean_ms"] / report["clean_text"]["mean_ms"], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
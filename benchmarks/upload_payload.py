@@ -0,0 +1,62 @@
+"""
+Upload bytes and encode CPU per document: legacy PNG re-encoding vs. pass-through payloads.
+
+Usage:
+    python -m benchmarks.upload_payload [--samples samples]
+"""
+
+import argparse
+import io
+import json
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from ml_pipeline.ocr.google_cloud_vision import VISION_INLINE_FORMATS, VISION_MAX_UPLOAD_BYTES
+from ml_pipeline.ocr.payload import to_payload
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".gif"}
+
+
+def legacy_png(path: Path) -> int:
+    """What the Vision processor used to send: the decoded image re-encoded as PNG."""
+    buffer = io.BytesIO()
+    Image.open(path).save(buffer, format="PNG")
+    return buffer.tell()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default="samples")
+    args = parser.parse_args()
+
+    rows = []
+    for path in sorted(p for p in Path(args.samples).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES):
+        start = time.process_time()
+        legacy_bytes = legacy_png(path)
+        legacy_cpu = time.process_time() - start
+
+        start = time.process_time()
+        payload = to_payload(str(path), VISION_INLINE_FORMATS, VISION_MAX_UPLOAD_BYTES)
+        payload_bytes, transcoded = payload.size, payload.transcoded
+        payload_cpu = time.process_time() - start
+
+        rows.append({
+            "file": str(path),
+            "legacy_png_bytes": legacy_bytes,
+            "legacy_cpu_ms": round(legacy_cpu * 1000, 2),
+            "payload_bytes": payload_bytes,
+            "payload_cpu_ms": round(payload_cpu * 1000, 2),
+            "transcoded": transcoded,
+        })
+
+    print(json.dumps({
+        "documents": rows,
+        "total_legacy_bytes": sum(r["legacy_png_bytes"] for r in rows),
+        "total_payload_bytes": sum(r["payload_bytes"] for r in rows),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Parse time of a dense Vision response, against the previous proto-plus loop.
+
+The fixture (benchmarks/fixtures/vision_dense_page.json.gz) is an AnnotateImageResponse in the
+REST JSON shape: a dense page of 150 lines in blocks of 50 lines, with word boxes and line
+breaks, so parsing runs offline. `--record` rewrites it from benchmarks/fakes.py.
+
+Usage:
+    python -m benchmarks.vision_parse [--repeat 50] [--levels block line word]
+    python -m benchmarks.vision_parse --record
+"""
+
+import argparse
+import gzip
+import itertools
+import json
+import os
+import statistics
+import time
+from typing import Callable, Dict
+
+from google.cloud import vision
+from google.protobuf import json_format
+
+from benchmarks.fakes import DOCUMENT_TEXTS, vision_annotation
+from ml_pipeline.ocr.base import BoundingBox, TextBlock
+from ml_pipeline.ocr.vision_parser import BOX_LEVELS, parse_text_annotation
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "vision_dense_page.json.gz")
+
+
+def dense_page_text(lines: int = 150, words_per_line: int = 14) -> str:
+    words = itertools.cycle(" ".join(DOCUMENT_TEXTS).split())
+    return "\n".join(" ".join(next(words) for _ in range(words_per_line)) for _ in range(lines))
+
+
+def record_fixture(path: str) -> None:
+    response = {"fullTextAnnotation": vision_annotation(dense_page_text(), lines_per_block=50)}
+    with gzip.GzipFile(path, "wb", mtime=0) as f:
+        f.write(json.dumps(response).encode())
+
+
+def load_fixture(path: str):
+    """The fixture as a raw AnnotateImageResponse protobuf, as `response._pb` would be."""
+    with gzip.open(path, "rt") as f:
+        return json_format.Parse(f.read(), vision.AnnotateImageResponse.pb()())
+
+
+def legacy_parse(response) -> list:
+    """The block loop the parser replaced, over proto-plus wrappers, kept here as the baseline."""
+    blocks = []
+    for page_idx, page in enumerate(response.full_text_annotation.pages, start=1):
+        for block in page.blocks:
+            if block.block_type != vision.Block.BlockType.TEXT:
+                continue
+            vertices = block.bounding_box.vertices
+            bbox = None
+            if len(vertices) >= 4:
+                bbox = BoundingBox(float(vertices[0].x), float(vertices[0].y),
+                                   float(vertices[2].x - vertices[0].x), float(vertices[2].y - vertices[0].y))
+            block_text = ""
+            block_confidence = 0.0
+            word_count = 0
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    word_text = "".join([symbol.text for symbol in word.symbols])
+                    block_text += word_text + " "
+                    if word.confidence:
+                        block_confidence += word.confidence
+                        word_count += 1
+            block_confidence = block_confidence / word_count if word_count else 0.0
+            blocks.append(TextBlock(text=block_text.strip(), confidence=block_confidence, bounding_box=bbox, page_number=page_idx))
+    return blocks
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {"mean_ms": round(statistics.mean(timings) * 1000, 3), "p95_ms": round(sorted(timings)[int(0.95 * (len(timings) - 1))] * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default=FIXTURE)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--levels", nargs="+", choices=BOX_LEVELS, default=["block", "line", "word"],
+                        help="Box levels for the extra parser run (blocks only is always measured)")
+    parser.add_argument("--record", action="store_true", help="Rewrite the fixture and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixture(args.fixture)
+        print(f"Wrote {args.fixture}")
+        return
+
+    raw = load_fixture(args.fixture)
+    wrapped = vision.AnnotateImageResponse.wrap(raw)
+    annotation = raw.full_text_annotation
+    report = {
+        "words": sum(len(p.words) for page in annotation.pages for b in page.blocks for p in b.paragraphs),
+        "blocks": sum(len(page.blocks) for page in annotation.pages),
+        "legacy_proto_plus": measure(lambda: legacy_parse(wrapped), args.repeat),
+        "parser_blocks": measure(lambda: parse_text_annotation(annotation), args.repeat),
+        f"parser_{'_'.join(args.levels)}": measure(lambda: parse_text_annotation(annotation, args.levels), args.repeat),
+    }
+    report["speedup_blocks"] = round(report["legacy_proto_plus"]["mean_ms"] / report["parser_blocks"]["mean_ms"], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
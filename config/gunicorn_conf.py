@@ -0,0 +1,61 @@
+"""
+Gunicorn configuration for the document processing service.
+
+Usage:
+    gunicorn -c config/gunicorn_conf.py config.wsgi:application
+
+With GUNICORN_PRELOAD=1 (the default) the Django app and the ML models are loaded
+once in the master process and shared copy-on-write by the forked workers.
+
+Workers run GUNICORN_THREADS request threads (gthread). The processing endpoint's own
+admission control then decides how many of them work at once and rejects the overflow, rather
+than letting requests queue in the socket backlog until `timeout` kills the worker.
+
+Workers share their metrics through METRICS_MULTIPROC_DIR (default: a directory under the
+system temp dir, emptied when gunicorn starts), so /metrics reports all of them.
+"""
+
+import os
+import tempfile
+
+from services.model_preload import preload_models, set_torch_threads, worker_torch_threads
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8080")
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "300"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+metrics_dir = os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "document_processing_metrics"))
+metrics_interval = float(os.environ.get("METRICS_SNAPSHOT_INTERVAL", "5"))
+
+
+def on_starting(server):
+    """Drop metric snapshots of workers from a previous run."""
+    from services.metrics import reset_multiprocess_dir
+    reset_multiprocess_dir(metrics_dir)
+
+
+def when_ready(server):
+    """Runs in the master before the first fork, after the app has been preloaded."""
+    if server.cfg.preload_app:
+        # Keep the master single-threaded so no OpenMP pool exists at fork time.
+        set_torch_threads(1)
+        preload_models()
+
+
+def post_fork(server, worker):
+    """Give each worker its share of the CPU for torch intra-op parallelism."""
+    set_torch_threads(worker_torch_threads(server.cfg.workers))
+    from services.metrics import start_snapshot_writer
+    start_snapshot_writer(metrics_dir, metrics_interval)
+
+
+def child_exit(server, worker):
+    """Remove temp uploads left behind by a worker that crashed or was killed on timeout."""
+    try:
+        from apps.documents.upload import sweep_orphaned_uploads
+        sweep_orphaned_uploads()
+    except Exception as e:
+        server.log.error(f"Failed to sweep orphaned uploads: {e}")
+    from services.metrics import mark_process_dead
+    mark_process_dead(metrics_dir, worker.pid)
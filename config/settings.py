@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 
@@ -129,3 +130,55 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 FILES_URL = '/files/'
 FILES_ROOT = Path(BASE_DIR) / 'files'
+
+# Document uploads are streamed to temp files here and deleted once processed
+UPLOAD_TEMP_DIR = FILES_ROOT / 'uploads'
+DOCUMENT_UPLOAD_MAX_BYTES = int(os.environ.get('DOCUMENT_UPLOAD_MAX_BYTES', 50 * 1024 * 1024))
+
+# Batch processing endpoint
+DOCUMENT_BATCH_MAX_FILES = int(os.environ.get('DOCUMENT_BATCH_MAX_FILES', 500))
+DOCUMENT_BATCH_MAX_BYTES = int(os.environ.get('DOCUMENT_BATCH_MAX_BYTES', 500 * 1024 * 1024))
+DOCUMENT_BATCH_OCR_WORKERS = int(os.environ.get('DOCUMENT_BATCH_OCR_WORKERS', 4))
+DOCUMENT_BATCH_SIZE = int(os.environ.get('DOCUMENT_BATCH_SIZE', 16))
+
+# Single-document endpoint: classify the first pages while the rest are OCR'd, so full-text extraction starts sooner
+DOCUMENT_PIPELINED_PAGES = os.environ.get('DOCUMENT_PIPELINED_PAGES', '1') == '1'
+DOCUMENT_CLASSIFY_PAGES = int(os.environ.get('DOCUMENT_CLASSIFY_PAGES', 1))
+DOCUMENT_PAGE_PREFETCH = int(os.environ.get('DOCUMENT_PAGE_PREFETCH', 2))
+
+# Single-document endpoint admission control, per worker process (see services/admission.py).
+# Keep DOCUMENT_MAX_CONCURRENT + DOCUMENT_MAX_QUEUED below GUNICORN_THREADS so health checks still get a thread.
+DOCUMENT_REQUEST_DEADLINE_SECONDS = float(os.environ.get('DOCUMENT_REQUEST_DEADLINE_SECONDS', 120))
+DOCUMENT_MAX_CONCURRENT = int(os.environ.get('DOCUMENT_MAX_CONCURRENT', 2))
+DOCUMENT_MAX_QUEUED = int(os.environ.get('DOCUMENT_MAX_QUEUED', 4))
+DOCUMENT_QUEUE_WAIT_SECONDS = float(os.environ.get('DOCUMENT_QUEUE_WAIT_SECONDS', 30))
+DOCUMENT_MIN_SERVICE_SECONDS = float(os.environ.get('DOCUMENT_MIN_SERVICE_SECONDS', 5))
+
+# Near-duplicate detection: MinHash signatures of cleaned text, persisted next to the ChromaDB files
+DEDUP_ENABLED = os.environ.get('DEDUP_ENABLED', '1') == '1'
+DEDUP_INDEX_DIR = Path(os.environ.get('DEDUP_INDEX_DIR', BASE_DIR / 'db' / 'dedup'))
+DEDUP_THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD', 0.85))
+
+# SQLite manifest of files ingested by process_documents (path, size, mtime, hash, processor version, status)
+INGESTION_MANIFEST_PATH = Path(os.environ.get('INGESTION_MANIFEST_PATH', BASE_DIR / 'db' / 'ingestion_manifest.sqlite3'))
+
+# On-demand request profiling of the single-document endpoint (services/profiling.py); list with `manage.py profiles`
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles'))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sample')
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+PROFILE_MAX_BYTES = int(os.environ.get('PROFILE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Versioned ChromaDB snapshots written by export_index and loaded by import_index (LATEST names the newest)
+INDEX_SNAPSHOT_DIR = Path(os.environ.get('INDEX_SNAPSHOT_DIR', BASE_DIR / 'snapshots'))
+
+# Chunk-level embeddings for long documents (stored in the `document_chunks` collection)
+CHUNK_INDEX_ENABLED = os.environ.get('CHUNK_INDEX_ENABLED', '0') == '1'
+CHUNK_INDEX_CONFIG = {
+    'window_words': int(os.environ.get('CHUNK_WINDOW_WORDS', 180)),
+    'overlap_words': int(os.environ.get('CHUNK_OVERLAP_WORDS', 40)),
+    'chunks_per_query': int(os.environ.get('CHUNK_QUERY_CHUNKS', 50)),
+    'aggregation': os.environ.get('CHUNK_AGGREGATION', 'max'),
+}
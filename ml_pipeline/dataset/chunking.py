@@ -0,0 +1,121 @@
+"""Chunk-level indexing of long documents in a separate ChromaDB collection."""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from services.logger import logger
+
+CHUNK_COLLECTION_NAME = "document_chunks"
+
+
+def chunk_text(text: str, window_words: int = 180, overlap_words: int = 40) -> List[str]:
+    """
+    Split text into overlapping word windows.
+
+    The default of 180 words stays under the 256 word pieces `all-MiniLM-L6-v2` reads,
+    so every part of a long document is represented by at least one chunk.
+    """
+    if overlap_words >= window_words:
+        raise ValueError("overlap_words must be smaller than window_words")
+    words = text.split()
+    if not words:
+        return []
+    step = window_words - overlap_words
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + window_words]))
+        if start + window_words >= len(words):
+            break
+    return chunks
+
+
+class ChunkIndex:
+    """
+    Stores overlapping chunks of each document with their parent document id, and answers
+    queries at document level by aggregating chunk scores per parent.
+
+    Config keys: window_words (180), overlap_words (40), batch_size (64) for embedding
+    batches, max_query_chunks (8) chunks of a query text to search with, chunks_per_query (50)
+    nearest chunks fetched per query chunk, and aggregation ("max" or "mean") of chunk scores.
+    """
+
+    def __init__(self, collection, config: Optional[Dict[str, Any]] = None):
+        self.collection = collection
+        self.config = config or {}
+        self.window_words = self.config.get("window_words", 180)
+        self.overlap_words = self.config.get("overlap_words", 40)
+        self.batch_size = self.config.get("batch_size", 64)
+        self.max_query_chunks = self.config.get("max_query_chunks", 8)
+        self.chunks_per_query = self.config.get("chunks_per_query", 50)
+        self.aggregation = self.config.get("aggregation", "max")
+
+    def index(self, parent_id: str, text: str, metadata: Dict[str, Any]) -> int:
+        """Replace the chunks of a document; returns the number of chunks stored."""
+        self.collection.delete(where={"parent_id": parent_id})
+        chunks = chunk_text(text, self.window_words, self.overlap_words)
+        chunk_metadata = {k: v for k, v in metadata.items() if k != "entities"}
+        for start in range(0, len(chunks), self.batch_size):
+            batch = chunks[start:start + self.batch_size]
+            self.collection.upsert(
+                documents=batch,
+                metadatas=[{**chunk_metadata, "parent_id": parent_id, "chunk_index": start + i} for i in range(len(batch))],
+                ids=[f"{parent_id}#{start + i}" for i in range(len(batch))],
+            )
+        logger.info(f"[ChunkIndex] Indexed {len(chunks)} chunks for {parent_id}")
+        return len(chunks)
+
+    def backfill(self, documents_collection, batch_size: int = 256, reindex: bool = False) -> Dict[str, int]:
+        """
+        Chunk documents stored in `documents_collection` (the whole-document collection).
+
+        Documents that already have chunks are skipped unless `reindex` is set, so this can be run
+        after turning chunk indexing on for an existing collection. Returns counts of documents
+        seen and indexed.
+        """
+        ids = documents_collection.get(include=[])["ids"]
+        chunked = set()
+        if not reindex:
+            chunked = {metadata["parent_id"] for metadata in self.collection.get(include=["metadatas"])["metadatas"] or []
+                       if metadata and "parent_id" in metadata}
+        pending = [doc_id for doc_id in ids if doc_id not in chunked]
+        for start in range(0, len(pending), batch_size):
+            batch = documents_collection.get(ids=pending[start:start + batch_size], include=["documents", "metadatas"])
+            for doc_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                self.index(doc_id, text or "", metadata or {})
+        return {"documents": len(ids), "indexed": len(pending)}
+
+    def remove(self, parent_id: str) -> None:
+        """Delete all chunks of a document."""
+        self.collection.delete(where={"parent_id": parent_id})
+
+    def query(self, text: str, n_results: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Return the top parent documents for a (possibly long) query text.
+
+        Each result has `id`, `score` (higher is better), `distance` of the best chunk and the
+        metadata of that chunk, which carries the parent's class and filename.
+        """
+        query_chunks = chunk_text(text, self.window_words, self.overlap_words)[:self.max_query_chunks] or [text]
+        results = self.collection.query(
+            query_texts=query_chunks,
+            n_results=self.chunks_per_query,
+            where=where,
+            include=["metadatas", "distances"],
+        )
+
+        chunk_scores: Dict[str, List[float]] = defaultdict(list)
+        best: Dict[str, Dict[str, Any]] = {}
+        for metadatas, distances in zip(results["metadatas"], results["distances"]):
+            for metadata, distance in zip(metadatas, distances):
+                parent_id = metadata["parent_id"]
+                chunk_scores[parent_id].append(1.0 / (1.0 + distance))
+                if parent_id not in best or distance < best[parent_id]["distance"]:
+                    best[parent_id] = {"distance": distance, "metadata": metadata}
+
+        aggregate = max if self.aggregation == "max" else (lambda scores: sum(scores) / len(scores))
+        parents = [
+            {"id": parent_id, "score": aggregate(scores), **best[parent_id]}
+            for parent_id, scores in chunk_scores.items()
+        ]
+        parents.sort(key=lambda parent: parent["score"], reverse=True)
+        return parents[:n_results]
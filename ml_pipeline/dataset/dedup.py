@@ -0,0 +1,255 @@
+"""Near-duplicate detection for cleaned document text with MinHash signatures and an LSH index."""
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Collection, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from services.logger import logger
+
+# Mersenne prime 2^61 - 1; with 32-bit shingle hashes and 31-bit coefficients a*x + b fits in uint64.
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+# Files of an index directory: the compacted snapshot, and the log of signatures added since
+SIGNATURES_FILE = "signatures.npy"
+KEYS_FILE = "keys.json"
+SIGNATURE_LOG = "signatures.log"
+
+
+def content_key(cleaned_text: str) -> str:
+    """Content-derived document id: SHA-256 of the cleaned text."""
+    return hashlib.sha256(cleaned_text.encode("utf-8")).hexdigest()
+
+
+def shingle_hashes(text: str, shingle_words: int = 5) -> np.ndarray:
+    """Return the distinct 32-bit hashes of the word shingles of a text."""
+    words = text.split()
+    if len(words) < shingle_words:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)]
+    return np.unique(np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)))
+
+
+class MinHasher:
+    """Computes MinHash signatures with `num_perm` universal hash permutations in one vectorized pass."""
+
+    def __init__(self, num_perm: int = 128, shingle_words: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of a text, or None when it has no words to compare."""
+        hashes = shingle_hashes(text, self.shingle_words)
+        if hashes.size == 0:
+            # Blank texts would all share one signature and match each other
+            return None
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index over MinHash signatures, persisted as a NumPy array of signatures plus a key list.
+
+    Signatures are split into `bands` bands of num_perm / bands rows; documents sharing any
+    band are candidates, and a candidate is a near-duplicate when its estimated Jaccard
+    similarity (the fraction of equal signature slots) reaches `threshold`.
+
+    `flush` appends new signatures to a log next to the snapshot files, so frequent writers pay
+    for their own entries only; `save` folds the log into a new snapshot, and `flush` does so
+    itself once the log holds `compact_after` entries.
+    """
+
+    def __init__(self, directory: Optional[str] = None, num_perm: int = 128, bands: int = 16, threshold: float = 0.85,
+                 compact_after: int = 10000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.directory = directory
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.compact_after = compact_after
+        self.keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._signatures = np.empty((0, num_perm), dtype=np.uint64)
+        self._count = 0
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self._lock = threading.Lock()
+        # Positions added since the last flush, and how far the directory's files have been merged
+        self._unsaved: List[int] = []
+        self._snapshot_stamp: Optional[Tuple[int, int]] = None
+        self._log_offset = 0
+        self._log_entries = 0
+        if directory:
+            self._load()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _append(self, key: str, signature: np.ndarray) -> None:
+        if self._count == len(self._signatures):
+            grown = np.empty((max(64, 2 * len(self._signatures)), self.hasher.num_perm), dtype=np.uint64)
+            grown[:self._count] = self._signatures[:self._count]
+            self._signatures = grown
+        position = self._count
+        self._signatures[position] = signature
+        self._count += 1
+        self.keys.append(key)
+        self._positions[key] = position
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band][band_key].append(position)
+
+    def add(self, key: str, signature: np.ndarray) -> None:
+        """Add a document signature; re-adding an existing key is a no-op."""
+        with self._lock:
+            if key not in self._positions:
+                self._append(key, signature)
+                self._unsaved.append(self._count - 1)
+
+    def query(self, signature: np.ndarray, exclude: Union[str, Collection[str], None] = None) -> Optional[Tuple[str, float]]:
+        """Return (key, estimated similarity) of the closest near-duplicate other than the `exclude` key(s), or None."""
+        excluded = {exclude} if isinstance(exclude, str) else set(exclude or ())
+        with self._lock:
+            candidates = set()
+            for band, band_key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(band_key, ()))
+            if not candidates:
+                return None
+            positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarities = (self._signatures[positions] == signature[None, :]).mean(axis=1)
+            order = np.argsort(-similarities)
+            for i in order:
+                key = self.keys[positions[i]]
+                if similarities[i] < self.threshold:
+                    break
+                if key not in excluded:
+                    return key, float(similarities[i])
+        return None
+
+    @contextmanager
+    def _locked(self):
+        """Hold the in-process lock and an exclusive lock on the directory, shared by other processes."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock_file, self._lock:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def flush(self) -> None:
+        """Append the signatures added since the last flush to the log, merging entries logged by other processes."""
+        if not self.directory:
+            return
+        with self._locked():
+            self._sync()
+            if self._unsaved:
+                lines = "".join(f"{self.keys[position]}\t{self._signatures[position].tobytes().hex()}\n" for position in self._unsaved)
+                with open(os.path.join(self.directory, SIGNATURE_LOG), "a") as f:
+                    f.write(lines)
+                self._log_offset += len(lines.encode("utf-8"))
+                self._log_entries += len(self._unsaved)
+                self._unsaved.clear()
+            if self._log_entries >= self.compact_after:
+                self._compact()
+
+    def save(self) -> None:
+        """
+        Persist signatures and keys as a new snapshot, replacing the previous files atomically.
+
+        Several processes may share one index directory, so entries written by others since
+        the last load are merged in first, under an exclusive lock on the directory. The log
+        is emptied, since the snapshot now holds its entries.
+        """
+        if not self.directory:
+            return
+        with self._locked():
+            self._sync()
+            self._compact()
+
+    def _compact(self) -> None:
+        signatures_path = os.path.join(self.directory, SIGNATURES_FILE)
+        keys_path = os.path.join(self.directory, KEYS_FILE)
+        with open(signatures_path + ".tmp", "wb") as f:
+            np.save(f, self._signatures[:self._count])
+        with open(keys_path + ".tmp", "w") as f:
+            json.dump(self.keys, f)
+        os.replace(signatures_path + ".tmp", signatures_path)
+        os.replace(keys_path + ".tmp", keys_path)
+        open(os.path.join(self.directory, SIGNATURE_LOG), "w").close()
+        self._snapshot_stamp = self._stamp()
+        self._log_offset = self._log_entries = 0
+        self._unsaved.clear()
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.directory, SIGNATURES_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _sync(self) -> None:
+        """Merge entries other processes wrote since the last sync: a new snapshot, then the unread log tail."""
+        stamp = self._stamp()
+        if stamp != self._snapshot_stamp:
+            # Compacted by another process: its log entries are now in the snapshot
+            self._merge_snapshot()
+            self._snapshot_stamp = stamp
+            self._log_offset = self._log_entries = 0
+        try:
+            with open(os.path.join(self.directory, SIGNATURE_LOG), "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # A writer that died mid-line leaves a partial record; it is ignored until completed
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                key, encoded = line.decode("utf-8").split("\t")
+                signature = np.frombuffer(bytes.fromhex(encoded), dtype=np.uint64)
+            except ValueError:
+                signature = None
+            if signature is None or signature.size != self.hasher.num_perm:
+                logger.warning(f"[NearDuplicateIndex] Skipping a malformed record in {self.directory}/{SIGNATURE_LOG}")
+                continue
+            if key not in self._positions:
+                self._append(key, signature)
+        self._log_offset += len(complete)
+        self._log_entries += complete.count(b"\n")
+
+    def _read(self) -> Tuple[List[str], np.ndarray]:
+        signatures_path = os.path.join(self.directory, SIGNATURES_FILE)
+        if not os.path.exists(signatures_path):
+            return [], np.empty((0, self.hasher.num_perm), dtype=np.uint64)
+        signatures = np.load(signatures_path)
+        with open(os.path.join(self.directory, KEYS_FILE)) as f:
+            keys = json.load(f)
+        if signatures.shape != (len(keys), self.hasher.num_perm):
+            logger.warning(f"[NearDuplicateIndex] Ignoring index in {self.directory}: shape {signatures.shape} does not match {len(keys)} keys")
+            return [], np.empty((0, self.hasher.num_perm), dtype=np.uint64)
+        return keys, signatures
+
+    def _merge_snapshot(self) -> None:
+        keys, signatures = self._read()
+        for key, signature in zip(keys, signatures):
+            if key not in self._positions:
+                self._append(key, signature)
+
+    def _load(self) -> None:
+        if os.path.isdir(self.directory):
+            with self._locked():
+                self._sync()
+        logger.info(f"[NearDuplicateIndex] Loaded {self._count} signatures from {self.directory}")
@@ -0,0 +1,38 @@
+"""Shared sentence embedding function for the ChromaDB documents collection."""
+
+import threading
+from typing import Optional
+
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils import embedding_functions
+
+from ml_pipeline.inference.client import InferenceClient, RemoteEmbeddingFunction, get_inference_server_url
+from services.logger import logger
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+_global_embedding_function: Optional[EmbeddingFunction] = None
+_global_lock = threading.Lock()
+
+
+def get_embedding_function(model_name: str = EMBEDDING_MODEL_NAME) -> EmbeddingFunction:
+    """
+    Get or create the global embedding function instance.
+    Thread-safe factory function, so the SentenceTransformer weights are loaded once per process
+    (or once in the gunicorn master when preloading). When INFERENCE_SERVER_URL is set, embeddings
+    are computed by the local inference server instead and no model is loaded here.
+    """
+    global _global_embedding_function
+
+    if _global_embedding_function is None:
+        with _global_lock:
+            if _global_embedding_function is None:
+                server_url = get_inference_server_url()
+                if server_url:
+                    logger.info(f"[Embeddings] Using inference server at {server_url}")
+                    _global_embedding_function = RemoteEmbeddingFunction(InferenceClient(server_url))
+                else:
+                    logger.info(f"[Embeddings] Loading embedding model: {model_name}")
+                    _global_embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+
+    return _global_embedding_function
@@ -3,18 +3,25 @@
 import csv
 import json
 import os
-import re
-from typing import Dict, Any, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Tuple
 from abc import ABC, abstractmethod
 import chromadb
-from chromadb.utils import embedding_functions
 
-from ml_pipeline.ocr.base import OCRProcessingError
+from ml_pipeline.dataset.chunking import CHUNK_COLLECTION_NAME, ChunkIndex
+from ml_pipeline.dataset.dedup import content_key
+from ml_pipeline.dataset.manifest import STATUS_DONE, STATUS_DUPLICATE, STATUS_ERROR, IngestionManifest, ManifestEntry, file_hash
+from ml_pipeline.dataset.embeddings import get_embedding_function
+from ml_pipeline.dataset.utils import clean_text
+from ml_pipeline.ocr.base import OCRProcessingError, OCRResult
 from ml_pipeline.ocr.google_cloud_vision import GoogleCloudVisionOCRProcessor
 from ml_pipeline.ocr.pipeline import OCRPipeline
 from services.logger import logger
+from services.metrics import stage_timer
 from ml_pipeline.entity_extractor.extractor import EntityExtractor
 
+# Bump when cleaning, classification or extraction changes, so the manifest reprocesses every file.
+PIPELINE_VERSION = "3"
+
 class BaseTextDataset(ABC):
     """Abstract base class for processing text datasets."""
     def __init__(self, input_dir: str, config: Optional[Dict[str, Any]] = None):
@@ -48,25 +55,39 @@ class TextDatasetGenerator(BaseTextDataset):
         config: Optional[Dict[str, Any]] = None
     ):
         super().__init__(input_dir, config)
-        self.ocr_processor_pipeline = (config or {}).get(
-            "ocr_processor_pipeline", 
-            OCRPipeline(GoogleCloudVisionOCRProcessor()))
-        self.chroma_client = chromadb.PersistentClient(path="db", 
+        # Built only when not given: the Vision client needs credentials at construction
+        pipeline = (config or {}).get("ocr_processor_pipeline")
+        self.ocr_processor_pipeline = pipeline if pipeline is not None else OCRPipeline(GoogleCloudVisionOCRProcessor())
+        db_path = (config or {}).get("db_path", "db")
+        self.chroma_client = chromadb.PersistentClient(path=db_path, 
                         settings=chromadb.Settings(allow_reset=True, 
-                        persist_directory="db", is_persistent=True))
+                        persist_directory=db_path, is_persistent=True))
         self.collection = self.chroma_client.get_or_create_collection(
             name="documents",
-            embedding_function=embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+            embedding_function=get_embedding_function()
         )
         # Add entity extractor instance
-        entity_extractor = EntityExtractor()
+        self.entity_extractor = EntityExtractor()
+        # Optional structured entity index, written after each successful upsert
+        self.entity_index = (config or {}).get("entity_index")
+        # Optional chunk-level index for long documents, enabled by passing its config
+        chunk_index_config = (config or {}).get("chunk_index")
+        self.chunk_index = None
+        if chunk_index_config is not None:
+            self.chunk_index = ChunkIndex(
+                self.chroma_client.get_or_create_collection(name=CHUNK_COLLECTION_NAME, embedding_function=get_embedding_function()),
+                chunk_index_config,
+            )
+        # Optional NearDuplicateIndex; near-duplicates of stored documents skip extraction and upsert
+        self.dedup_index = (config or {}).get("dedup_index")
+        # Ingestion manifest: files are reprocessed only when new, changed, or the processor version differs
+        self.manifest_path = (config or {}).get("manifest_path", os.path.join(db_path, "ingestion_manifest.sqlite3"))
+        self.processor_version = (config or {}).get(
+            "processor_version",
+            f"{type(self.ocr_processor_pipeline.processor).__name__}:{PIPELINE_VERSION}")
 
-    def clean_text(self, text: str) -> str:
-        """Clean text for ML model input."""
-        text = re.sub(r'\s+', ' ', text.strip())
-        text = text.lower()
-        text = re.sub(r'[^\w\s.,!?]', '', text)
-        return text
+    # Shared with query-time cleaning so indexed and queried text are normalized identically
+    clean_text = staticmethod(clean_text)
     
     def get_existing_document_ids(self) -> Set[str]:
         """Get set of document IDs that are already stored in ChromaDB."""
@@ -79,81 +100,275 @@ class TextDatasetGenerator(BaseTextDataset):
         except Exception as e:
             logger.error(f"Could not retrieve existing documents from ChromaDB: {e}")
             return set()
-    
-    def generate(self) -> None:
-        """Process document images and upsert into ChromaDB, skipping already processed files."""
-        supported_formats = self.ocr_processor_pipeline.processor.get_supported_formats()
-        processed_count = 0
-        skipped_count = 0
-        error_count = 0
-        
-        # Get existing document IDs to avoid reprocessing
-        existing_ids = self.get_existing_document_ids()
-        logger.info(f"Found {len(existing_ids)} existing documents in ChromaDB")
 
-        for idx, class_name in enumerate(os.listdir(self.input_dir), start=1):
-            logger.info(f"Processing class: {class_name}, there are {len(os.listdir(self.input_dir)) - idx} classes remaining")
+    def get_existing_filenames(self) -> Set[str]:
+        """Get set of filenames already stored in ChromaDB (documents are keyed by content, not filename)."""
+        try:
+            results = self.collection.get(include=["metadatas"])
+            return {metadata["filename"] for metadata in results.get("metadatas") or [] if metadata and "filename" in metadata}
+        except Exception as e:
+            logger.error(f"Could not retrieve existing documents from ChromaDB: {e}")
+            return set()
+
+    def get_existing_sources(self) -> Dict[Tuple[str, str], str]:
+        """Map (class, filename) of every stored document to its document id."""
+        try:
+            results = self.collection.get(include=["metadatas"])
+        except Exception as e:
+            logger.error(f"Could not retrieve existing documents from ChromaDB: {e}")
+            return {}
+        return {
+            (metadata["class"], metadata["filename"]): doc_id
+            for doc_id, metadata in zip(results.get("ids") or [], results.get("metadatas") or [])
+            if metadata and "class" in metadata and "filename" in metadata
+        }
+
+    def find_duplicate(self, cleaned_text: str, exclude: Optional[str] = None):
+        """
+        Return (stored id, similarity, signature); id is None when the text is not a near-duplicate.
+
+        `exclude` is the file's own previous document, which an edited file must not match.
+        Signatures of documents no longer in the collection are passed over; blank texts
+        have no signature and are never duplicates.
+        """
+        signature = self.dedup_index.hasher.signature(cleaned_text)
+        if signature is None:
+            return None, 0.0, None
+        excluded = {exclude} if exclude else set()
+        while True:
+            match = self.dedup_index.query(signature, exclude=excluded)
+            if match is None:
+                return None, 0.0, signature
+            if self.collection.get(ids=[match[0]])["ids"]:
+                return match[0], match[1], signature
+            excluded.add(match[0])
+
+    def _upsert(self, doc_id: str, class_name: str, cleaned_text: str, entities: Dict[str, Any], metadata: Dict[str, Any]) -> None:
+        """Upsert a document into ChromaDB, together with its entity rows when an entity index is configured."""
+        self.upsert_many([(doc_id, class_name, cleaned_text, entities, metadata)])
+
+    def upsert_many(self, documents: List[Tuple[str, str, str, Dict[str, Any], Dict[str, Any]]]) -> None:
+        """Upsert (doc_id, class_name, cleaned_text, entities, metadata) tuples in one ChromaDB call and one entity transaction."""
+        # Ids must be unique within one upsert; identical texts keep the last document.
+        by_id = {doc_id: (class_name, cleaned_text, entities, metadata) for doc_id, class_name, cleaned_text, entities, metadata in documents}
+
+        def upsert():
+            self.collection.upsert(
+                documents=[text for _, text, _, _ in by_id.values()],
+                metadatas=[metadata for _, _, _, metadata in by_id.values()],
+                ids=list(by_id),
+            )
+            if self.chunk_index is not None:
+                for doc_id, (_, cleaned_text, _, metadata) in by_id.items():
+                    self.chunk_index.index(doc_id, cleaned_text, metadata)
+
+        with stage_timer("upsert"):
+            if self.entity_index is not None:
+                self.entity_index.write([(doc_id, class_name, entities) for doc_id, (class_name, _, entities, _) in by_id.items()], upsert=upsert)
+            else:
+                upsert()
+
+    @staticmethod
+    def document_metadata(key: str, class_name: str, filename: str, ocr_result: OCRResult, entities: Dict[str, Any]) -> Dict[str, Any]:
+        """ChromaDB metadata stored with a document."""
+        return {
+            "class": class_name,
+            "filename": filename,
+            "source_path": key,
+            "confidence": ocr_result.confidence,
+            "page_count": ocr_result.page_count,
+            "detected_languages": ",".join((ocr_result.metadata or {}).get("detected_languages", [])),
+            "entities": json.dumps(entities)  # Store extracted entities as JSON string
+        }
+
+    def record_stored(
+        self,
+        manifest: IngestionManifest,
+        key: str,
+        stat: os.stat_result,
+        content_hash: str,
+        previous: Optional[ManifestEntry],
+        doc_id: str,
+        signature=None,
+    ) -> None:
+        """Bookkeeping after a document is upserted: dedup index, manifest entry and stale document removal."""
+        if signature is not None:
+            self.dedup_index.add(doc_id, signature)
+        manifest.record(key, stat, content_hash, STATUS_DONE, doc_id)
+        self._release(manifest, previous, doc_id)
+
+    def record_duplicate(
+        self,
+        manifest: IngestionManifest,
+        key: str,
+        stat: os.stat_result,
+        content_hash: str,
+        previous: Optional[ManifestEntry],
+        duplicate_id: str,
+    ) -> None:
+        """Bookkeeping after a file is found to be a near-duplicate of `duplicate_id`."""
+        manifest.record(key, stat, content_hash, STATUS_DUPLICATE, duplicate_id)
+        self._release(manifest, previous, duplicate_id)
+
+    def _release(self, manifest: IngestionManifest, previous: Optional[ManifestEntry], doc_id: str) -> None:
+        # A reprocessed file leaves its previous document behind unless another file still points at it.
+        if (previous is not None and previous.document_id and previous.document_id != doc_id
+                and manifest.references(previous.document_id) == 0):
+            self._remove_document(previous.document_id)
+
+    @staticmethod
+    def own_document_id(manifest: IngestionManifest, previous: Optional[ManifestEntry]) -> Optional[str]:
+        """The document a file stored on its last run, when no other file stores the same content; None otherwise."""
+        # Files recorded as near-duplicates of it do not count: they point at the content, they do not own it.
+        if (previous is not None and previous.status == STATUS_DONE and previous.document_id
+                and manifest.references(previous.document_id, STATUS_DONE) == 1):
+            return previous.document_id
+        return None
+
+    def _remove_document(self, doc_id: str) -> None:
+        """Remove a stored document that no longer corresponds to any file."""
+        self.collection.delete(ids=[doc_id])
+        if self.chunk_index is not None:
+            self.chunk_index.remove(doc_id)
+        if self.entity_index is not None:
+            self.entity_index.delete([doc_id])
+
+    def open_manifest(self) -> IngestionManifest:
+        """Open the ingestion manifest configured by `manifest_path`, adopting legacy files when it is new."""
+        manifest = IngestionManifest(self.manifest_path, self.processor_version)
+        if len(manifest) == 0:
+            self._adopt_legacy_files(manifest, list(self.iter_files()))
+        return manifest
+
+    def iter_files(self):
+        """Yield (manifest key, class name, filename, path) for every supported file under the input directory."""
+        supported_formats = self.ocr_processor_pipeline.processor.get_supported_formats()
+        class_names = os.listdir(self.input_dir)
+        for idx, class_name in enumerate(class_names, start=1):
+            logger.info(f"Processing class: {class_name}, there are {len(class_names) - idx} classes remaining")
             class_path = os.path.join(self.input_dir, class_name)
             if not os.path.isdir(class_path):
-                logger.info(f"Skipping {class_name}: Not a directory")
+                logger.info("Skipping %s: Not a directory", class_name, extra={"event": "file_skipped"})
                 continue
 
             for filename in os.listdir(class_path):
                 if not any(filename.lower().endswith(f".{fmt}") for fmt in supported_formats):
-                    logger.info(f"Skipping {filename} in class {class_name}: Unsupported format")
+                    logger.info("Skipping %s in class %s: Unsupported format", filename, class_name, extra={"event": "file_skipped"})
                     continue
 
                 file_path = os.path.join(class_path, filename)
                 if not os.path.isfile(file_path) or not os.access(file_path, os.R_OK):
-                    logger.info(f"Skipping {filename} in class {class_name}: File does not exist or is not readable")
+                    logger.info("Skipping %s in class %s: File does not exist or is not readable", filename, class_name,
+                                extra={"event": "file_skipped"})
                     continue
 
-                # Check if document already exists in ChromaDB
-                if filename in existing_ids:
-                    logger.info(f"Skipping {filename} in class {class_name}: Already processed")
-                    skipped_count += 1
-                    continue
+                yield f"{class_name}/{filename}", class_name, filename, file_path
+
+    def entry_for_path(self, file_path: str) -> Optional[Tuple[str, str, str, str]]:
+        """(manifest key, class name, filename, path) for a file inside a class subfolder, or None if it is not ingestible."""
+        class_path, filename = os.path.split(os.path.abspath(file_path))
+        if os.path.dirname(class_path) != os.path.abspath(self.input_dir):
+            return None
+        supported_formats = self.ocr_processor_pipeline.processor.get_supported_formats()
+        if not any(filename.lower().endswith(f".{fmt}") for fmt in supported_formats):
+            return None
+        if not os.path.isfile(file_path) or not os.access(file_path, os.R_OK):
+            return None
+        class_name = os.path.basename(class_path)
+        return f"{class_name}/{filename}", class_name, filename, file_path
+
+    def process_file(self, manifest: IngestionManifest, key: str, class_name: str, filename: str, file_path: str) -> str:
+        """
+        Process one file if the manifest says it is new or changed.
+
+        Returns "processed", "skipped", "duplicate" or "error".
+        """
+        stat = os.stat(file_path)
+        content_hash = manifest.check(key, file_path, stat)
+        if content_hash is None:
+            return "skipped"
+        previous = manifest.entries.get(key)
+
+        try:
+            ocr_result = self.ocr_processor_pipeline.process_file(file_path)
+            with stage_timer("clean"):
+                cleaned_text = self.clean_text(ocr_result.text)
+            signature = None
+            if self.dedup_index is not None:
+                with stage_timer("dedup"):
+                    duplicate_id, similarity, signature = self.find_duplicate(
+                        cleaned_text, exclude=self.own_document_id(manifest, previous))
+                if duplicate_id is not None:
+                    logger.info("Skipping %s in class %s: Near-duplicate of %s (similarity %.2f)", filename, class_name,
+                                duplicate_id, similarity, extra={"event": "file_duplicate"})
+                    self.record_duplicate(manifest, key, stat, content_hash, previous, duplicate_id)
+                    return "duplicate"
+            # Extract entities for this document
+            with stage_timer("extract"):
+                entities = self.entity_extractor.extract_entities(cleaned_text, class_name, blocks=ocr_result.blocks)
+            doc_id = content_key(cleaned_text)
+            self._upsert(doc_id, class_name, cleaned_text, entities, self.document_metadata(key, class_name, filename, ocr_result, entities))
+            self.record_stored(manifest, key, stat, content_hash, previous, doc_id, signature)
+            logger.info("Successfully processed: %s in class %s", filename, class_name, extra={"event": "file_processed"})
+            return "processed"
+        except OCRProcessingError as e:
+            logger.error(f"OCR Error processing {filename} in class {class_name}: {e}")
+            manifest.record(key, stat, content_hash, STATUS_ERROR, error=str(e))
+        except Exception as e:
+            logger.error(f"Unexpected error processing {filename} in class {class_name}: {e}")
+            manifest.record(key, stat, content_hash, STATUS_ERROR, error=str(e))
+        return "error"
+
+    def _adopt_legacy_files(self, manifest: IngestionManifest, files) -> None:
+        """
+        Record files ingested before the manifest existed (matched by stored class and filename) as done,
+        so the first run with an empty manifest does not reprocess the whole collection. The stored
+        document id is kept, so editing an adopted file later removes its old document.
+        """
+        existing_sources = self.get_existing_sources()
+        if not existing_sources:
+            return
+        adopted = 0
+        for key, class_name, filename, file_path in files:
+            doc_id = existing_sources.get((class_name, filename))
+            if doc_id is not None:
+                manifest.record(key, os.stat(file_path), file_hash(file_path), STATUS_DONE, doc_id)
+                adopted += 1
+        manifest.commit()
+        logger.info(f"Recorded {adopted} previously processed files in the ingestion manifest")
+
+    def generate(self) -> Dict[str, int]:
+        """
+        Process new or changed document images and upsert into ChromaDB, skipping files the manifest marks as done.
+
+        Returns the number of files per outcome ("processed", "skipped", "duplicate", "error").
+        """
+        counts = {"processed": 0, "skipped": 0, "duplicate": 0, "error": 0}
+        manifest = self.open_manifest()
+        try:
+            files = list(self.iter_files())
+            logger.info(f"Found {len(manifest)} files in the ingestion manifest")
 
-                try:
-                    ocr_result = self.ocr_processor_pipeline.process_file(file_path)
-                    cleaned_text = self.clean_text(ocr_result.text)
-                    # Extract entities for this document
-                    entities = entity_extractor.extract_entities(cleaned_text, class_name)
-                    self.collection.upsert(
-                        documents=[cleaned_text],
-                        metadatas=[{
-                            "class": class_name,
-                            "filename": filename,
-                            "confidence": ocr_result.confidence,
-                            "page_count": ocr_result.page_count,
-                            "detected_languages": ",".join(ocr_result.metadata.get("detected_languages", [])),
-                            "entities": json.dumps(entities)  # Store extracted entities as JSON string
-                        }],
-                        ids=[filename]
-                    )
-                    processed_count += 1
-                    logger.info(f"Successfully processed: {filename} in class {class_name}")
-                except OCRProcessingError as e:
-                    logger.error(f"OCR Error processing {filename} in class {class_name}: {e}")
-                    error_count += 1
-                except Exception as e:
-                    logger.error(f"Unexpected error processing {filename} in class {class_name}: {e}")
-                    error_count += 1
+            for key, class_name, filename, file_path in files:
+                counts[self.process_file(manifest, key, class_name, filename, file_path)] += 1
+        finally:
+            manifest.close()
+            if self.dedup_index is not None:
+                self.dedup_index.save()
 
+        processed_count, skipped_count = counts["processed"], counts["skipped"]
+        duplicate_count, error_count = counts["duplicate"], counts["error"]
         # Summary report
         logger.info(f"=== Processing Summary ===")
         logger.info(f"Newly processed documents: {processed_count}")
-        logger.info(f"Skipped (already processed): {skipped_count}")
+        logger.info(f"Skipped (unchanged): {skipped_count}")
+        logger.info(f"Skipped (near-duplicates): {duplicate_count}")
         logger.info(f"Errors encountered: {error_count}")
         
-        if processed_count == 0 and skipped_count == 0:
+        if processed_count == 0 and skipped_count == 0 and duplicate_count == 0:
             logger.warning("No valid files were found to process.")
-        elif processed_count == 0 and skipped_count > 0:
+        elif processed_count == 0:
             logger.info("All documents have already been processed.")
         else:
             logger.info(f"Successfully processed and upserted {processed_count} new documents into ChromaDB")
-
-    
-
-
-
+        return counts
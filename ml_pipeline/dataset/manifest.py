@@ -0,0 +1,157 @@
+"""SQLite manifest of ingested files, so re-runs only process new or changed files."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from services.logger import logger
+
+STATUS_DONE = "done"
+STATUS_DUPLICATE = "duplicate"
+STATUS_ERROR = "error"
+# Entries in these states are skipped while the file and processor version are unchanged.
+FINAL_STATUSES = (STATUS_DONE, STATUS_DUPLICATE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    processor_version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    document_id TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    processor_version: str
+    status: str
+    document_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class IngestionManifest:
+    """
+    Records path, size, mtime, content hash, processor version and status of every ingested file.
+
+    `check` decides from a stat whether a file must be processed: unchanged size and mtime
+    skip without reading the file; otherwise the content hash decides, so touched-but-identical
+    files are not reprocessed. All entries are loaded once, so a re-run over an unchanged tree
+    costs one stat per file. Writes are committed every `commit_every` records and on `close`.
+    The manifest may be shared by several ingestion threads.
+    """
+
+    def __init__(self, path: str, processor_version: str, commit_every: int = 100):
+        self.path = path
+        self.processor_version = processor_version
+        self.commit_every = commit_every
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(_SCHEMA)
+        self.connection.commit()
+        self._uncommitted = 0
+        self.entries: Dict[str, ManifestEntry] = {
+            row[0]: ManifestEntry(*row)
+            for row in self.connection.execute(
+                "SELECT path, size, mtime_ns, content_hash, processor_version, status, document_id, error FROM files")
+        }
+        # (document_id, status) -> number of entries pointing at it, kept in step with `entries` by `record`
+        self._references = Counter((entry.document_id, entry.status) for entry in self.entries.values() if entry.document_id)
+        logger.info(f"[IngestionManifest] Loaded {len(self.entries)} entries from {path}")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def check(self, key: str, file_path: str, stat: os.stat_result) -> Optional[str]:
+        """
+        Return the content hash of a file that needs processing, or None when it can be skipped.
+
+        `key` identifies the file in the manifest (e.g. its path relative to the input directory).
+        """
+        entry = self.entries.get(key)
+        current = (
+            entry is not None
+            and entry.status in FINAL_STATUSES
+            and entry.processor_version == self.processor_version
+        )
+        if current and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return None
+        content_hash = file_hash(file_path)
+        if current and entry.content_hash == content_hash:
+            # Touched but unchanged: remember the new mtime so the next run skips on stat alone.
+            self.record(key, stat, content_hash, entry.status, entry.document_id)
+            return None
+        return content_hash
+
+    def record(
+        self,
+        key: str,
+        stat: os.stat_result,
+        content_hash: str,
+        status: str,
+        document_id: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        entry = ManifestEntry(key, stat.st_size, stat.st_mtime_ns, content_hash, self.processor_version, status, document_id, error)
+        with self._lock:
+            replaced = self.entries.get(key)
+            if replaced is not None and replaced.document_id:
+                self._references[replaced.document_id, replaced.status] -= 1
+            if document_id:
+                self._references[document_id, status] += 1
+            self.entries[key] = entry
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (entry.path, entry.size, entry.mtime_ns, entry.content_hash, entry.processor_version,
+                 entry.status, entry.document_id, entry.error, time.time()),
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self._commit()
+
+    def references(self, document_id: str, status: Optional[str] = None) -> int:
+        """Number of files pointing at `document_id`, optionally only those with `status`."""
+        with self._lock:
+            if status is not None:
+                return self._references[document_id, status]
+            return sum(self._references[document_id, final] for final in FINAL_STATUSES)
+
+    def _commit(self) -> None:
+        self.connection.commit()
+        self._uncommitted = 0
+
+    def commit(self) -> None:
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self.connection.close()
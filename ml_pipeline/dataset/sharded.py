@@ -0,0 +1,223 @@
+"""Multiprocess ingestion: OCR and entity extraction in worker processes, one writer owning ChromaDB."""
+
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ml_pipeline.dataset.dedup import content_key
+from ml_pipeline.dataset.generator import TextDatasetGenerator
+from ml_pipeline.dataset.manifest import STATUS_ERROR, ManifestEntry
+from ml_pipeline.entity_extractor.extractor import EntityExtractor
+from ml_pipeline.ocr.base import OCRResult
+from ml_pipeline.ocr.pipeline import OCRPipeline
+from services.logger import logger
+from services.metrics import STAGE_SECONDS
+from services.model_preload import set_torch_threads, worker_torch_threads
+
+OCR_ENGINES = ("vision", "tesseract", "tesserocr")
+
+
+def build_ocr_pipeline(engine: str, vision_endpoint: Optional[str] = None) -> OCRPipeline:
+    """Build the OCR pipeline for an engine name (importable in worker processes); `vision_endpoint` overrides the Vision API host."""
+    if engine == "tesseract":
+        from ml_pipeline.ocr.tesseract import TesseractOCRProcessor
+        return OCRPipeline(processor=TesseractOCRProcessor())
+    if engine == "tesserocr":
+        from ml_pipeline.ocr.tesseract_engine import TesseractEngineOCRProcessor
+        return OCRPipeline(processor=TesseractEngineOCRProcessor())
+    if engine == "vision":
+        from ml_pipeline.ocr.google_cloud_vision import GoogleCloudVisionOCRProcessor
+        config = {"language_hints": ["en"], "box_levels": ["block", "word"]}
+        if vision_endpoint:
+            config["api_endpoint"] = vision_endpoint
+        return OCRPipeline(processor=GoogleCloudVisionOCRProcessor(config=config))
+    raise ValueError(f"Unknown OCR engine: {engine}")
+
+
+@dataclass
+class AnalyzedFile:
+    """What a worker sends back to the writer for one file."""
+    key: str
+    cleaned_text: str = ""
+    entities: Optional[Dict[str, Any]] = None
+    confidence: float = 0.0
+    page_count: int = 1
+    detected_languages: Optional[List[str]] = None
+    error: Optional[str] = None
+    # Stage timings measured in the worker, reported by the writer (metrics are per process)
+    stage_seconds: Optional[Dict[str, float]] = None
+
+
+# Per-process state, set once by _init_worker so models load once per worker, not per file.
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(ocr_engine: str, extractor_kwargs: Dict[str, Any], processes: int) -> None:
+    # Split the cores between workers instead of letting every worker's torch use all of them.
+    set_torch_threads(worker_torch_threads(processes))
+    _worker["pipeline"] = build_ocr_pipeline(ocr_engine)
+    _worker["extractor"] = EntityExtractor(**extractor_kwargs)
+    logger.info(f"[ShardedIngestor] Worker {os.getpid()} ready ({ocr_engine})")
+
+
+def _analyze(task: Tuple[str, str, str]) -> AnalyzedFile:
+    key, class_name, file_path = task
+    try:
+        start = time.perf_counter()
+        ocr_result = _worker["pipeline"].process_file(file_path)
+        ocr_done = time.perf_counter()
+        cleaned_text = TextDatasetGenerator.clean_text(ocr_result.text)
+        entities = _worker["extractor"].extract_entities(cleaned_text, class_name, blocks=ocr_result.blocks)
+        return AnalyzedFile(
+            key=key,
+            cleaned_text=cleaned_text,
+            entities=entities,
+            stage_seconds={"ocr": ocr_done - start, "extract": time.perf_counter() - ocr_done},
+            confidence=ocr_result.confidence,
+            page_count=ocr_result.page_count,
+            detected_languages=list((ocr_result.metadata or {}).get("detected_languages", [])),
+        )
+    except Exception as e:
+        return AnalyzedFile(key=key, error=f"{type(e).__name__}: {e}")
+
+
+@dataclass
+class _PendingFile:
+    class_name: str
+    filename: str
+    stat: os.stat_result
+    content_hash: str
+    previous: Optional[ManifestEntry]
+
+
+class ShardedIngestor:
+    """
+    Ingests a TextDatasetGenerator's input directory with `processes` worker processes.
+
+    The parent stats the tree against the ingestion manifest and hands the files that need
+    processing to a spawn-started pool in chunks of `chunksize`. Each worker loads its OCR
+    pipeline and entity extractor once and returns cleaned text and entities. The parent is
+    the single writer: it owns the ChromaDB client, the manifest and the dedup index, and
+    upserts results in batches of `write_batch_size`. Near-duplicates are detected by the
+    writer, so unlike the sequential path their extraction has already run. Files are matched
+    against the index and against the pending write batch; duplicates within a batch are
+    recorded once the batch is written.
+    """
+
+    def __init__(
+        self,
+        generator: TextDatasetGenerator,
+        processes: int,
+        ocr_engine: str = "vision",
+        extractor_kwargs: Optional[Dict[str, Any]] = None,
+        write_batch_size: int = 32,
+        chunksize: int = 4,
+    ):
+        self.generator = generator
+        self.processes = processes
+        self.ocr_engine = ocr_engine
+        self.extractor_kwargs = extractor_kwargs or {}
+        self.write_batch_size = write_batch_size
+        self.chunksize = chunksize
+
+    def run(self) -> Dict[str, int]:
+        """Process new or changed files; returns counts per outcome."""
+        generator = self.generator
+        counts = {"processed": 0, "skipped": 0, "duplicate": 0, "error": 0}
+        manifest = generator.open_manifest()
+        started = time.perf_counter()
+        try:
+            pending: Dict[str, _PendingFile] = {}
+            tasks = []
+            for key, class_name, filename, file_path in generator.iter_files():
+                stat = os.stat(file_path)
+                content_hash = manifest.check(key, file_path, stat)
+                if content_hash is None:
+                    counts["skipped"] += 1
+                    continue
+                pending[key] = _PendingFile(class_name, filename, stat, content_hash, manifest.entries.get(key))
+                tasks.append((key, class_name, file_path))
+            logger.info(f"[ShardedIngestor] {len(tasks)} files to process with {self.processes} processes, {counts['skipped']} unchanged")
+
+            if tasks:
+                context = multiprocessing.get_context("spawn")
+                with context.Pool(self.processes, initializer=_init_worker,
+                                  initargs=(self.ocr_engine, self.extractor_kwargs, self.processes)) as pool:
+                    batch: List[Tuple[AnalyzedFile, _PendingFile, Any]] = []
+                    for result in pool.imap_unordered(_analyze, tasks, chunksize=self.chunksize):
+                        item = pending.pop(result.key)
+                        outcome = self._accept(manifest, result, item, batch)
+                        if outcome:
+                            counts[outcome] += 1
+                        if len(batch) >= self.write_batch_size:
+                            self._flush(manifest, batch, counts)
+                    self._flush(manifest, batch, counts)
+        finally:
+            manifest.close()
+            if generator.dedup_index is not None:
+                generator.dedup_index.save()
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"[ShardedIngestor] Done in {elapsed:.1f}s: {counts}")
+        return counts
+
+    def _accept(self, manifest, result: AnalyzedFile, item: _PendingFile, batch: list) -> Optional[str]:
+        """Record failures and near-duplicates of stored documents immediately; queue the rest for the next write batch."""
+        if result.error is not None:
+            logger.error(f"[ShardedIngestor] Error processing {result.key}: {result.error}")
+            manifest.record(result.key, item.stat, item.content_hash, STATUS_ERROR, error=result.error)
+            return "error"
+        for stage, seconds in (result.stage_seconds or {}).items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+        signature = duplicate_of = None
+        dedup_index = self.generator.dedup_index
+        if dedup_index is not None:
+            duplicate_id, similarity, signature = self.generator.find_duplicate(
+                result.cleaned_text, exclude=self.generator.own_document_id(manifest, item.previous))
+            if duplicate_id is not None:
+                self._record_duplicate(manifest, result, item, duplicate_id, similarity)
+                return "duplicate"
+            # Not in the index until its batch is written: compare with the batch's own files
+            for pending_result, _, pending_signature, pending_duplicate in batch if signature is not None else ():
+                if pending_duplicate is None and pending_signature is not None:
+                    similarity = float((pending_signature == signature).mean())
+                    if similarity >= dedup_index.threshold:
+                        duplicate_of = (content_key(pending_result.cleaned_text), similarity)
+                        break
+        batch.append((result, item, signature, duplicate_of))
+        return None
+
+    def _record_duplicate(self, manifest, result: AnalyzedFile, item: _PendingFile, duplicate_id: str, similarity: float) -> None:
+        logger.info("[ShardedIngestor] Skipping %s: Near-duplicate of %s (similarity %.2f)", result.key, duplicate_id,
+                    similarity, extra={"event": "file_duplicate"})
+        self.generator.record_duplicate(manifest, result.key, item.stat, item.content_hash, item.previous, duplicate_id)
+
+    def _flush(self, manifest, batch: list, counts: Dict[str, int]) -> None:
+        """Upsert a write batch and record its files in the manifest."""
+        if not batch:
+            return
+        stored = [entry for entry in batch if entry[3] is None]
+        documents = []
+        for result, item, _, _ in stored:
+            ocr_result = OCRResult(text=result.cleaned_text, confidence=result.confidence, page_count=result.page_count,
+                                   metadata={"detected_languages": result.detected_languages or []})
+            metadata = self.generator.document_metadata(result.key, item.class_name, item.filename, ocr_result, result.entities)
+            documents.append((content_key(result.cleaned_text), item.class_name, result.cleaned_text, result.entities, metadata))
+        try:
+            self.generator.upsert_many(documents)
+        except Exception as e:
+            logger.error(f"[ShardedIngestor] Write batch of {len(batch)} documents failed: {e}")
+            for result, item, _, _ in batch:
+                manifest.record(result.key, item.stat, item.content_hash, STATUS_ERROR, error=str(e))
+            counts["error"] += len(batch)
+            batch.clear()
+            return
+        for (result, item, signature, _), (doc_id, *_) in zip(stored, documents):
+            self.generator.record_stored(manifest, result.key, item.stat, item.content_hash, item.previous, doc_id, signature)
+        for result, item, _, (duplicate_id, similarity) in (entry for entry in batch if entry[3] is not None):
+            self._record_duplicate(manifest, result, item, duplicate_id, similarity)
+        counts["processed"] += len(stored)
+        counts["duplicate"] += len(batch) - len(stored)
+        batch.clear()
@@ -0,0 +1,252 @@
+"""
+Versioned, checksummed snapshots of the ChromaDB collections, so new instances can load a
+warm classifier corpus without OCR or re-embedding.
+
+Layout of a snapshot directory (one per version, `LATEST` in the parent names the newest):
+
+    snapshot.json                 format, version, embedding model, per-collection count/dim and sha256 of each file
+    <collection>.embeddings.npy   float32 (count, dim) array, written and read memory-mapped
+    <collection>.records.jsonl    one {"id", "document", "metadata"} object per row, in embedding order
+    entities.jsonl                optional: one structured entity row (DocumentEntity columns) per line
+    dedup.signatures.npy          optional: the near-duplicate index (NearDuplicateIndex files)
+    dedup.keys.json
+
+The ingestion manifest is not included: its keys are paths on the host that built the index.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from ml_pipeline.dataset.dedup import KEYS_FILE, SIGNATURE_LOG, SIGNATURES_FILE, NearDuplicateIndex
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_NAME = "snapshot.json"
+LATEST_NAME = "LATEST"
+ENTITIES_FILE = "entities.jsonl"
+# NearDuplicateIndex file -> snapshot file
+DEDUP_FILES = {SIGNATURES_FILE: "dedup.signatures.npy", KEYS_FILE: "dedup.keys.json"}
+# Suffix of the collection an import is built in before it replaces the live one
+IMPORT_SUFFIX = "__import"
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing, incomplete or fails verification."""
+    pass
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _export_collection(collection, directory: str, name: str, batch_size: int) -> Dict[str, Any]:
+    """Write one collection's embeddings and records; returns its manifest entry."""
+    ids = collection.get(include=[])["ids"]
+    embeddings_file = f"{name}.embeddings.npy"
+    records_file = f"{name}.records.jsonl"
+    embeddings = None
+    dim = 0
+    with open(os.path.join(directory, records_file), "w") as records:
+        for start in range(0, len(ids), batch_size):
+            batch = collection.get(ids=ids[start:start + batch_size], include=["embeddings", "documents", "metadatas"])
+            vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+            if embeddings is None:
+                dim = vectors.shape[1]
+                embeddings = np.lib.format.open_memmap(
+                    os.path.join(directory, embeddings_file), mode="w+", dtype=np.float32, shape=(len(ids), dim))
+            embeddings[start:start + len(vectors)] = vectors
+            for doc_id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                records.write(json.dumps({"id": doc_id, "document": document, "metadata": metadata}) + "\n")
+    if embeddings is None:
+        np.save(os.path.join(directory, embeddings_file), np.empty((0, 0), dtype=np.float32))
+    else:
+        embeddings.flush()
+        del embeddings
+    return {
+        "count": len(ids),
+        "dim": dim,
+        "files": {filename: _sha256(os.path.join(directory, filename)) for filename in (embeddings_file, records_file)},
+    }
+
+
+def _export_entities(rows: Iterable[Dict[str, Any]], directory: str) -> Dict[str, Any]:
+    count = 0
+    with open(os.path.join(directory, ENTITIES_FILE), "w") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str) + "\n")
+            count += 1
+    return {"count": count, "files": {ENTITIES_FILE: _sha256(os.path.join(directory, ENTITIES_FILE))}}
+
+
+def _export_dedup(dedup_dir: str, directory: str) -> Optional[Dict[str, Any]]:
+    if os.path.isfile(os.path.join(dedup_dir, SIGNATURE_LOG)):
+        # Fold logged signatures into the snapshot files first
+        NearDuplicateIndex(dedup_dir).save()
+    if not all(os.path.isfile(os.path.join(dedup_dir, name)) for name in DEDUP_FILES):
+        return None
+    for name, snapshot_name in DEDUP_FILES.items():
+        shutil.copyfile(os.path.join(dedup_dir, name), os.path.join(directory, snapshot_name))
+    with open(os.path.join(directory, DEDUP_FILES[KEYS_FILE])) as f:
+        count = len(json.load(f))
+    return {"count": count, "files": {name: _sha256(os.path.join(directory, name)) for name in DEDUP_FILES.values()}}
+
+
+def export_snapshot(collections: Dict[str, Any], output_dir: str, embedding_model: str, batch_size: int = 1000,
+                    entities: Optional[Iterable[Dict[str, Any]]] = None, dedup_dir: Optional[str] = None) -> str:
+    """
+    Snapshot `collections` (name -> ChromaDB collection) into a new version under `output_dir`.
+
+    `entities` (structured entity rows) and the near-duplicate index files in `dedup_dir` are
+    included when given. The snapshot is written to a temporary directory and renamed into place,
+    then `LATEST` is updated, so readers never see a partial snapshot. Returns the snapshot directory.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_dir = os.path.join(output_dir, f".tmp-{os.getpid()}-{int(time.time())}")
+    os.makedirs(tmp_dir)
+    try:
+        entries = {name: _export_collection(collection, tmp_dir, name, batch_size) for name, collection in collections.items()}
+        extras = {}
+        if entities is not None:
+            extras["entities"] = _export_entities(entities, tmp_dir)
+        dedup = _export_dedup(dedup_dir, tmp_dir) if dedup_dir else None
+        if dedup is not None:
+            extras["dedup"] = dedup
+        checksums = "".join(sha for entry in [*entries.values(), *extras.values()] for sha in sorted(entry["files"].values()))
+        version = f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{hashlib.sha256(checksums.encode()).hexdigest()[:8]}"
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": version,
+            "created_at": time.time(),
+            "embedding_model": embedding_model,
+            "collections": entries,
+            **extras,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        snapshot_dir = os.path.join(output_dir, version)
+        os.replace(tmp_dir, snapshot_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    with open(os.path.join(output_dir, LATEST_NAME + ".tmp"), "w") as f:
+        f.write(version + "\n")
+    os.replace(os.path.join(output_dir, LATEST_NAME + ".tmp"), os.path.join(output_dir, LATEST_NAME))
+    return snapshot_dir
+
+
+def resolve_snapshot(path: str) -> str:
+    """Return the snapshot directory for `path`: a snapshot itself, or a parent whose LATEST names one."""
+    if os.path.isfile(os.path.join(path, MANIFEST_NAME)):
+        return path
+    latest = os.path.join(path, LATEST_NAME)
+    if os.path.isfile(latest):
+        with open(latest) as f:
+            snapshot_dir = os.path.join(path, f.read().strip())
+        if os.path.isfile(os.path.join(snapshot_dir, MANIFEST_NAME)):
+            return snapshot_dir
+    raise SnapshotError(f"No index snapshot found at {path}")
+
+
+def verify_snapshot(snapshot_dir: str, embedding_model: Optional[str] = None) -> Dict[str, Any]:
+    """Check format, embedding model, checksums and array shapes; returns the manifest or raises SnapshotError."""
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Unreadable snapshot manifest in {snapshot_dir}: {e}")
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format')!r}")
+    if embedding_model and manifest.get("embedding_model") != embedding_model:
+        raise SnapshotError(
+            f"Snapshot embeddings come from {manifest.get('embedding_model')!r}, this instance uses {embedding_model!r}")
+    for entry in [*manifest["collections"].values(), *(manifest[key] for key in ("entities", "dedup") if key in manifest)]:
+        for filename, expected in entry["files"].items():
+            path = os.path.join(snapshot_dir, filename)
+            if not os.path.isfile(path):
+                raise SnapshotError(f"Snapshot file {filename} is missing")
+            if _sha256(path) != expected:
+                raise SnapshotError(f"Checksum mismatch for {filename}")
+    for name, entry in manifest["collections"].items():
+        embeddings = np.load(os.path.join(snapshot_dir, f"{name}.embeddings.npy"), mmap_mode="r")
+        if entry["count"] and embeddings.shape != (entry["count"], entry["dim"]):
+            raise SnapshotError(f"{name} embeddings have shape {embeddings.shape}, expected ({entry['count']}, {entry['dim']})")
+    return manifest
+
+
+def import_snapshot(snapshot_dir: str, client, embedding_function, embedding_model: str,
+                    batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Verify a snapshot and load it into `client`, replacing its collections of the same names.
+
+    Each collection is built as `<name>__import` and renamed over the live one only once it is
+    fully loaded, so a failed import leaves the existing collection in place. Stored embeddings
+    are passed to ChromaDB as-is, so nothing is re-embedded. Returns the manifest.
+    """
+    manifest = verify_snapshot(snapshot_dir, embedding_model)
+    for name, entry in manifest["collections"].items():
+        staging_name = name + IMPORT_SUFFIX
+        _delete_collection(client, staging_name)  # left over from an interrupted import
+        collection = client.get_or_create_collection(name=staging_name, embedding_function=embedding_function)
+        try:
+            if entry["count"]:
+                _load_collection(collection, snapshot_dir, name, entry["count"], batch_size)
+        except BaseException:
+            _delete_collection(client, staging_name)
+            raise
+        _delete_collection(client, name)
+        collection.modify(name=name)
+    return manifest
+
+
+def _delete_collection(client, name: str) -> None:
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass  # nothing to delete
+
+
+def _load_collection(collection, snapshot_dir: str, name: str, count: int, batch_size: int) -> None:
+    embeddings = np.load(os.path.join(snapshot_dir, f"{name}.embeddings.npy"), mmap_mode="r")
+    with open(os.path.join(snapshot_dir, f"{name}.records.jsonl")) as records_file:
+        for start in range(0, count, batch_size):
+            records = [json.loads(next(records_file)) for _ in range(min(batch_size, count - start))]
+            collection.add(
+                ids=[record["id"] for record in records],
+                embeddings=np.asarray(embeddings[start:start + len(records)]).tolist(),
+                documents=[record["document"] for record in records],
+                metadatas=[record["metadata"] or None for record in records],
+            )
+
+
+def read_snapshot_entities(snapshot_dir: str) -> Iterator[Dict[str, Any]]:
+    """The structured entity rows of a snapshot (none when it was exported without them)."""
+    path = os.path.join(snapshot_dir, ENTITIES_FILE)
+    if not os.path.isfile(path):
+        return
+    with open(path) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def restore_dedup_index(snapshot_dir: str, dedup_dir: str) -> bool:
+    """Replace the near-duplicate index files in `dedup_dir` with the snapshot's; False when it has none."""
+    if not all(os.path.isfile(os.path.join(snapshot_dir, name)) for name in DEDUP_FILES.values()):
+        return False
+    os.makedirs(dedup_dir, exist_ok=True)
+    for name, snapshot_name in DEDUP_FILES.items():
+        shutil.copyfile(os.path.join(snapshot_dir, snapshot_name), os.path.join(dedup_dir, name + ".tmp"))
+    for name in DEDUP_FILES:
+        os.replace(os.path.join(dedup_dir, name + ".tmp"), os.path.join(dedup_dir, name))
+    # Signatures logged since the live snapshot was written are not part of the restored index
+    if os.path.exists(os.path.join(dedup_dir, SIGNATURE_LOG)):
+        os.remove(os.path.join(dedup_dir, SIGNATURE_LOG))
+    return True
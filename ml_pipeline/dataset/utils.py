@@ -1,27 +1,74 @@
-import re
 import unicodedata
+from typing import Dict, Optional
+
+_KEPT_PUNCTUATION = ".,!?"
+
+
+class _NormalizationTable(dict):
+    """
+    `str.translate` table mapping each code point to its cleaned form: whitespace becomes a
+    space, letters and digits are lowercased, combining marks and anything else outside
+    `\\w` and `.,!?` are deleted. Entries are computed on first sight and cached.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[str]:
+        char = chr(codepoint)
+        if char.isspace():
+            mapped = " "
+        elif unicodedata.combining(char):
+            mapped = None
+        elif char.isalnum() or char == "_" or char in _KEPT_PUNCTUATION:
+            mapped = char.lower()
+        else:
+            mapped = None
+        self[codepoint] = mapped
+        return mapped
+
+
+_TABLE = _NormalizationTable()
+# Pre-fill ASCII and Latin-1 so typical OCR text never falls back to `__missing__`
+for _codepoint in range(256):
+    _TABLE[_codepoint]
+
 
 def clean_text(text: str) -> str:
     """
-    Clean text for ML model input.
+    Clean text for ML model input; the same normalization is used at ingestion and query time.
     Steps:
-    - Normalize unicode (NFKC)
-    - Remove control characters
-    - Remove extra whitespace
+    - Decompose unicode (NFKD) and remove accents (skipped for ASCII text)
     - Convert to lowercase
-    - Remove non-alphanumeric and non-basic punctuation (.,!?)
-    - Remove accents from characters
+    - Remove characters other than letters, digits, underscore and basic punctuation (.,!?)
+    - Turn control characters and whitespace runs into single spaces, strip both ends
+    """
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+    return ' '.join(text.translate(_TABLE).split())
+
+
+def renormalize_documents(collection, chunk_index=None, batch_size: int = 256, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Re-apply `clean_text` to every document stored in a ChromaDB collection.
+
+    Changed documents are updated in place (ChromaDB re-embeds them) and, when a chunk index
+    is given, their chunks are rebuilt. Document ids are kept so manifest, entity and dedup
+    references stay valid. Returns counts of documents seen and changed.
     """
-    # Normalize unicode
-    text = unicodedata.normalize('NFKC', text)
-    # Remove accents
-    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
-    # Remove control characters
-    text = re.sub(r'[\r\n\t\x0b\x0c]', ' ', text)
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text.strip())
-    # Convert to lowercase
-    text = text.lower()
-    # Remove non-alphanumeric and non-basic punctuation (.,!?)
-    text = re.sub(r'[^\w\s.,!?]', '', text)
-    return text
\ No newline at end of file
+    ids = collection.get(include=[])["ids"]
+    counts = {"documents": len(ids), "changed": 0}
+    for start in range(0, len(ids), batch_size):
+        batch = collection.get(ids=ids[start:start + batch_size], include=["documents", "metadatas"])
+        changed_ids, changed_texts, changed_metadatas = [], [], []
+        for doc_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+            cleaned = clean_text(text or "")
+            if cleaned != text:
+                changed_ids.append(doc_id)
+                changed_texts.append(cleaned)
+                changed_metadatas.append(metadata or {})
+        counts["changed"] += len(changed_ids)
+        if dry_run or not changed_ids:
+            continue
+        collection.update(ids=changed_ids, documents=changed_texts)
+        if chunk_index is not None:
+            for doc_id, cleaned, metadata in zip(changed_ids, changed_texts, changed_metadatas):
+                chunk_index.index(doc_id, cleaned, metadata)
+    return counts
@@ -0,0 +1,350 @@
+"""Watch an input directory and feed new or changed files into ingestion as they land."""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import queue
+import select
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.logger import logger
+from services.metrics import registry
+
+INGEST_QUEUE_DEPTH = registry.gauge("ingest_queue_depth", "Files waiting for a watch-mode ingestion worker.")
+INGEST_IN_FLIGHT = registry.gauge("ingest_in_flight", "Files being processed by watch-mode ingestion workers.")
+INGEST_LAG_SECONDS = registry.histogram("ingest_lag_seconds", "Time from a file's mtime to the end of its ingestion.")
+INGEST_FILES = registry.counter("ingest_files_total", "Files handled by watch-mode ingestion.", ("outcome",))
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT_HEADER = struct.Struct("iIII")
+
+FileSignature = Tuple[int, int]
+
+
+def file_signature(path: str) -> Optional[FileSignature]:
+    """(size, mtime_ns) of a file, or None when it no longer exists."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def list_files(root: str) -> List[str]:
+    """Files in the class subfolders of `root` (the layout process_documents ingests)."""
+    paths = []
+    for class_entry in os.scandir(root):
+        if class_entry.is_dir():
+            paths.extend(entry.path for entry in os.scandir(class_entry.path) if entry.is_file())
+    return paths
+
+
+class DirectoryWatcher(ABC):
+    """Reports paths under a root directory (root/<class>/<file>) that were created or modified."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @abstractmethod
+    def poll(self, timeout: float) -> List[str]:
+        """Wait up to `timeout` seconds and return the paths that changed."""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class PollingWatcher(DirectoryWatcher):
+    """Portable fallback: compares (size, mtime) snapshots of the tree every `interval` seconds."""
+
+    def __init__(self, root: str, interval: float = 2.0):
+        super().__init__(root)
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self) -> Dict[str, FileSignature]:
+        snapshot = {}
+        for path in list_files(self.root):
+            signature = file_signature(path)
+            if signature is not None:
+                snapshot[path] = signature
+        return snapshot
+
+    def poll(self, timeout: float) -> List[str]:
+        wait = self._next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        if wait > 0:
+            time.sleep(wait)
+        self._next_scan = time.monotonic() + self.interval
+        snapshot = self._scan()
+        changed = [path for path, signature in snapshot.items() if self._snapshot.get(path) != signature]
+        self._snapshot = snapshot
+        return changed
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """Linux inotify watcher on the root and each class subfolder, via libc (no extra dependency)."""
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: Dict[int, str] = {}
+        self._add_watch(root)
+        for entry in os.scandir(root):
+            if entry.is_dir():
+                self._add_watch(entry.path)
+
+    def _add_watch(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self._directories[wd] = directory
+
+    def poll(self, timeout: float) -> List[str]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        changed = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + name_length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + name_length
+            if mask & IN_Q_OVERFLOW:
+                # The kernel dropped events; rescan everything and let the manifest skip unchanged files.
+                logger.warning("[InotifyWatcher] Event queue overflowed, rescanning")
+                return list_files(self.root)
+            directory = self._directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if directory == self.root:
+                    # A new class folder: watch it, and pick up files that landed before the watch existed.
+                    self._add_watch(path)
+                    changed.extend(entry.path for entry in os.scandir(path) if entry.is_file())
+            elif directory != self.root:
+                changed.append(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def open_watcher(root: str, poll_interval: float = 2.0, use_inotify: bool = True) -> DirectoryWatcher:
+    """Return an inotify watcher where available, else a polling watcher."""
+    if use_inotify:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"[open_watcher] inotify unavailable ({e}), polling every {poll_interval}s")
+    return PollingWatcher(root, poll_interval)
+
+
+class Debouncer:
+    """
+    Holds changed paths until they are quiet: no events for `quiet_seconds` and the same
+    size and mtime when checked, so files still being written are not ingested half-way.
+    """
+
+    def __init__(self, quiet_seconds: float = 2.0):
+        self.quiet_seconds = quiet_seconds
+        self._pending: Dict[str, Tuple[float, Optional[FileSignature]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def touch(self, path: str, now: float) -> None:
+        self._pending[path] = (now + self.quiet_seconds, file_signature(path))
+
+    def ready(self, now: float) -> List[str]:
+        """Pop and return the paths that have been stable for the quiet period."""
+        ready = []
+        for path, (deadline, signature) in list(self._pending.items()):
+            if deadline > now:
+                continue
+            current = file_signature(path)
+            if current is None:
+                del self._pending[path]
+            elif current != signature:
+                self._pending[path] = (now + self.quiet_seconds, current)
+            else:
+                del self._pending[path]
+                ready.append(path)
+        return ready
+
+
+class IngestMetrics:
+    """Queue depth and ingest lag (time from a file's mtime to its processing finishing)."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._lags: Deque[float] = deque(maxlen=window)
+        self.outcomes: Dict[str, int] = {}
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.debouncing = 0
+
+    def observe(self, outcome: str, lag_seconds: Optional[float]) -> None:
+        INGEST_FILES.inc(outcome=outcome)
+        if lag_seconds is not None:
+            INGEST_LAG_SECONDS.observe(lag_seconds)
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if lag_seconds is not None:
+                self._lags.append(lag_seconds)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            lags = sorted(self._lags)
+            outcomes = dict(self.outcomes)
+
+        def percentile(q: float) -> Optional[float]:
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))], 3) if lags else None
+
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "debouncing": self.debouncing,
+            "outcomes": outcomes,
+            "ingest_lag_seconds": {"p50": percentile(0.5), "p95": percentile(0.95), "max": lags[-1] if lags else None},
+        }
+
+
+class WatchIngestor:
+    """
+    Feeds files from a DirectoryWatcher into `process` with bounded concurrency.
+
+    Stable files go into a queue of at most `queue_size` entries served by `workers` threads.
+    When the queue is full the watch loop blocks, so events back up in the watcher (the kernel
+    queue for inotify, which falls back to a rescan on overflow) instead of in memory.
+    `process(path)` returns an outcome label; existing files are processed on start.
+    """
+
+    def __init__(
+        self,
+        watcher: DirectoryWatcher,
+        process: Callable[[str], str],
+        workers: int = 2,
+        queue_size: int = 64,
+        debounce_seconds: float = 2.0,
+        metrics: Optional[IngestMetrics] = None,
+        on_tick: Optional[Callable[["WatchIngestor"], None]] = None,
+        tick_seconds: float = 30.0,
+    ):
+        self.watcher = watcher
+        self.process = process
+        self.workers = workers
+        self.debouncer = Debouncer(debounce_seconds)
+        self.metrics = metrics or IngestMetrics()
+        self.on_tick = on_tick
+        self.tick_seconds = tick_seconds
+        self._queue: "queue.Queue[Tuple[str, bool]]" = queue.Queue(maxsize=queue_size)
+        self._in_flight: Set[str] = set()
+        self._in_flight_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _worker(self) -> None:
+        while True:
+            path, measure_lag = self._queue.get()
+            if path is None:
+                return
+            try:
+                outcome = self.process(path)
+            except Exception as e:
+                logger.error(f"[WatchIngestor] Failed to process {path}: {e}")
+                outcome = "error"
+            lag = None
+            if measure_lag and outcome == "processed":
+                signature = file_signature(path)
+                lag = time.time() - signature[1] / 1e9 if signature else None
+            self.metrics.observe(outcome, lag)
+            with self._in_flight_lock:
+                self._in_flight.discard(path)
+
+    def _enqueue(self, paths: Iterable[str], measure_lag: bool, now: float) -> None:
+        for path in paths:
+            with self._in_flight_lock:
+                if path in self._in_flight:
+                    # Changed again while being processed: retry once the current run finishes.
+                    self.debouncer.touch(path, now)
+                    continue
+                self._in_flight.add(path)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put((path, measure_lag), timeout=0.5)
+                    break
+                except queue.Full:
+                    self._update_gauges()
+            else:
+                # Stopped while the queue was full: the path never reached a worker
+                with self._in_flight_lock:
+                    self._in_flight.discard(path)
+                return
+
+    def _update_gauges(self) -> None:
+        self.metrics.queue_depth = self._queue.qsize()
+        self.metrics.debouncing = len(self.debouncer)
+        with self._in_flight_lock:
+            self.metrics.in_flight = len(self._in_flight)
+        INGEST_QUEUE_DEPTH.set(self.metrics.queue_depth)
+        INGEST_IN_FLIGHT.set(self.metrics.in_flight)
+
+    def run(self, initial_paths: Iterable[str] = ()) -> None:
+        """Process `initial_paths`, then watch until `stop()` is called."""
+        threads = [threading.Thread(target=self._worker, name=f"WatchIngestor-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        next_tick = time.monotonic() + self.tick_seconds
+        try:
+            self._enqueue(initial_paths, measure_lag=False, now=time.monotonic())
+            while not self._stop.is_set():
+                for path in self.watcher.poll(timeout=min(0.5, self.debouncer.quiet_seconds)):
+                    self.debouncer.touch(path, time.monotonic())
+                now = time.monotonic()
+                self._enqueue(self.debouncer.ready(now), measure_lag=True, now=now)
+                self._update_gauges()
+                if self.on_tick is not None and now >= next_tick:
+                    next_tick = now + self.tick_seconds
+                    self.on_tick(self)
+        finally:
+            for _ in threads:
+                self._queue.put((None, False))
+            for thread in threads:
+                thread.join()
+            self.watcher.close()
+            if self.on_tick is not None:
+                self.on_tick(self)
+
+
+def write_metrics(path: str, metrics: IngestMetrics) -> None:
+    """Write a metrics snapshot as JSON, replacing the file atomically."""
+    with open(path + ".tmp", "w") as f:
+        json.dump(metrics.snapshot(), f)
+    os.replace(path + ".tmp", path)
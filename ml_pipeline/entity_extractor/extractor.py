@@ -1,26 +1,54 @@
-from transformers import pipeline, AutoModelForTokenClassification, AutoTokenizer
 from typing import List, Dict, Any, Optional
+from ml_pipeline.entity_extractor.layout import LayoutExtractor
+from ml_pipeline.ocr.base import TextBlock
+from ml_pipeline.inference.client import InferenceClient, get_inference_server_url
+from services.admission import call_timeout, current_deadline
 from services.logger import logger
+from services.metrics import BACKEND_ERRORS, registry, stage_timer
 import os
 import threading
 import re
 import json
 import requests
 
+try:
+    from transformers import pipeline, AutoModelForTokenClassification, AutoTokenizer
+except ImportError:
+    # The web tier can run without torch/transformers when NER is served by the inference server.
+    pipeline = AutoModelForTokenClassification = AutoTokenizer = None
+
+# Document types whose fields are first resolved from the OCR layout; when every field in
+# `entity_mapping` is found the NER/LLM call is skipped
+LAYOUT_TYPES = ("invoice", "form")
+
+LAYOUT_EXTRACTIONS = registry.counter(
+    "layout_extractions_total", "Layout-based extractions; complete ones skip the model.", ("outcome",))
+
 class EntityExtractor:
     """
     Entity extractor using Hugging Face's dslim/bert-base-NER model (English NER) or a prompt-based LLM.
+    NER runs on the local inference server when `inference_url` (or INFERENCE_SERVER_URL) is set.
+    When OCR blocks are passed, fields of the `layout_types` document types are first read from
+    the layout (see layout.py), and the model is only called if some mapped field is missing.
+    Under a request deadline with less than `llm_min_seconds` left, the LLM and Ollama modes fall
+    back to regex extraction.
     """
-    def __init__(self, model_name: str = "dslim/bert-base-NER", use_llm: bool = False, llm_model_name: str = "mistralai/Mixtral-8x7B-Instruct-v0.1", use_ollama: bool = True, ollama_model: str = "gemma3:1b"):
+    def __init__(self, model_name: str = "dslim/bert-base-NER", use_llm: bool = False, llm_model_name: str = "mistralai/Mixtral-8x7B-Instruct-v0.1", use_ollama: bool = True, ollama_model: str = "gemma3:1b", inference_url: Optional[str] = None, ollama_url: Optional[str] = None, layout_types: Optional[List[str]] = None, ollama_timeout: Optional[float] = None, llm_min_seconds: Optional[float] = None):
         self.use_llm = use_llm
         self.llm_model_name = llm_model_name
         self.use_ollama = use_ollama
         self.ollama_model = ollama_model
+        self.ollama_url = (ollama_url or os.environ.get("OLLAMA_URL", "http://localhost:11434")).rstrip("/")
+        self.ollama_timeout = ollama_timeout if ollama_timeout is not None else float(os.environ.get("OLLAMA_TIMEOUT", 120))
+        self.llm_min_seconds = llm_min_seconds if llm_min_seconds is not None else float(os.environ.get("LLM_MIN_SECONDS", 20))
+        self.layout_types = LAYOUT_TYPES if layout_types is None else layout_types
+        self.layout_extractor = LayoutExtractor()
         logger.info(f"[EntityExtractor] Model loading started. Model: {model_name}, use_llm={use_llm}, use_ollama={use_ollama}")
         try:
             cache_dir = os.environ.get('HF_HOME', None)
             if cache_dir:
                 logger.info(f"[EntityExtractor] Using HF_HOME: {cache_dir}")
+            server_url = inference_url or get_inference_server_url()
             if use_llm and not use_ollama:
                 self.llm_pipeline = pipeline(
                     "text-generation",
@@ -30,6 +58,9 @@ class EntityExtractor:
                     temperature=0.0
                 )
                 logger.info(f"[EntityExtractor] LLM pipeline loaded: {llm_model_name}")
+            elif not use_llm and not use_ollama and server_url:
+                self.ner_pipeline = InferenceClient(server_url).ner
+                logger.info(f"[EntityExtractor] Using NER from inference server at {server_url}")
             elif not use_llm and not use_ollama:
                 model = AutoModelForTokenClassification.from_pretrained(model_name, cache_dir=cache_dir)
                 tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
@@ -60,20 +91,47 @@ class EntityExtractor:
             "specification": ["spec_id", "title", "version", "date", "author", "requirements", "description"]
         }
 
-    def extract_entities(self, text: str, document_type: str) -> Dict[str, str]:
+    def extract_entities(self, text: str, document_type: str, blocks: Optional[List[TextBlock]] = None) -> Dict[str, str]:
         """
         Extract named entities from the input text using either NER/regex or LLM prompt-based extraction.
+        With OCR `blocks`, layout-resolved fields are used instead of the model when they are complete,
+        and override the model's values otherwise.
         """
+        layout_entities = self._extract_layout(document_type, blocks)
+        if self._layout_complete(document_type, layout_entities):
+            return layout_entities
+        return {**self._extract_text_entities(text, document_type), **layout_entities}
+
+    def _extract_layout(self, document_type: str, blocks: Optional[List[TextBlock]]) -> Dict[str, str]:
+        """Fields of `document_type` resolved from the OCR layout ({} for types without layout fields)."""
+        if not blocks or document_type not in self.layout_types:
+            return {}
+        with stage_timer("extract_layout"):
+            entities = self.layout_extractor.extract(blocks, self.entity_mapping.get(document_type, []))
+        LAYOUT_EXTRACTIONS.inc(outcome="complete" if self._layout_complete(document_type, entities) else "partial")
+        return entities
+
+    def _layout_complete(self, document_type: str, entities: Dict[str, str]) -> bool:
+        fields = self.entity_mapping.get(document_type)
+        return document_type in self.layout_types and bool(fields) and all(field in entities for field in fields)
+
+    def _extract_text_entities(self, text: str, document_type: str) -> Dict[str, str]:
+        """Extract entities from the text with the configured model (Ollama, LLM or NER/regex)."""
+        deadline = current_deadline()
+        if (self.use_ollama or self.use_llm) and deadline is not None and deadline.remaining() < self.llm_min_seconds:
+            deadline.degrade("skip_llm")
+            return self._map_ner_entities(text, [], document_type)
         if self.use_ollama:
             prompt = f"""Extract the following fields for a {document_type} from the document text below. Return the result as a JSON object with keys for each field.\n\nDocument text:\n""" + text + """\n"""
             try:
                 response = requests.post(
-                    "http://localhost:11434/api/generate",
+                    f"{self.ollama_url}/api/generate",
                     json={
                         "model": self.ollama_model,
                         "prompt": prompt,
                         "stream": False
-                    }
+                    },
+                    timeout=call_timeout(self.ollama_timeout),
                 )
                 result = response.json()["response"]
                 json_start = result.find('{')
@@ -84,6 +142,7 @@ class EntityExtractor:
                     logger.warning("[EntityExtractor] Ollama did not return JSON.")
                     return {}
             except Exception as e:
+                BACKEND_ERRORS.inc(backend="ollama")
                 logger.error(f"[EntityExtractor] Ollama extraction failed: {e}")
                 return {}
         elif self.use_llm:
@@ -105,63 +164,102 @@ Document text:
                     logger.warning("[EntityExtractor] LLM did not return JSON.")
                     return {}
             except Exception as e:
+                BACKEND_ERRORS.inc(backend="llm")
                 logger.error(f"[EntityExtractor] LLM extraction failed: {e}")
                 return {}
         else:
             # Use NER/regex extraction (previous logic)
             try:
-                entities = self.ner_pipeline(text)
-                extracted_entities = {}
-                relevant_entities = self.entity_mapping.get(document_type, [])
-
-                # 1. Map standard NER entities to custom fields
-                for entity in entities:
-                    entity_label = entity.get("entity_group", entity.get("entity", "")).upper()
-                    entity_word = entity["word"].strip()
-                    if entity_label in ["PER", "PERSON"]:
-                        for field in ["sender", "recipient", "author", "name"]:
-                            if field in relevant_entities and field not in extracted_entities:
-                                extracted_entities[field] = entity_word
-                                break
-                    elif entity_label in ["ORG", "ORGANIZATION"]:
-                        for field in ["company", "organization", "institution"]:
-                            if field in relevant_entities and field not in extracted_entities:
-                                extracted_entities[field] = entity_word
-                                break
-                    elif entity_label in ["LOC", "LOCATION"]:
-                        for field in ["location", "address"]:
-                            if field in relevant_entities and field not in extracted_entities:
-                                extracted_entities[field] = entity_word
-                                break
-                    # Add more mappings as needed
-
-                # 2. Regex-based extraction for common business fields
-                if "date" in relevant_entities and "date" not in extracted_entities:
-                    match = re.search(r"\b\d{4}-\d{2}-\d{2}\b", text)
-                    if match:
-                        extracted_entities["date"] = match.group(0)
-                if "total_amount" in relevant_entities and "total_amount" not in extracted_entities:
-                    match = re.search(r"\$\d+(?:,\d{3})*(?:\.\d{2})?", text)
-                    if match:
-                        extracted_entities["total_amount"] = match.group(0)
-                if "invoice_number" in relevant_entities and "invoice_number" not in extracted_entities:
-                    match = re.search(r"invoice[\s#:]*(\d+)", text, re.IGNORECASE)
-                    if match:
-                        extracted_entities["invoice_number"] = match.group(1)
-                # Add more regexes for other fields as needed
-
-                # 3. Fallback: include all NER entities if not already mapped
-                for entity in entities:
-                    label = entity.get("entity_group", entity.get("entity", ""))
-                    word = entity["word"].strip()
-                    if word and label not in extracted_entities.values():
-                        extracted_entities[label] = word
-
-                return extracted_entities
+                return self._map_ner_entities(text, self.ner_pipeline(text), document_type)
             except Exception as e:
+                BACKEND_ERRORS.inc(backend="ner")
                 logger.error(f"[EntityExtractor] Entity extraction failed: {e}")
                 return {}
 
+    def extract_entities_batch(self, texts: List[str], document_types: List[str],
+                               blocks: Optional[List[Optional[List[TextBlock]]]] = None) -> List[Dict[str, str]]:
+        """
+        Extract entities for several documents. In NER mode the texts go through the
+        pipeline as one batch; the LLM and Ollama modes extract one document at a time.
+        Documents whose layout fields are complete (see `extract_entities`) skip the model.
+        """
+        layout_entities = [self._extract_layout(doc_type, doc_blocks)
+                           for doc_type, doc_blocks in zip(document_types, blocks or [None] * len(texts))]
+        pending = [i for i, doc_type in enumerate(document_types) if not self._layout_complete(doc_type, layout_entities[i])]
+        model_entities = self._extract_text_entities_batch([texts[i] for i in pending], [document_types[i] for i in pending])
+        results = list(layout_entities)
+        for i, entities in zip(pending, model_entities):
+            results[i] = {**entities, **layout_entities[i]}
+        return results
+
+    def _extract_text_entities_batch(self, texts: List[str], document_types: List[str]) -> List[Dict[str, str]]:
+        if self.use_ollama or self.use_llm or not texts:
+            return [self._extract_text_entities(text, doc_type) for text, doc_type in zip(texts, document_types)]
+        try:
+            batch_entities = self.ner_pipeline(list(texts))
+        except Exception as e:
+            BACKEND_ERRORS.inc(backend="ner")
+            logger.error(f"[EntityExtractor] Batch entity extraction failed: {e}")
+            return [{} for _ in texts]
+        results = []
+        for text, entities, doc_type in zip(texts, batch_entities, document_types):
+            try:
+                results.append(self._map_ner_entities(text, entities, doc_type))
+            except Exception as e:
+                logger.error(f"[EntityExtractor] Entity extraction failed: {e}")
+                results.append({})
+        return results
+
+    def _map_ner_entities(self, text: str, entities: List[Dict[str, Any]], document_type: str) -> Dict[str, str]:
+        """Map NER pipeline output and regex matches to the fields of a document type."""
+        extracted_entities = {}
+        relevant_entities = self.entity_mapping.get(document_type, [])
+
+        # 1. Map standard NER entities to custom fields
+        for entity in entities:
+            entity_label = entity.get("entity_group", entity.get("entity", "")).upper()
+            entity_word = entity["word"].strip()
+            if entity_label in ["PER", "PERSON"]:
+                for field in ["sender", "recipient", "author", "name"]:
+                    if field in relevant_entities and field not in extracted_entities:
+                        extracted_entities[field] = entity_word
+                        break
+            elif entity_label in ["ORG", "ORGANIZATION"]:
+                for field in ["company", "organization", "institution"]:
+                    if field in relevant_entities and field not in extracted_entities:
+                        extracted_entities[field] = entity_word
+                        break
+            elif entity_label in ["LOC", "LOCATION"]:
+                for field in ["location", "address"]:
+                    if field in relevant_entities and field not in extracted_entities:
+                        extracted_entities[field] = entity_word
+                        break
+            # Add more mappings as needed
+
+        # 2. Regex-based extraction for common business fields
+        if "date" in relevant_entities and "date" not in extracted_entities:
+            match = re.search(r"\b\d{4}-\d{2}-\d{2}\b", text)
+            if match:
+                extracted_entities["date"] = match.group(0)
+        if "total_amount" in relevant_entities and "total_amount" not in extracted_entities:
+            match = re.search(r"\$\d+(?:,\d{3})*(?:\.\d{2})?", text)
+            if match:
+                extracted_entities["total_amount"] = match.group(0)
+        if "invoice_number" in relevant_entities and "invoice_number" not in extracted_entities:
+            match = re.search(r"invoice[\s#:]*(\d+)", text, re.IGNORECASE)
+            if match:
+                extracted_entities["invoice_number"] = match.group(1)
+        # Add more regexes for other fields as needed
+
+        # 3. Fallback: include all NER entities if not already mapped
+        for entity in entities:
+            label = entity.get("entity_group", entity.get("entity", ""))
+            word = entity["word"].strip()
+            if word and label not in extracted_entities.values():
+                extracted_entities[label] = word
+
+        return extracted_entities
+
 # Alternative approach: Global instance
 _global_entity_extractor: Optional[EntityExtractor] = None
 _global_lock = threading.Lock()
@@ -0,0 +1,249 @@
+"""
+Layout-aware key-value extraction from OCR blocks, without a model.
+
+Word (or line) blocks are merged into row segments, which are split wherever the horizontal
+gap is wide (table columns, "label    value" layouts). Segments are indexed in a uniform grid.
+A segment that starts with a known label ("Invoice #", "Bill To:") takes its value from the
+rest of the segment. If the segment is only the label, the value is the nearest segment to the
+right on the same row, or else the nearest segment below it.
+"""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ml_pipeline.ocr.base import BoundingBox, TextBlock
+
+# Label phrases per entity field (lowercase); longer phrases win over their prefixes
+FIELD_LABELS: Dict[str, List[str]] = {
+    "invoice_number": ["invoice number", "invoice no", "invoice num", "invoice #", "inv no", "inv #"],
+    "date": ["invoice date", "date of issue", "issue date", "date"],
+    "total_amount": ["total amount due", "total amount", "amount due", "balance due", "total due", "grand total", "total"],
+    "customer_name": ["customer name", "bill to", "billed to", "sold to", "customer"],
+    "customer_address": ["customer address", "billing address", "address"],
+    "customer_email": ["e-mail", "email"],
+    "customer_phone": ["telephone", "phone", "tel"],
+    "organization": ["organization", "company", "vendor"],
+    "client": ["client name", "client"],
+    "product": ["product", "item"],
+    "form_id": ["form number", "form no", "form id", "form #"],
+    "type": ["form type", "type"],
+    "status": ["status"],
+    "owner": ["owner", "name"],
+    "memo_id": ["memo number", "memo no", "memo id"],
+    "author": ["author", "from"],
+    "sender": ["sender", "from"],
+    "recipient": ["recipient", "to"],
+    "subject": ["subject", "re"],
+    "budget_id": ["budget number", "budget no", "budget id"],
+    "department": ["department", "dept"],
+    "amount": ["amount"],
+    "fiscal_year": ["fiscal year"],
+    "approver": ["approved by", "approver"],
+}
+
+_AMOUNT = r"[$€£]?\s?\d{1,3}(?:[,.\s]\d{3})*(?:[.,]\d{2})?"
+# Values must match these patterns; the match (not the whole segment) becomes the value
+VALUE_PATTERNS: Dict[str, "re.Pattern"] = {
+    "date": re.compile(r"\d{4}-\d{2}-\d{2}|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}"
+                       r"|[A-Za-z]{3,9}\.? \d{1,2},? \d{4}|\d{1,2} [A-Za-z]{3,9}\.? \d{4}"),
+    "total_amount": re.compile(_AMOUNT),
+    "amount": re.compile(_AMOUNT),
+    "customer_email": re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"),
+    "customer_phone": re.compile(r"\+?\(?\d[\d\s().-]{5,}\d"),
+    "fiscal_year": re.compile(r"\b\d{4}(?:[/-]\d{2,4})?\b"),
+}
+
+_SEPARATORS = ":#.-–"
+
+
+@dataclass
+class Segment:
+    """A run of words on one row, with the box spanning them."""
+    text: str
+    box: Optional[BoundingBox]
+    page_number: int = 1
+
+
+class GridIndex:
+    """Uniform grid over segment boxes; `query` returns the segments whose boxes touch a region."""
+
+    def __init__(self, segments: Sequence[Segment], cell_size: float):
+        self.cell_size = max(cell_size, 1.0)
+        self.cells: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+        for i, segment in enumerate(segments):
+            if segment.box is not None:
+                box = segment.box
+                for cell in self._cells(segment.page_number, box.x, box.y, box.x + box.width, box.y + box.height):
+                    self.cells[cell].append(i)
+
+    def _cells(self, page: int, x0: float, y0: float, x1: float, y1: float) -> Iterable[Tuple[int, int, int]]:
+        size = self.cell_size
+        for cx in range(int(x0 // size), int(x1 // size) + 1):
+            for cy in range(int(y0 // size), int(y1 // size) + 1):
+                yield page, cx, cy
+
+    def query(self, page: int, x0: float, y0: float, x1: float, y1: float) -> Set[int]:
+        found: Set[int] = set()
+        for cell in self._cells(page, x0, y0, x1, y1):
+            found.update(self.cells.get(cell, ()))
+        return found
+
+
+def build_segments(blocks: Sequence[TextBlock], gap_factor: float = 1.5) -> List[Segment]:
+    """
+    Merge word blocks into row segments; line or text blocks are used as they are when the
+    OCR result has no word blocks.
+    """
+    words = [b for b in blocks if b.block_type == "word" and b.bounding_box is not None and b.text.strip()]
+    if not words:
+        lines = [b for b in blocks if b.block_type == "line"] or list(blocks)
+        return [Segment(b.text.strip(), b.bounding_box, b.page_number) for b in lines if b.text.strip()]
+
+    words.sort(key=lambda b: (b.page_number, b.bounding_box.y + b.bounding_box.height / 2, b.bounding_box.x))
+    rows: List[List[TextBlock]] = []
+    for word in words:
+        box = word.bounding_box
+        center = box.y + box.height / 2
+        if rows:
+            last = rows[-1][-1].bounding_box
+            if rows[-1][-1].page_number == word.page_number and abs(center - (last.y + last.height / 2)) <= max(box.height, last.height) / 2:
+                rows[-1].append(word)
+                continue
+        rows.append([word])
+
+    segments = []
+    for row in rows:
+        row.sort(key=lambda b: b.bounding_box.x)
+        current = [row[0]]
+        for word in row[1:]:
+            previous = current[-1].bounding_box
+            gap = word.bounding_box.x - (previous.x + previous.width)
+            if gap > gap_factor * max(previous.height, word.bounding_box.height):
+                segments.append(_segment(current))
+                current = []
+            current.append(word)
+        segments.append(_segment(current))
+    return segments
+
+
+def _segment(words: List[TextBlock]) -> Segment:
+    boxes = [w.bounding_box for w in words]
+    left = min(b.x for b in boxes)
+    top = min(b.y for b in boxes)
+    right = max(b.x + b.width for b in boxes)
+    bottom = max(b.y + b.height for b in boxes)
+    return Segment(" ".join(w.text for w in words), BoundingBox(left, top, right - left, bottom - top), words[0].page_number)
+
+
+class LayoutExtractor:
+    """
+    Resolves label → value pairs for the requested entity fields from OCR blocks.
+
+    `field_labels` and `value_patterns` default to FIELD_LABELS and VALUE_PATTERNS; `max_right`
+    and `max_below` bound the neighbour search in multiples of the label's height.
+    """
+
+    def __init__(self, field_labels: Optional[Dict[str, List[str]]] = None,
+                 value_patterns: Optional[Dict[str, "re.Pattern"]] = None,
+                 max_right: float = 30.0, max_below: float = 3.0):
+        self.field_labels = field_labels or FIELD_LABELS
+        self.value_patterns = VALUE_PATTERNS if value_patterns is None else value_patterns
+        self.max_right = max_right
+        self.max_below = max_below
+        self._all_fields = set(self.field_labels)
+        self._label_fields: Dict[str, List[str]] = defaultdict(list)
+        for field, labels in self.field_labels.items():
+            for label in labels:
+                self._label_fields[label].append(field)
+        alternation = "|".join(re.escape(label) for label in sorted(self._label_fields, key=len, reverse=True))
+        separators = re.escape(_SEPARATORS)
+        # label (ending at a word boundary unless it ends in e.g. "#"), optional separator, rest of the segment
+        self._label_re = re.compile(
+            rf"^\s*(?P<label>{alternation})(?:(?<=\W)|(?=$|[\s{separators}]))\s*(?P<sep>[{separators}]+)?\s*(?P<rest>.*)$",
+            re.IGNORECASE,
+        )
+
+    def _match_label(self, text: str, fields: Set[str]) -> Optional[Tuple[List[str], str, bool]]:
+        """(wanted fields for the label, rest of the text, whether a separator followed the label) or None."""
+        match = self._label_re.match(text)
+        if match is None:
+            return None
+        wanted = [f for f in self._label_fields[match.group("label").lower()] if f in fields]
+        if not wanted:
+            return None
+        label = match.group("label")
+        # A label ending in punctuation ("Invoice #") carries its own separator
+        return wanted, match.group("rest").strip(), bool(match.group("sep")) or not label[-1].isalnum()
+
+    def _value(self, field: str, text: str, anchored: bool = False) -> Optional[str]:
+        """
+        The value of `field` in `text`, or None if it does not look like one. `anchored` values
+        (text right after a label with no separator) must start with the field's pattern, and
+        are rejected for fields without one: "Customer email ..." is not a customer name.
+        """
+        text = text.strip().strip(_SEPARATORS).strip()
+        if not text:
+            return None
+        pattern = self.value_patterns.get(field)
+        if pattern is None:
+            return None if anchored else text
+        match = pattern.match(text) if anchored else pattern.search(text)
+        return match.group(0).strip() if match else None
+
+    def _neighbours(self, index: GridIndex, segments: List[Segment], label: Segment) -> List[int]:
+        """Candidate value segments: nearest to the right on the same row first, then nearest below."""
+        box = label.box
+        right, bottom, height = box.x + box.width, box.y + box.height, max(box.height, 1.0)
+        to_right, below = [], []
+        for i in index.query(label.page_number, right, box.y, right + self.max_right * height, bottom):
+            other = segments[i].box
+            overlap = min(bottom, other.y + other.height) - max(box.y, other.y)
+            if other.x >= right - height / 2 and overlap >= min(height, other.height) / 2:
+                to_right.append((other.x - right, i))
+        for i in index.query(label.page_number, box.x - height, bottom, right + self.max_right * height,
+                             bottom + self.max_below * height):
+            other = segments[i].box
+            overlaps_columns = other.x < right + height and other.x + other.width > box.x - height
+            if other.y >= bottom - height / 2 and overlaps_columns:
+                below.append((other.y - bottom, abs(other.x - box.x), i))
+        return [i for _, i in sorted(to_right)] + [i for _, _, i in sorted(below)]
+
+    def extract(self, blocks: Sequence[TextBlock], fields: Iterable[str]) -> Dict[str, str]:
+        """Values for as many of `fields` as the layout resolves."""
+        fields = set(fields)
+        segments = build_segments(blocks)
+        if not segments or not fields:
+            return {}
+        heights = sorted(s.box.height for s in segments if s.box is not None)
+        index = GridIndex(segments, 4 * heights[len(heights) // 2] if heights else 100.0)
+
+        found: Dict[str, str] = {}
+        for segment in segments:
+            label = self._match_label(segment.text, fields)
+            if label is None:
+                continue
+            wanted, rest, separated = label
+            wanted = [f for f in wanted if f not in found]
+            if not wanted:
+                continue
+            for field in wanted:
+                if rest:
+                    # "Total: $10" or "Total $10"
+                    value = self._value(field, rest, anchored=not separated)
+                elif segment.box is not None:
+                    value = None
+                    for i in self._neighbours(index, segments, segment):
+                        candidate = segments[i].text
+                        if self._match_label(candidate, self._all_fields) is not None:
+                            continue  # another label, not a value
+                        value = self._value(field, candidate)
+                        if value is not None:
+                            break
+                else:
+                    value = None
+                if value is not None:
+                    found[field] = value
+                    break
+        return found
@@ -0,0 +1,80 @@
+"""Dynamic micro-batching of concurrent inference requests."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Sequence
+
+from services.logger import logger
+
+
+@dataclass
+class _PendingItem:
+    """A single input waiting to be batched, with the future its caller waits on."""
+    payload: Any
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads into batches for a single worker thread.
+
+    A batch is flushed as soon as it holds `max_batch_size` items or `max_wait_ms`
+    has passed since its first item arrived, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[_PendingItem]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"MicroBatcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload: Any) -> Future:
+        """Queue one input and return a future resolved with its output."""
+        item = _PendingItem(payload)
+        self._queue.put(item)
+        return item.future
+
+    def map(self, payloads: Sequence[Any], timeout: Optional[float] = None) -> List[Any]:
+        """Submit several inputs and wait for all of their outputs, in order."""
+        futures = [self.submit(p) for p in payloads]
+        return [f.result(timeout=timeout) for f in futures]
+
+    def _collect(self) -> List[_PendingItem]:
+        """Block for the first item, then gather more until the batch is full or the deadline passes."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                outputs = self.batch_fn([item.payload for item in batch])
+                if len(outputs) != len(batch):
+                    raise RuntimeError(f"Batch function returned {len(outputs)} outputs for {len(batch)} inputs")
+                for item, output in zip(batch, outputs):
+                    item.future.set_result(output)
+            except Exception as e:
+                logger.error(f"[MicroBatcher:{self.name}] Batch of {len(batch)} failed: {e}")
+                for item in batch:
+                    item.future.set_exception(e)
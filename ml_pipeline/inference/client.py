@@ -0,0 +1,48 @@
+"""Thin HTTP client for the local inference server."""
+
+import os
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+INFERENCE_SERVER_URL_ENV = "INFERENCE_SERVER_URL"
+
+
+def get_inference_server_url() -> Optional[str]:
+    """Return the configured inference server URL, or None to load models in-process."""
+    return os.environ.get(INFERENCE_SERVER_URL_ENV) or None
+
+
+class InferenceClient:
+    """Calls the NER and embedding endpoints of `ml_pipeline.inference.server`."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post(self, path: str, texts: List[str]) -> Dict[str, Any]:
+        response = self.session.post(f"{self.base_url}{path}", json={"texts": texts}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return one embedding per input text."""
+        return self._post("/embed", list(texts))["embeddings"]
+
+    def ner(self, text: Union[str, List[str]]) -> Union[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+        """Return NER entities; mirrors the Hugging Face pipeline for a single string or a list."""
+        if isinstance(text, str):
+            return self._post("/ner", [text])["entities"][0]
+        return self._post("/ner", list(text))["entities"]
+
+
+class RemoteEmbeddingFunction(EmbeddingFunction[Documents]):
+    """ChromaDB embedding function backed by the inference server."""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.client.embed(input)
@@ -0,0 +1,131 @@
+"""
+Standalone model-serving process for NER and sentence embeddings.
+
+Hosts `dslim/bert-base-NER` and `all-MiniLM-L6-v2` once and serves them over
+localhost HTTP, grouping concurrent requests into micro-batches.
+
+Usage:
+    python -m ml_pipeline.inference.server --host 127.0.0.1 --port 8765
+
+Endpoints:
+    POST /embed  {"texts": [...]}  -> {"embeddings": [[...], ...]}
+    POST /ner    {"texts": [...]}  -> {"entities": [[{...}, ...], ...]}
+    GET  /health                   -> {"status": "healthy"}
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from ml_pipeline.inference.batcher import MicroBatcher
+from services.logger import logger
+
+
+def _to_builtin(value: Any) -> Any:
+    """Convert numpy scalars/arrays in model outputs to JSON-serializable Python values."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    return value
+
+
+class ModelHost:
+    """Loads the models and exposes one micro-batcher per model."""
+
+    def __init__(
+        self,
+        ner_model_name: str = "dslim/bert-base-NER",
+        embedding_model_name: str = "all-MiniLM-L6-v2",
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        from sentence_transformers import SentenceTransformer
+        from transformers import AutoModelForTokenClassification, AutoTokenizer, pipeline
+
+        logger.info(f"[ModelHost] Loading NER model {ner_model_name} and embedding model {embedding_model_name}")
+        model = AutoModelForTokenClassification.from_pretrained(ner_model_name)
+        tokenizer = AutoTokenizer.from_pretrained(ner_model_name)
+        self.ner_pipeline = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+        self.embedding_model = SentenceTransformer(embedding_model_name)
+        self.max_batch_size = max_batch_size
+
+        self.ner_batcher = MicroBatcher(self._ner_batch, max_batch_size, max_wait_ms, name="ner")
+        self.embed_batcher = MicroBatcher(self._embed_batch, max_batch_size, max_wait_ms, name="embed")
+
+    def _ner_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        return _to_builtin(self.ner_pipeline(texts, batch_size=self.max_batch_size))
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding_model.encode(texts, batch_size=self.max_batch_size, convert_to_numpy=True).tolist()
+
+
+def make_handler(host: ModelHost, request_timeout: float):
+    """Build a request handler class bound to a model host."""
+
+    class InferenceRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "healthy"})
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            routes = {"/embed": (host.embed_batcher, "embeddings"), "/ner": (host.ner_batcher, "entities")}
+            if self.path not in routes:
+                self._send_json(404, {"error": "Not found"})
+                return
+            batcher, key = routes[self.path]
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                texts = json.loads(self.rfile.read(length))["texts"]
+                outputs = batcher.map(texts, timeout=request_timeout)
+                self._send_json(200, {key: outputs})
+            except (KeyError, ValueError) as e:
+                self._send_json(400, {"error": f"Invalid request: {e}"})
+            except Exception as e:
+                logger.error(f"[InferenceServer] {self.path} failed: {e}")
+                self._send_json(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            # Request lines go through the app logger at debug level instead of stderr.
+            logger.debug(f"[InferenceServer] {format % args}")
+
+    return InferenceRequestHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local NER and embedding inference server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    host = ModelHost(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(host, args.request_timeout))
+    logger.info(f"[InferenceServer] Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
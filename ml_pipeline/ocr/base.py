@@ -26,6 +26,15 @@ class TextBlock:
         if not 0 <= self.confidence <= 1:
             raise ValueError("Confidence must be between 0 and 1.")
 
+    @classmethod
+    def unchecked(cls, text: str, confidence: float, bounding_box: Optional[BoundingBox] = None,
+                  page_number: int = 1, block_type: str = "text") -> "TextBlock":
+        """Build a block without validation, for parsers whose backend already guarantees 0 <= confidence <= 1."""
+        block = object.__new__(cls)
+        block.__dict__.update(text=text, confidence=confidence, bounding_box=bounding_box,
+                              page_number=page_number, block_type=block_type)
+        return block
+
 @dataclass
 class OCRResult:
     """Represents the result of OCR processing."""
@@ -1,17 +1,40 @@
-import io
 from typing import Any, Dict, List, Optional, Union
 from PIL import Image
+from google.auth.credentials import AnonymousCredentials
 from google.cloud import vision
 from google.cloud.vision_v1 import types
-from ml_pipeline.ocr.base import BaseOCRProcessor, BoundingBox, OCRProcessingError, OCRResult, TextBlock
+from ml_pipeline.ocr.base import BaseOCRProcessor, OCRProcessingError, OCRResult
+from ml_pipeline.ocr.payload import to_payload
+from ml_pipeline.ocr.vision_parser import parse_text_annotation
+from services.admission import call_timeout
+from services.metrics import BACKEND_ERRORS
+
+# Formats the images:annotate endpoint accepts inline; TIFF and PDF need the files API.
+VISION_INLINE_FORMATS = ["jpeg", "png", "gif", "bmp", "webp"]
+VISION_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
 
 class GoogleCloudVisionOCRProcessor(BaseOCRProcessor):
-    """OCR processor using Google Cloud Vision API."""
+    """
+    OCR processor using Google Cloud Vision API.
+
+    Config keys besides the upload options: `box_levels` (default ("block",)) adds "line"
+    and/or "word" blocks to the result, `keep_raw_response` keeps the response protobuf, and
+    `timeout` (default 60 s, lowered to the request deadline) bounds the API call.
+    """
 
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         super().__init__(config)
-        self.client = vision.ImageAnnotatorClient()
         self.config = config or {}
+        api_endpoint = self.config.get("api_endpoint")
+        if api_endpoint:
+            # e.g. a local stand-in such as benchmarks/fakes.py: REST transport, no credentials
+            self.client = vision.ImageAnnotatorClient(
+                client_options={"api_endpoint": api_endpoint},
+                transport="rest",
+                credentials=AnonymousCredentials(),
+            )
+        else:
+            self.client = vision.ImageAnnotatorClient()
 
     def get_supported_formats(self) -> List[str]:
         """Get supported image formats."""
@@ -21,23 +44,16 @@ class GoogleCloudVisionOCRProcessor(BaseOCRProcessor):
     def extract_text(self, image: Union[str, bytes, Image.Image]) -> OCRResult:
         """Extract text from an image using Google Cloud Vision API."""
         try:
-            if isinstance(image, str):
-                # Load image from file path
-                with open(image, 'rb') as f:
-                    image = f.read()
-            elif isinstance(image, Image.Image):
-                # Convert PIL Image to bytes
-                buffer = io.BytesIO()
-                image.save(buffer, format="PNG")
-                image = buffer.getvalue()
-            elif isinstance(image, bytes):
-                # Already bytes, do nothing
-                pass
-            else:
-                raise ValueError("Unsupported image type for OCR")
+            payload = to_payload(
+                image,
+                accepted_formats=self.config.get("upload_formats", VISION_INLINE_FORMATS),
+                max_bytes=self.config.get("max_upload_bytes", VISION_MAX_UPLOAD_BYTES),
+                transcode_format=self.config.get("transcode_format", "jpeg"),
+                quality=self.config.get("transcode_quality", 90),
+            )
 
             # Prepare the image for Google Cloud Vision API
-            vision_image = types.Image(content=image)
+            vision_image = types.Image(content=payload.data)
             feature = types.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
             request = types.AnnotateImageRequest(
                 image=vision_image,
@@ -48,83 +64,30 @@ class GoogleCloudVisionOCRProcessor(BaseOCRProcessor):
             )
 
             # Send the request to the Google Cloud Vision API
-            response = self.client.annotate_image(request)
+            response = self.client.annotate_image(request, timeout=call_timeout(self.config.get("timeout", 60.0)))
             if response.error.message:
                 raise OCRProcessingError(f"Google Cloud Vision API error: {response.error.message}")
 
-            # Process the response
-            text_annotations = response.full_text_annotation
-            if not text_annotations:
+            # Parse the raw protobuf: proto-plus wrappers cost an allocation per field access
+            annotation = response._pb.full_text_annotation
+            if not annotation.text and not annotation.pages:
                 raise OCRProcessingError("No text annotations found in the image.")
-
-            # Extract text and bounding boxes
-            text = text_annotations.text
-            blocks = []
-            overall_confidence = 0.0
-            count = 0
-
-            for page_idx, page in enumerate(text_annotations.pages, start=1):
-                for block in page.blocks:
-                    # Skip non-text blocks
-                    if block.block_type != vision.Block.BlockType.TEXT:
-                        continue
-
-                    # Get bounding box coordinates
-                    vertices = block.bounding_box.vertices
-                    if len(vertices) >= 4:
-                        bbox = BoundingBox(
-                            x = float(vertices[0].x),
-                            y = float(vertices[0].y),
-                            width = float(vertices[2].x - vertices[0].x),
-                            height = float(vertices[2].y - vertices[0].y),
-                        )
-                    else:
-                        bbox = None
-
-                    # Aggregate text and confidence from all blocks
-                    block_text = ""
-                    block_confidence = 0.0
-                    word_count = 0
-
-                    for paragraph in block.paragraphs:
-                        for word in paragraph.words:
-                            word_text = "".join([symbol.text for symbol in word.symbols])
-                            block_text += word_text + " "
-                            if word.confidence:
-                                block_confidence += word.confidence
-                                word_count += 1
-
-                    block_confidence /= word_count if word_count > 0 else 0.0
-
-                    # Create text block
-                    text_block = TextBlock(
-                        text=block_text.strip(),
-                        confidence=block_confidence,
-                        bounding_box=bbox,
-                        page_number=page_idx,  # Use the loop index as the page number
-                        block_type="text",
-                    )
-
-                    blocks.append(text_block)
-                    overall_confidence += block_confidence
-                    count += 1
-
-            # Calculate average confidence
-            average_confidence = overall_confidence / count if count > 0 else 0.0
+            parsed = parse_text_annotation(annotation, self.config.get("box_levels", ("block",)))
 
             return OCRResult(
-                text=text,
-                blocks=blocks,
-                confidence=average_confidence,
-                page_count=len(text_annotations.pages),
+                text=annotation.text,
+                blocks=parsed.blocks,
+                confidence=parsed.confidence,
+                page_count=parsed.page_count,
                 metadata={
                     "language_hints": self.config.get("language_hints", ["en"]),
-                    "detected_languages": [
-                        lang.language_code for lang in text_annotations.pages[0].property.detected_languages
-                    ] if text_annotations.pages else []
+                    "detected_languages": parsed.detected_languages,
+                    **payload.metadata(),
                 },
-                raw_response=response._pb
+                # The full response holds every symbol; keep it only when asked to
+                raw_response=response._pb if self.config.get("keep_raw_response") else None,
             )
 
         except Exception as e:
+            BACKEND_ERRORS.inc(backend="vision")
             raise OCRProcessingError(f"Error extracting text from image: {str(e)}")
@@ -0,0 +1,100 @@
+"""Page sources that stream the pages of PDFs and multi-frame images one at a time."""
+
+import io
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Union
+
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+
+class PageSource(ABC):
+    """Abstract source of page images for OCR."""
+
+    source_type: str = "image"
+
+    @property
+    @abstractmethod
+    def page_count(self) -> int:
+        """Return the number of pages in the source."""
+        pass
+
+    @abstractmethod
+    def iter_pages(self) -> Iterator[Image.Image]:
+        """Yield page images in order, holding at most one decoded page at a time."""
+        pass
+
+    def close(self) -> None:
+        """Release the file the source holds open, if any; pages already yielded stay usable only if copied."""
+
+    def __enter__(self) -> "PageSource":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PDFPageSource(PageSource):
+    """Rasterizes a PDF one page at a time with poppler."""
+
+    source_type = "pdf"
+
+    def __init__(self, pdf_path: str, dpi: int = 200):
+        self.pdf_path = pdf_path
+        self.dpi = dpi
+        self._page_count: Optional[int] = None
+
+    @property
+    def page_count(self) -> int:
+        if self._page_count is None:
+            self._page_count = int(pdfinfo_from_path(self.pdf_path)["Pages"])
+        return self._page_count
+
+    def iter_pages(self) -> Iterator[Image.Image]:
+        for page_number in range(1, self.page_count + 1):
+            yield convert_from_path(self.pdf_path, dpi=self.dpi, first_page=page_number, last_page=page_number)[0]
+
+
+class ImagePageSource(PageSource):
+    """
+    Streams the frames of an image file; multi-page TIFF and animated GIF yield one page per frame.
+
+    With `owns_image`, `close` closes the image and its file; an image passed in by the caller is left open.
+    """
+
+    def __init__(self, image: Image.Image, owns_image: bool = False):
+        self.image = image
+        self.owns_image = owns_image
+        self.source_type = (image.format or "image").lower()
+
+    @property
+    def page_count(self) -> int:
+        return getattr(self.image, "n_frames", 1)
+
+    def iter_pages(self) -> Iterator[Image.Image]:
+        if self.page_count == 1:
+            yield self.image
+            return
+        for frame_index in range(self.page_count):
+            self.image.seek(frame_index)
+            # Copy only the current frame, so a single decoded page is alive at a time.
+            yield self.image.copy()
+
+    def close(self) -> None:
+        if self.owns_image:
+            self.image.close()
+
+
+def open_page_source(image: Union[str, bytes, Image.Image], pdf_dpi: int = 200) -> PageSource:
+    """
+    Build the page source for a file path, raw bytes or an already opened PIL image.
+
+    Close the source (or use it as a context manager) to release an image it opened.
+    """
+    if isinstance(image, str) and image.lower().endswith(".pdf"):
+        return PDFPageSource(image, dpi=pdf_dpi)
+    if isinstance(image, str):
+        return ImagePageSource(Image.open(image), owns_image=True)
+    if isinstance(image, bytes):
+        return ImagePageSource(Image.open(io.BytesIO(image)), owns_image=True)
+    return ImagePageSource(image)
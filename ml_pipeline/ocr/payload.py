@@ -0,0 +1,132 @@
+"""Image payloads handed to OCR backends: original bytes when possible, transcoded only when needed."""
+
+import io
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional, Union
+
+from PIL import Image
+
+# Magic-byte signatures, checked against the start of the file.
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"%PDF", "pdf"),
+    (b"PK\x03\x04", "zip"),
+)
+
+
+def sniff_format(header: Union[bytes, memoryview]) -> Optional[str]:
+    """Return the image format from the first bytes of a file, or None if unknown."""
+    header = bytes(header[:16])
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    for signature, fmt in _SIGNATURES:
+        if header.startswith(signature):
+            return fmt
+    return None
+
+
+@dataclass
+class ImagePayload:
+    """
+    Encoded image bytes ready to be sent to an OCR backend.
+
+    Always `bytes`: the request protobufs only take bytes, so a memory-mapped view
+    would be copied before the upload anyway.
+    """
+    data: bytes
+    format: str
+    transcoded: bool = False
+    encode_seconds: float = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def metadata(self) -> dict:
+        return {
+            "upload_bytes": self.size,
+            "upload_format": self.format,
+            "transcoded": self.transcoded,
+            "encode_ms": round(self.encode_seconds * 1000, 2),
+        }
+
+
+def _read_file(path: str) -> ImagePayload:
+    """Read a file untouched."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return ImagePayload(data=data, format=sniff_format(data) or "")
+
+
+def _is_bilevel(image: Image.Image) -> bool:
+    """True for black-and-white pages such as binarized scans."""
+    return image.mode == "1" or (image.mode == "L" and image.getcolors(2) is not None)
+
+
+def encode_image(image: Image.Image, fmt: str = "jpeg", quality: int = 90, max_bytes: Optional[int] = None) -> ImagePayload:
+    """
+    Encode a PIL image for upload.
+
+    Bilevel pages are encoded as PNG, which is lossless and far smaller than JPEG for them.
+    Other pages use JPEG or WebP, lowering the quality and then the resolution until the
+    payload fits in `max_bytes`.
+    """
+    start = time.process_time()
+    if _is_bilevel(image):
+        fmt, save_kwargs = "png", {}
+    else:
+        fmt = fmt.lower()
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        save_kwargs = {"quality": quality}
+
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt.upper(), **save_kwargs)
+        data = buffer.getvalue()
+        if max_bytes is None or len(data) <= max_bytes or max(image.size) <= 1:
+            break
+        if "quality" in save_kwargs and save_kwargs["quality"] > 60:
+            save_kwargs["quality"] -= 15
+        else:
+            image = image.resize((max(1, image.width * 3 // 4), max(1, image.height * 3 // 4)), Image.Resampling.LANCZOS)
+
+    return ImagePayload(data=data, format=fmt, transcoded=True, encode_seconds=time.process_time() - start)
+
+
+def to_payload(
+    image: Union[str, bytes, Image.Image],
+    accepted_formats: Iterable[str],
+    max_bytes: Optional[int] = None,
+    transcode_format: str = "jpeg",
+    quality: int = 90,
+) -> ImagePayload:
+    """
+    Return the payload for an image source.
+
+    File paths and raw bytes in an accepted format within `max_bytes` are passed through
+    unchanged; anything else is decoded and transcoded with `encode_image`.
+    """
+    accepted = {fmt.lower() for fmt in accepted_formats}
+    if isinstance(image, str):
+        payload = _read_file(image)
+        if payload.format in accepted and (max_bytes is None or payload.size <= max_bytes):
+            return payload
+        with Image.open(image) as decoded:
+            return encode_image(decoded, transcode_format, quality, max_bytes)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        fmt = sniff_format(image)
+        if fmt in accepted and (max_bytes is None or len(image) <= max_bytes):
+            return ImagePayload(data=image if isinstance(image, bytes) else bytes(image), format=fmt)
+        with Image.open(io.BytesIO(image)) as decoded:
+            return encode_image(decoded, transcode_format, quality, max_bytes)
+    if isinstance(image, Image.Image):
+        return encode_image(image, transcode_format, quality, max_bytes)
+    raise ValueError("Unsupported image type for OCR")
@@ -1,63 +1,118 @@
 
-import io
-from typing import Optional, Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Union
 from PIL import Image
-import numpy as np
 from ml_pipeline.ocr.base import BaseOCRProcessor, OCRResult
-from ml_pipeline.ocr.tesseract import TesseractOCRProcessor
-from pdf2image import convert_from_path
-import os
+from ml_pipeline.ocr.page_source import PageSource, open_page_source
+from ml_pipeline.preprocessing.base import BaseImagePreprocessor
+from services.admission import bind_context, check_deadline
 from services.logger import logger
+from services.metrics import registry, stage_timer
+
+OCR_PAGES = registry.counter("ocr_pages_total", "Pages sent to the OCR backend.", ("source_type",))
+OCR_UPLOAD_BYTES = registry.counter("ocr_upload_bytes_total", "Image bytes uploaded to the OCR backend.")
 class OCRPipeline:
     """OCR Pipeline class."""
 
-    def __init__(self, processor: BaseOCRProcessor):
+    def __init__(self, processor: BaseOCRProcessor, preprocessor: Optional[BaseImagePreprocessor] = None):
         self.processor = processor
+        self.preprocessor = preprocessor
 
-    def _is_pdf(self, file_path: str) -> bool:
-        return file_path.lower().endswith('.pdf')
+    def _extract_page(self, page: Image.Image) -> OCRResult:
+        """Preprocess a single page (if a preprocessor is configured) and OCR it."""
+        if self.preprocessor is not None:
+            with stage_timer("ocr_preprocess"):
+                page = self.preprocessor.process(page)
+        return self._extract(page)
 
-    def _pdf_to_images(self, pdf_path: str):
-        return convert_from_path(pdf_path)
+    def _extract(self, image: Union[str, bytes, Image.Image]) -> OCRResult:
+        check_deadline("ocr")
+        with stage_timer("ocr_backend"):
+            result = self.processor.extract_text(image)
+        OCR_UPLOAD_BYTES.inc((result.metadata or {}).get("upload_bytes", 0))
+        return result
 
     def process_file(self, image: Union[str, bytes, Image.Image]) -> OCRResult:
-        """Process a file and return the OCR result. Handles PDF by splitting into images."""
-        if isinstance(image, str) and self._is_pdf(image):
-            # PDF: convert each page to image and OCR each
-            images = self._pdf_to_images(image)
-            logger.info(f"[OCRPipeline] PDF to images conversion completed. Number of pages: {len(images)}")
-            all_text = []
-            all_blocks = []
-            confidences = []
-            for img in images:
-                ocr_result = self.processor.extract_text(img)
-                all_text.append(ocr_result.text)
-                if hasattr(ocr_result, 'blocks'):
-                    all_blocks.extend(getattr(ocr_result, 'blocks', []))
-                confidences.append(getattr(ocr_result, 'confidence', 0.0))
-            avg_conf = sum(confidences) / len(confidences) if confidences else 0.0
-            logger.info(f"[OCRPipeline] OCR result completed. Number of pages: {len(images)}, Average confidence: {avg_conf}")
-            return OCRResult(
-                text="\n".join(all_text),
-                confidence=avg_conf,
-                page_count=len(images),
-                blocks=all_blocks,
-                metadata={
-                    "type": "pdf"
-                },
-                raw_response={'pages': len(images)},
-            )
-
-        processed_data = image
-        if isinstance(image, str):
-            image = Image.open(image)
-        elif isinstance(image, bytes):
-            image = Image.open(io.BytesIO(image))
-
-        
-        result = self.processor.extract_text(image)
+        """Process a file and return the OCR result. PDFs and multi-page TIFF/GIF files are OCR'd page by page."""
+        with stage_timer("ocr"), open_page_source(image) as source:
+            if source.source_type != "pdf" and source.page_count == 1:
+                OCR_PAGES.inc(source_type=source.source_type)
+                if self.preprocessor is None and isinstance(image, (str, bytes)):
+                    # Hand the original encoded file to the backend, which only transcodes if it must.
+                    return self._extract(image)
+                return self._extract_page(next(source.iter_pages()))
+            return self._process_pages(source)
+
+    def iter_page_results(self, image: Union[str, bytes], prefetch: int = 1) -> Iterator[OCRResult]:
+        """
+        OCR a file page by page, yielding each page's result in page order as soon as it is ready.
+
+        Up to `prefetch` pages are OCR'd concurrently. Each result's metadata carries the source
+        `type`; `combine_pages` turns the page results into the same OCRResult as `process_file`.
+        """
+        with open_page_source(image) as source:
+            if source.source_type != "pdf" and source.page_count == 1:
+                OCR_PAGES.inc(source_type=source.source_type)
+                if self.preprocessor is None:
+                    result = self._extract(image)
+                else:
+                    result = self._extract_page(next(source.iter_pages()))
+                result.metadata = {**(result.metadata or {}), "type": source.source_type}
+                yield result
+                return
+            yield from self._iter_source_pages(source, prefetch)
+
+    def _iter_source_pages(self, source: PageSource, prefetch: int = 1) -> Iterator[OCRResult]:
+        pages = source.iter_pages()
+        with ThreadPoolExecutor(max_workers=max(1, prefetch)) as pool:
+            in_flight = deque()
+            page_number = 0
+            while True:
+                # Rasterizing (PDF) or decoding (TIFF/GIF) happens when the next page is requested.
+                with stage_timer("ocr_rasterize"):
+                    page = next(pages, None)
+                if page is not None:
+                    OCR_PAGES.inc(source_type=source.source_type)
+                    in_flight.append(pool.submit(bind_context(self._extract_page), page))
+                if in_flight and (page is None or len(in_flight) >= max(1, prefetch)):
+                    page_number += 1
+                    yield self._number_page(in_flight.popleft().result(), page_number, source.source_type)
+                if page is None and not in_flight:
+                    return
+
+    @staticmethod
+    def _number_page(result: OCRResult, page_number: int, source_type: str) -> OCRResult:
+        for block in result.blocks or []:
+            block.page_number = page_number
+        result.metadata = {**(result.metadata or {}), "type": source_type}
         return result
 
+    @staticmethod
+    def combine_pages(page_results: List[OCRResult]) -> OCRResult:
+        """Aggregate per-page results (in page order) into a single OCRResult."""
+        source_type = (page_results[0].metadata or {}).get("type") if page_results else None
+        confidences = [result.confidence for result in page_results]
+        avg_conf = sum(confidences) / len(confidences) if confidences else 0.0
+        logger.info("[OCRPipeline] OCR result completed. Type: %s, Number of pages: %d, Average confidence: %.3f",
+                    source_type, len(page_results), avg_conf, extra={"event": "ocr_completed"})
+        return OCRResult(
+            text="\n".join(result.text for result in page_results),
+            confidence=avg_conf,
+            page_count=len(page_results),
+            blocks=[block for result in page_results for block in result.blocks or []],
+            metadata={
+                "type": source_type,
+                "upload_bytes": sum((result.metadata or {}).get("upload_bytes", 0) for result in page_results),
+                "encode_ms": round(sum((result.metadata or {}).get("encode_ms", 0.0) for result in page_results), 2),
+            },
+            raw_response={'pages': len(page_results)},
+        )
+
+    def _process_pages(self, source: PageSource) -> OCRResult:
+        """OCR every page of a source and aggregate the results into a single OCRResult."""
+        return self.combine_pages(list(self._iter_source_pages(source)))
+
 
 if __name__ == "__main__":
     # Example usage for testing
@@ -0,0 +1,145 @@
+"""NumPy-vectorized page preprocessing: downscaling, grayscale, deskew and binarization."""
+
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from PIL import Image
+from ml_pipeline.preprocessing.base import BaseImagePreprocessor
+
+# ITU-R BT.601 luma weights, the same ones PIL uses for "L" conversion.
+_LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def to_grayscale(image: Image.Image) -> np.ndarray:
+    """Convert a PIL image to a uint8 grayscale array."""
+    if image.mode == "L":
+        return np.asarray(image, dtype=np.uint8)
+    rgb = np.asarray(image.convert("RGB"), dtype=np.float32)
+    return (rgb @ _LUMA_WEIGHTS).clip(0, 255).astype(np.uint8)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Return the Otsu threshold of a uint8 image, computed from its histogram in one vectorized pass."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_mean = np.cumsum(hist * np.arange(256))
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    between_var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between_var))
+
+
+def binarize_otsu(gray: np.ndarray) -> np.ndarray:
+    """Global Otsu binarization; text is 0 and background 255."""
+    return np.where(gray > otsu_threshold(gray), 255, 0).astype(np.uint8)
+
+
+def binarize_adaptive(gray: np.ndarray, window: int = 31, offset: int = 10) -> np.ndarray:
+    """Mean adaptive binarization using an integral image, so the cost does not depend on the window size."""
+    half = window // 2
+    padded = np.pad(gray.astype(np.int64), half + 1, mode="edge")
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    h, w = gray.shape
+    y0, x0 = np.arange(h), np.arange(w)
+    y1, x1 = y0 + window, x0 + window
+    window_sum = (
+        integral[np.ix_(y1, x1)] - integral[np.ix_(y0, x1)]
+        - integral[np.ix_(y1, x0)] + integral[np.ix_(y0, x0)]
+    )
+    local_mean = window_sum / (window * window)
+    return np.where(gray > local_mean - offset, 255, 0).astype(np.uint8)
+
+
+def estimate_skew(gray: np.ndarray, max_angle: float = 5.0, step: float = 0.25, max_pixels: int = 200_000) -> float:
+    """
+    Estimate the skew angle in degrees with a projection profile.
+
+    Ink pixels are projected onto rows for every candidate angle at once; the angle
+    whose row histogram is sharpest (largest sum of squares) aligns with the text lines.
+    """
+    ys, xs = np.nonzero(gray <= otsu_threshold(gray))
+    if ys.size == 0:
+        return 0.0
+    if ys.size > max_pixels:
+        keep = np.random.default_rng(0).choice(ys.size, max_pixels, replace=False)
+        ys, xs = ys[keep], xs[keep]
+    angles = np.arange(-max_angle, max_angle + step / 2, step)
+    slopes = np.tan(np.deg2rad(angles))
+    rows = np.rint(ys[None, :] - xs[None, :] * slopes[:, None]).astype(np.int64)
+    rows -= rows.min()
+    n_rows = int(rows.max()) + 1
+    # Offset each angle into its own bin range so a single bincount builds every histogram.
+    offsets = (np.arange(len(angles)) * n_rows)[:, None]
+    hist = np.bincount((rows + offsets).ravel(), minlength=len(angles) * n_rows).reshape(len(angles), n_rows)
+    scores = (hist.astype(np.float64) ** 2).sum(axis=1)
+    return float(angles[int(np.argmax(scores))])
+
+
+def target_size(image: Image.Image, target_dpi: Optional[int], max_dimension: Optional[int]) -> Tuple[int, int]:
+    """Return the downscaled size for a page given the DPI and longest-side limits."""
+    scale = 1.0
+    dpi = image.info.get("dpi")
+    if target_dpi and dpi and dpi[0] and dpi[0] > target_dpi:
+        scale = min(scale, target_dpi / float(dpi[0]))
+    if max_dimension and max(image.size) * scale > max_dimension:
+        scale = min(scale, max_dimension / float(max(image.size)))
+    return max(1, int(image.width * scale)), max(1, int(image.height * scale))
+
+
+class OCRPreprocessor(BaseImagePreprocessor):
+    """
+    Page preprocessor for OCR. Every step can be toggled through the config:
+
+    - downscale (True): resize to `target_dpi` (300) and at most `max_dimension` (3500) px on the longest side
+    - grayscale (True): convert to 8-bit grayscale
+    - deskew (True): rotate by the projection-profile skew estimate, up to `max_skew_angle` (5) degrees
+    - binarize ("otsu"): "otsu", "adaptive" or None
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
+        self.downscale = self.config.get("downscale", True)
+        self.target_dpi = self.config.get("target_dpi", 300)
+        self.max_dimension = self.config.get("max_dimension", 3500)
+        self.grayscale = self.config.get("grayscale", True)
+        self.deskew = self.config.get("deskew", True)
+        self.max_skew_angle = self.config.get("max_skew_angle", 5.0)
+        self.binarize = self.config.get("binarize", "otsu")
+        self.adaptive_window = self.config.get("adaptive_window", 31)
+        self.adaptive_offset = self.config.get("adaptive_offset", 10)
+
+    def downscale_step(self, image: Image.Image) -> Image.Image:
+        size = target_size(image, self.target_dpi, self.max_dimension)
+        if size == image.size:
+            return image
+        return image.resize(size, Image.Resampling.LANCZOS)
+
+    def grayscale_step(self, image: Image.Image) -> Image.Image:
+        return Image.fromarray(to_grayscale(image), mode="L")
+
+    def deskew_step(self, image: Image.Image) -> Image.Image:
+        angle = estimate_skew(to_grayscale(image), max_angle=self.max_skew_angle)
+        if abs(angle) < 1e-6:
+            return image
+        fill = 255 if image.mode == "L" else (255,) * len(image.getbands())
+        return image.rotate(angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=fill)
+
+    def binarize_step(self, image: Image.Image) -> Image.Image:
+        gray = to_grayscale(image)
+        if self.binarize == "adaptive":
+            binary = binarize_adaptive(gray, self.adaptive_window, self.adaptive_offset)
+        else:
+            binary = binarize_otsu(gray)
+        return Image.fromarray(binary, mode="L")
+
+    def process(self, image: Image.Image) -> Image.Image:
+        """Apply the enabled steps in order: downscale, grayscale, deskew, binarize."""
+        if self.downscale:
+            image = self.downscale_step(image)
+        if self.grayscale:
+            image = self.grayscale_step(image)
+        if self.deskew:
+            image = self.deskew_step(image)
+        if self.binarize:
+            image = self.binarize_step(image)
+        return image
@@ -2,6 +2,7 @@ import io
 from typing import Any, Dict, List, Optional, Union
 from PIL import Image
 from ml_pipeline.ocr.base import BaseOCRProcessor, BoundingBox, OCRResult, TextBlock
+from services.admission import call_timeout, check_deadline
 
 class TesseractOCRProcessor(BaseOCRProcessor):
     """Tesseract OCR processor."""
@@ -29,11 +30,16 @@ class TesseractOCRProcessor(BaseOCRProcessor):
         else:
             image = image
 
+        check_deadline("ocr")
+        timeout = call_timeout()
         data = self.pytesseract.image_to_data(
             image, 
             config=self.tesseract_config, 
             lang=self.language,
-            output_type=self.pytesseract.Output.DICT
+            output_type=self.pytesseract.Output.DICT,
+            # Under a request deadline, tesseract is killed when it passes. pytesseract reads 0 as
+            # "no timeout", so a deadline that runs out after the check still gets a positive one.
+            timeout=0 if timeout is None else max(timeout, 0.001),
         )
 
         blocks = []
@@ -65,6 +71,7 @@ class TesseractOCRProcessor(BaseOCRProcessor):
         return OCRResult(
             text=" ".join(full_text_parts),
             confidence=avg_confidence,
+            blocks=blocks,
             metadata={'provider': 'tesseract', 'language': self.language},
             raw_response={'tesseract_data': data}
         )
@@ -0,0 +1,200 @@
+"""
+Tesseract through its C API (tesserocr), with initialized engines kept for reuse.
+
+`pytesseract.image_to_data` writes each page to a temp file and starts a new `tesseract` process,
+which loads the language model again. Here, `PyTessBaseAPI` instances are created once per
+(language, config) and kept in a pool. Pages are handed over as in-memory PIL images. Each
+engine is used by one thread at a time, and the pool grows lazily up to `pool_size` engines,
+so concurrent page OCR (OCRPipeline prefetch, batch workers) gets one engine per thread.
+"""
+
+import io
+import os
+import queue
+import shlex
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from ml_pipeline.ocr.base import BaseOCRProcessor, BoundingBox, OCRProcessingError, OCRResult, TextBlock
+from services.admission import call_timeout, check_deadline
+from services.logger import logger
+from services.metrics import BACKEND_ERRORS, registry
+
+TESSERACT_ENGINES_CREATED = registry.counter(
+    "tesseract_engines_created_total", "Tesseract engines initialized (language model loads).")
+
+
+def parse_tesseract_config(config: str) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+    """Split a pytesseract config string ("--oem 3 --psm 6 -c name=value") into (psm, oem, variables)."""
+    psm = oem = None
+    variables: Dict[str, str] = {}
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        value = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token in ("--psm", "--oem") and value is not None:
+            if token == "--psm":
+                psm = int(value)
+            else:
+                oem = int(value)
+            i += 2
+        elif token == "--dpi" and value is not None:
+            # The tesseract CLI sets this variable for --dpi
+            variables["user_defined_dpi"] = value
+            i += 2
+        elif token == "-c" and value is not None and "=" in value:
+            name, _, setting = value.partition("=")
+            variables[name] = setting
+            i += 2
+        else:
+            logger.warning(f"[TesseractEngine] Ignoring unsupported Tesseract option {token!r}")
+            i += 1
+    return psm, oem, variables
+
+
+class TesseractEnginePool:
+    """Up to `size` initialized tesserocr engines for one language and config, each lent to one thread at a time."""
+
+    def __init__(self, language: str, tesseract_config: str, size: int):
+        import tesserocr
+        self.tesserocr = tesserocr
+        self.language = language
+        self.psm, self.oem, self.variables = parse_tesseract_config(tesseract_config)
+        self.size = max(1, size)
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self):
+        kwargs: Dict[str, Any] = {"lang": self.language}
+        if self.psm is not None:
+            kwargs["psm"] = self.psm
+        if self.oem is not None:
+            kwargs["oem"] = self.oem
+        engine = self.tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in self.variables.items():
+            if not engine.SetVariable(name, value):
+                logger.warning(f"[TesseractEngine] Unknown Tesseract variable {name!r}")
+        TESSERACT_ENGINES_CREATED.inc()
+        return engine
+
+    @contextmanager
+    def engine(self) -> Iterator[Any]:
+        """Borrow an engine: an idle one, a new one while below `size`, or else the next one returned."""
+        try:
+            engine = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    engine = self._create()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                engine = self._idle.get()
+        try:
+            yield engine
+        finally:
+            # Drop the page image and results, keep the loaded model
+            engine.Clear()
+            self._idle.put(engine)
+
+
+_pools: Dict[Tuple[str, str], TesseractEnginePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_engine_pool(language: str, tesseract_config: str, size: int) -> TesseractEnginePool:
+    """The process-wide pool for a language and config (created on first use)."""
+    key = (language, tesseract_config)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = TesseractEnginePool(language, tesseract_config, size)
+        return pool
+
+
+def _reset_pools() -> None:
+    # A forked child must not share engines (or a held lock) with its parent
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools)
+
+
+class TesseractEngineOCRProcessor(BaseOCRProcessor):
+    """
+    Tesseract OCR processor using persistent in-process engines (requires tesserocr).
+
+    Takes the same `tesseract_config` and `language` keys as TesseractOCRProcessor and returns
+    the same OCRResult: word blocks, text joined with spaces, and mean word confidence. `pool_size`
+    (default: CPU count) caps the engines kept per language and config.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
+        try:
+            import tesserocr  # noqa: F401
+        except ImportError as e:
+            raise ImportError(f"TesseractEngineOCRProcessor requires tesserocr to be installed. {e}")
+        self.tesseract_config = self.config.get("tesseract_config", '--oem 3 --psm 6')
+        self.language = self.config.get("language", "eng")
+        self.pool = get_engine_pool(self.language, self.tesseract_config, self.config.get("pool_size", os.cpu_count() or 1))
+
+    def extract_text(self, image: Union[str, bytes, Image.Image]) -> OCRResult:
+        """Extract text from an image with a pooled Tesseract engine."""
+        if isinstance(image, str):
+            image = Image.open(image)
+        elif isinstance(image, bytes):
+            image = Image.open(io.BytesIO(image))
+
+        level = self.pool.tesserocr.RIL.WORD
+        data: Dict[str, List[Any]] = {"level": [], "left": [], "top": [], "width": [], "height": [], "conf": [], "text": []}
+        blocks = []
+        check_deadline("ocr")
+        with self.pool.engine() as engine:
+            engine.SetImage(image)
+            timeout = call_timeout()
+            # Recognize takes milliseconds and reads 0 as "no timeout", so a deadline gives at least 1
+            if not engine.Recognize(0 if timeout is None else max(1, int(timeout * 1000))):
+                BACKEND_ERRORS.inc(backend="tesseract")
+                raise OCRProcessingError("Tesseract recognition failed or timed out")
+            for word in self.pool.tesserocr.iterate_level(engine.GetIterator(), level):
+                text = (word.GetUTF8Text(level) or "").strip()
+                confidence = word.Confidence(level)
+                if not text or int(confidence) <= 0:
+                    continue
+                x1, y1, x2, y2 = word.BoundingBox(level)
+                blocks.append(TextBlock(
+                    text=text,
+                    confidence=float(confidence) / 100.0,
+                    bounding_box=BoundingBox(x=x1, y=y1, width=x2 - x1, height=y2 - y1),
+                    block_type="word",
+                ))
+                for key, value in zip(("level", "left", "top", "width", "height", "conf", "text"),
+                                      (5, x1, y1, x2 - x1, y2 - y1, confidence, text)):
+                    data[key].append(value)
+
+        confidences = [b.confidence for b in blocks if b.confidence > 0]
+        return OCRResult(
+            text=" ".join(b.text for b in blocks),
+            confidence=sum(confidences) / len(confidences) if confidences else 0.0,
+            blocks=blocks,
+            metadata={'provider': 'tesseract', 'language': self.language, 'engine': 'tesserocr'},
+            raw_response={'tesseract_data': data},
+        )
+
+    def get_supported_formats(self) -> List[str]:
+        return ["jpg", "jpeg", "png", "tiff", "pdf"]
@@ -0,0 +1,123 @@
+"""
+Parser for Google Cloud Vision `full_text_annotation` responses.
+
+Walks the raw protobuf (`response._pb.full_text_annotation`) once: word texts are joined
+with list joins, block confidences are accumulated in the same pass, and line and word boxes
+are only built when requested. Nothing here imports the Vision client, so the parser can be
+exercised offline against recorded responses (see benchmarks/vision_parse.py).
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from ml_pipeline.ocr.base import BoundingBox, TextBlock
+
+BOX_LEVELS = ("block", "line", "word")
+# vision.Block.BlockType.TEXT
+TEXT_BLOCK_TYPE = 1
+# TextAnnotation.DetectedBreak.BreakType.EOL_SURE_SPACE, HYPHEN and LINE_BREAK end a line
+LINE_BREAK_TYPES = frozenset((3, 4, 5))
+
+
+@dataclass
+class ParsedAnnotation:
+    """Blocks (plus line and word blocks when requested), mean block confidence, page count and languages."""
+    blocks: List[TextBlock]
+    confidence: float
+    page_count: int
+    detected_languages: List[str]
+
+
+def _box(bounding_box) -> Optional[BoundingBox]:
+    vertices = bounding_box.vertices
+    if len(vertices) < 4:
+        return None
+    top_left, bottom_right = vertices[0], vertices[2]
+    return BoundingBox(float(top_left.x), float(top_left.y),
+                       float(bottom_right.x - top_left.x), float(bottom_right.y - top_left.y))
+
+
+def _line_block(words: list, page_number: int) -> TextBlock:
+    """Merge (text, confidence, box) word tuples into one line block spanning their boxes."""
+    boxes = [box for _, _, box in words if box is not None]
+    box = None
+    if boxes:
+        left = min(b.x for b in boxes)
+        top = min(b.y for b in boxes)
+        right = max(b.x + b.width for b in boxes)
+        bottom = max(b.y + b.height for b in boxes)
+        box = BoundingBox(left, top, right - left, bottom - top)
+    confidences = [confidence for _, confidence, _ in words if confidence]
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return TextBlock.unchecked(" ".join([text for text, _, _ in words]), confidence, box, page_number, "line")
+
+
+def parse_text_annotation(annotation, levels: Sequence[str] = ("block",)) -> ParsedAnnotation:
+    """
+    Parse a `TextAnnotation` protobuf into TextBlocks.
+
+    `levels` selects which of "block", "line" and "word" blocks to return (as block_type
+    "text", "line" and "word", like the Tesseract processor); confidence is always the mean
+    block confidence, where a block's confidence is the mean of its non-zero word confidences.
+    """
+    unknown = set(levels) - set(BOX_LEVELS)
+    if unknown:
+        raise ValueError(f"Unknown box levels {sorted(unknown)}; expected some of {BOX_LEVELS}")
+    want_blocks = "block" in levels
+    want_lines = "line" in levels
+    want_words = "word" in levels
+    want_word_boxes = want_lines or want_words
+
+    blocks: List[TextBlock] = []
+    lines: List[TextBlock] = []
+    words: List[TextBlock] = []
+    block_confidence_sum = 0.0
+    block_count = 0
+
+    for page_number, page in enumerate(annotation.pages, start=1):
+        for block in page.blocks:
+            if block.block_type != TEXT_BLOCK_TYPE:
+                continue
+            word_texts = []
+            confidence_sum = 0.0
+            confidence_count = 0
+            line_words = []
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    symbols = word.symbols
+                    word_text = "".join([symbol.text for symbol in symbols])
+                    word_texts.append(word_text)
+                    word_confidence = word.confidence
+                    if word_confidence:
+                        confidence_sum += word_confidence
+                        confidence_count += 1
+                    if not want_word_boxes:
+                        continue
+                    box = _box(word.bounding_box)
+                    if want_words:
+                        words.append(TextBlock.unchecked(word_text, word_confidence, box, page_number, "word"))
+                    if want_lines:
+                        line_words.append((word_text, word_confidence, box))
+                        # The raw protobuf field is `type_` (proto-plus renames `type`)
+                        if symbols and symbols[-1].property.detected_break.type_ in LINE_BREAK_TYPES:
+                            lines.append(_line_block(line_words, page_number))
+                            line_words = []
+                # A paragraph always ends its last line
+                if line_words:
+                    lines.append(_line_block(line_words, page_number))
+                    line_words = []
+
+            block_confidence = confidence_sum / confidence_count if confidence_count else 0.0
+            block_confidence_sum += block_confidence
+            block_count += 1
+            if want_blocks:
+                blocks.append(TextBlock.unchecked(" ".join(word_texts), block_confidence,
+                                                  _box(block.bounding_box), page_number, "text"))
+
+    pages = annotation.pages
+    return ParsedAnnotation(
+        blocks=blocks + lines + words,
+        confidence=block_confidence_sum / block_count if block_count else 0.0,
+        page_count=len(pages),
+        detected_languages=[language.language_code for language in pages[0].property.detected_languages] if pages else [],
+    )
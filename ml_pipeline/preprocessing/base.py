@@ -1,6 +1,15 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+from PIL import Image
 
 
+class BaseImagePreprocessor(ABC):
+    """Abstract base class for image preprocessors applied to each page before OCR."""
 
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
 
-
-
+    @abstractmethod
+    def process(self, image: Image.Image) -> Image.Image:
+        """Return the preprocessed page image."""
+        pass
@@ -0,0 +1,203 @@
+"""
+Request deadlines and admission control for the document processing endpoint.
+
+A `Deadline` is installed for the current request with `deadline_scope` and read further down
+with `current_deadline()`. OCR and LLM calls use the time left as their timeout. The processor
+checks it between stages. The entity extractor skips the LLM call and falls back to regex
+extraction when too little time is left. Thread pools do not inherit context variables, so
+work submitted to them has to be wrapped with `bind_context`. That also adds the pool thread
+to the request's profile, if it has one (services/profiling.py).
+
+`AdmissionController` caps how many requests a worker processes at once and how many may wait
+for a slot. A request arriving at a full queue is rejected at once (429). A request that cannot
+start in time is rejected after waiting, or at once if waiting is clearly hopeless (503). Both
+come with a Retry-After estimate.
+"""
+
+import contextlib
+import contextvars
+import functools
+import math
+import threading
+import time
+from typing import Callable, Iterator, Optional, Set
+
+from services.metrics import registry
+from services.profiling import current_profile
+
+DEADLINE_EXCEEDED = registry.counter(
+    "deadline_exceeded_total", "Requests that ran out of time, by the stage that noticed.", ("stage",))
+DEGRADED = registry.counter("degraded_total", "Work skipped to meet a request deadline.", ("mode",))
+ADMISSION_REJECTED = registry.counter("admission_rejected_total", "Requests turned away by admission control.", ("reason",))
+ADMISSION_IN_FLIGHT = registry.gauge("admission_in_flight", "Requests being processed by this worker.")
+ADMISSION_QUEUED = registry.gauge("admission_queued", "Requests waiting for a processing slot in this worker.")
+ADMISSION_WAIT_SECONDS = registry.histogram("admission_wait_seconds", "Time admitted requests waited for a slot.")
+
+TOO_MANY_REQUESTS = 429
+SERVICE_UNAVAILABLE = 503
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline has passed before a stage could start."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded before {stage}")
+        self.stage = stage
+
+
+class Overloaded(Exception):
+    """Raised by `AdmissionController.admit` when a request is turned away."""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(f"Server is overloaded ({reason}), retry in {retry_after}s")
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Deadline:
+    """The (monotonic) time by which a request should be answered, plus the work skipped to get there."""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+        self.degraded: Set[str] = set()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.clock() >= self.expires_at
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.expired:
+            DEADLINE_EXCEEDED.inc(stage=stage)
+            raise DeadlineExceeded(stage)
+
+    def timeout(self, default: Optional[float] = None) -> float:
+        """Timeout for a blocking call: the time left, capped at `default`."""
+        remaining = self.remaining()
+        return remaining if default is None else min(default, remaining)
+
+    def degrade(self, mode: str) -> None:
+        """Record that `mode` work was skipped for this request."""
+        if mode not in self.degraded:
+            self.degraded.add(mode)
+            DEGRADED.inc(mode=mode)
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the request being processed, or None outside a `deadline_scope`."""
+    return _current_deadline.get()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Deadline) -> Iterator[Deadline]:
+    """Make `deadline` the current deadline for the duration of the block."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline(stage: str) -> None:
+    """`Deadline.check` on the current deadline, if there is one."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def call_timeout(default: Optional[float] = None) -> Optional[float]:
+    """Timeout for a blocking call: `default`, lowered to the time left when there is a current deadline."""
+    deadline = _current_deadline.get()
+    return default if deadline is None else deadline.timeout(default)
+
+
+def bind_context(fn: Callable) -> Callable:
+    """Wrap `fn` to run in a copy of the caller's context, so that pool threads see the current deadline and profile."""
+    return functools.partial(contextvars.copy_context().run, _run_bound, fn)
+
+
+def _run_bound(fn: Callable, *args, **kwargs):
+    profile = current_profile()
+    if profile is None:
+        return fn(*args, **kwargs)
+    with profile.thread():
+        return fn(*args, **kwargs)
+
+
+class AdmissionController:
+    """
+    Limits concurrent requests to `max_concurrent`, with at most `max_queued` waiting in FIFO order.
+
+    A queued request waits at most `max_wait` seconds. It also gives up once its deadline would
+    leave less than `min_service_seconds` to do the work. Retry-After comes from a moving average
+    of service times.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, max_wait: float, min_service_seconds: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.max_wait = max_wait
+        self.min_service_seconds = min_service_seconds
+        self.clock = clock
+        self.in_flight = 0
+        self.queued = 0
+        self._service_seconds: Optional[float] = None
+        self._condition = threading.Condition()
+
+    def retry_after(self) -> int:
+        """Seconds until a retry is likely to be admitted (at least 1)."""
+        if self._service_seconds is None:
+            return 1
+        backlog = (self.in_flight + self.queued) / self.max_concurrent
+        return max(1, math.ceil(self._service_seconds * backlog))
+
+    def _reject(self, status: int, reason: str) -> Overloaded:
+        ADMISSION_REJECTED.inc(reason=reason)
+        return Overloaded(status, reason, self.retry_after())
+
+    @contextlib.contextmanager
+    def admit(self, deadline: Optional[Deadline] = None) -> Iterator[None]:
+        """Hold a processing slot for the duration of the block; raises Overloaded if none can be had in time."""
+        arrived = self.clock()
+        with self._condition:
+            # Queue behind earlier waiters even if a slot has just been freed
+            if self.in_flight >= self.max_concurrent or self.queued:
+                if self.queued >= self.max_queued:
+                    raise self._reject(TOO_MANY_REQUESTS, "queue_full")
+                max_wait = self.max_wait
+                if deadline is not None:
+                    max_wait = min(max_wait, deadline.remaining() - self.min_service_seconds)
+                expected_wait = (self._service_seconds or 0.0) * (self.queued + 1) / self.max_concurrent
+                if max_wait <= 0 or expected_wait > max_wait:
+                    raise self._reject(SERVICE_UNAVAILABLE, "deadline")
+                self.queued += 1
+                ADMISSION_QUEUED.set(self.queued)
+                try:
+                    admitted = self._condition.wait_for(lambda: self.in_flight < self.max_concurrent, timeout=max_wait)
+                finally:
+                    self.queued -= 1
+                    ADMISSION_QUEUED.set(self.queued)
+                if not admitted:
+                    raise self._reject(SERVICE_UNAVAILABLE, "queue_timeout")
+            self.in_flight += 1
+            ADMISSION_IN_FLIGHT.set(self.in_flight)
+        started = self.clock()
+        ADMISSION_WAIT_SECONDS.observe(started - arrived)
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - started
+            with self._condition:
+                self.in_flight -= 1
+                ADMISSION_IN_FLIGHT.set(self.in_flight)
+                self._service_seconds = elapsed if self._service_seconds is None else 0.8 * self._service_seconds + 0.2 * elapsed
+                self._condition.notify()
@@ -1,6 +1,30 @@
+"""
+Application logger.
+
+Records go through a QueueHandler to a background QueueListener thread that owns the
+rotating file and console handlers, so request threads never do file I/O or rotation.
+Messages are formatted lazily in the listener (use `logger.info("... %s", value)` on hot
+paths), written as JSON lines by default, and INFO/DEBUG records can be sampled and
+rate-limited per message type before they are queued.
+
+Environment:
+    LOG_LEVEL                 default INFO
+    LOG_FORMAT                "json" (default) or "text"
+    LOG_SAMPLE_RATES          e.g. "file_skipped=0.01,request=0.1": fraction of records kept per event
+    LOG_RATE_LIMIT            INFO/DEBUG records per second allowed per event (default 20, 0 = unlimited)
+    LOG_MAX_MESSAGE_CHARS     longer messages are trimmed (default 2000)
+"""
+
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional, Tuple
 
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
 LOG_FILE = os.path.join(LOG_DIR, 'app.log')
@@ -10,20 +34,172 @@ if not os.path.exists(LOG_DIR):
 
 LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
 
-logger = logging.getLogger('document_processing')
-logger.setLevel(logging.INFO)
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "event", "suppressed"}
 
-# Prevent adding multiple handlers in interactive environments
-if not logger.handlers:
-    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=5*1024*1024, backupCount=5)
-    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    logger.addHandler(file_handler)
 
+def trim(text: str, max_chars: int) -> str:
+    """Cut `text` to `max_chars`, noting how much was dropped."""
+    if max_chars and len(text) > max_chars:
+        return f"{text[:max_chars]}... [{len(text) - max_chars} chars trimmed]"
+    return text
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "event=rate,event=rate" into a dict."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, event, plus any `extra` fields."""
+
+    def __init__(self, max_message_chars: int = 2000):
+        super().__init__()
+        self.max_message_chars = max_message_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": trim(record.getMessage(), self.max_message_chars),
+        }
+        for key in ("event", "suppressed"):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic text format, with long messages trimmed."""
+
+    def __init__(self, max_message_chars: int = 2000):
+        super().__init__(LOG_FORMAT)
+        self.max_message_chars = max_message_chars
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = trim(record.message, self.max_message_chars)
+        if getattr(record, "suppressed", 0):
+            record.message += f" ({record.suppressed} similar messages suppressed)"
+        return super().formatMessage(record)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-event sampling and rate limiting for INFO and DEBUG records; warnings and errors always pass.
+
+    The event is the record's `event` extra field, or its unformatted message template.
+    Each event gets a token bucket of `rate_limit` records per second (burst of the same size);
+    the next record let through carries a `suppressed` count of what was dropped.
+    """
+
+    # Pre-formatted (f-string) messages are their own event; the bucket table is reset at this size.
+    MAX_EVENTS = 10_000
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None, rate_limit: float = 20.0, clock=time.monotonic):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limit = rate_limit
+        self.clock = clock
+        # event -> (tokens, last refill time, suppressed count)
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        event = getattr(record, "event", None) or str(record.msg)
+        rate = self.sample_rates.get(event)
+        if rate is not None and random.random() >= rate:
+            return False
+        if not self.rate_limit:
+            return True
+        now = self.clock()
+        with self._lock:
+            if event not in self._buckets and len(self._buckets) >= self.MAX_EVENTS:
+                self._buckets.clear()
+            tokens, last, suppressed = self._buckets.get(event, (self.rate_limit, now, 0))
+            tokens = min(self.rate_limit, tokens + (now - last) * self.rate_limit)
+            if tokens < 1:
+                self._buckets[event] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[event] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    Enqueues records without formatting them; the listener thread merges args and formats.
+
+    The stock QueueHandler formats in the calling thread so records can be pickled; this queue
+    never leaves the process, so that work moves off the request path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _build_handlers():
+    max_chars = int(os.environ.get('LOG_MAX_MESSAGE_CHARS', 2000))
+    if os.environ.get('LOG_FORMAT', 'json') == 'text':
+        formatter = TextFormatter(max_chars)
+    else:
+        formatter = JSONFormatter(max_chars)
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=5*1024*1024, backupCount=5)
+    file_handler.setFormatter(formatter)
     # Optional: also log to console
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(formatter)
+    return file_handler, console_handler
+
+
+_listener: Optional[QueueListener] = None
+
+
+def _start_listener(queue_handler: QueueHandler) -> None:
+    """Give the queue handler a fresh queue and a listener thread writing to the real handlers."""
+    global _listener
+    queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(queue_handler.queue, *_build_handlers(), respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    """Flush queued records and stop the listener thread."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+logger = logging.getLogger('document_processing')
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+# Prevent adding multiple handlers in interactive environments
+if not logger.handlers:
+    _queue_handler = _LazyQueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(SamplingFilter(
+        parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', '')),
+        rate_limit=float(os.environ.get('LOG_RATE_LIMIT', 20)),
+    ))
+    logger.addHandler(_queue_handler)
+    logger.propagate = False
+    _start_listener(_queue_handler)
+    atexit.register(_stop_listener)
+    # A forked child (gunicorn worker) does not inherit the listener thread: start its own.
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=lambda: _start_listener(_queue_handler))
 
 # Usage example:
 # from services.logger import logger
-# logger.info('This is an info message') 
\ No newline at end of file
+# logger.info('Processed %s in %.1fs', filename, seconds)
+# logger.info('Skipping %s', filename, extra={'event': 'file_skipped'})
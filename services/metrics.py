@@ -0,0 +1,334 @@
+"""
+In-process metrics: counters, gauges and histograms with Prometheus text exposition.
+
+Metrics are recorded per process (each gunicorn worker or management command keeps its own).
+When METRICS_MULTIPROC_DIR is set, each process also writes its values to `<pid>.json` in that
+directory every METRICS_SNAPSHOT_INTERVAL seconds, and `render_all` adds up the other processes'
+files and its own live values, so /metrics reports every gunicorn worker rather than the one
+that answered. With METRICS_ENABLED=0 every timer is a shared no-op object and `inc`/`observe`/`set`
+return after a single attribute check.
+"""
+
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = (10_000, 100_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000, 50_000_000)
+NAMESPACE = "document_processing"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def state(self) -> Dict[Tuple[str, ...], float]:
+        """A copy of the values per label set."""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(into: Dict[Tuple[str, ...], float], other: Dict[Tuple[str, ...], float]) -> None:
+        """Add another process's `state()` into `into`."""
+        for key, value in other.items():
+            into[key] = into.get(key, 0) + value
+
+    def samples(self, state: Optional[Dict] = None) -> List[str]:
+        items = sorted((self.state() if state is None else state).items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+    def render(self, state: Optional[Dict] = None) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self.samples(state))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. pages OCR'd or backend errors."""
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. queue depth (summed across live processes)."""
+    metric_type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution with sum and count, e.g. stage latency in seconds."""
+    metric_type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last slot is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def state(self) -> Dict[Tuple[str, ...], list]:
+        with self._lock:
+            return {key: [list(state[0]), state[1], state[2]] for key, state in self._values.items()}
+
+    @staticmethod
+    def merge(into: Dict[Tuple[str, ...], list], other: Dict[Tuple[str, ...], list]) -> None:
+        for key, (bucket_counts, total, count) in other.items():
+            state = into.get(key)
+            if state is None:
+                into[key] = [list(bucket_counts), total, count]
+                continue
+            state[0] = [a + b for a, b in zip(state[0], bucket_counts)]
+            state[1] += total
+            state[2] += count
+
+    def samples(self, state: Optional[Dict] = None) -> List[str]:
+        items = sorted((self.state() if state is None else state).items())
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics; `counter`/`gauge`/`histogram` return the existing metric for a name."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        name = f"{NAMESPACE}_{name}"
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.metric_type}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """This process's metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return "\n".join(metric.render() for _, metric in metrics) + "\n"
+
+    def write_snapshot(self, directory: str) -> None:
+        """Write this process's values to `<directory>/<pid>.json` atomically."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {metric.name: [[list(key), value] for key, value in metric.state().items()] for metric in metrics}
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(path + ".tmp", path)
+
+    def render_all(self, directory: str) -> str:
+        """
+        Like `render`, but with the values other processes wrote to `directory` added in.
+
+        Only metrics registered in this process are merged; gunicorn workers are forked from one
+        app, so they register the same ones.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        states = {name: metric.state() for name, metric in metrics}
+        own = os.path.join(directory, f"{os.getpid()}.json")
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue  # removed or replaced while listing
+            for name, metric in metrics:
+                if name in snapshot:
+                    metric.merge(states[name], {tuple(key): value for key, value in snapshot[name]})
+        return "\n".join(metric.render(states[name]) for name, metric in metrics) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Write `render()` atomically, e.g. for the node_exporter textfile collector."""
+        with open(path + ".tmp", "w") as f:
+            f.write(self.render())
+        os.replace(path + ".tmp", path)
+
+
+registry = MetricsRegistry(enabled=os.environ.get("METRICS_ENABLED", "1") == "1")
+
+
+def multiprocess_dir() -> Optional[str]:
+    """The directory processes share their metrics through (METRICS_MULTIPROC_DIR), if any."""
+    return os.environ.get("METRICS_MULTIPROC_DIR") or None
+
+
+def reset_multiprocess_dir(directory: str) -> None:
+    """Create `directory` and remove files left by earlier runs (call before starting workers)."""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+
+
+def start_snapshot_writer(directory: str, interval: float = 5.0) -> threading.Thread:
+    """Write this process's snapshot every `interval` seconds, and once more at exit."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                registry.write_snapshot(directory)
+            except OSError:
+                pass  # the next interval retries
+
+    atexit.register(registry.write_snapshot, directory)
+    thread = threading.Thread(target=run, name="metrics-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """
+    Drop the gauges of an exited process from its snapshot.
+
+    Its counters and histograms are kept, so totals do not go backwards when a worker restarts.
+    """
+    path = os.path.join(directory, f"{pid}.json")
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return
+    gauges = {name for name, metric in registry._metrics.items() if isinstance(metric, Gauge)}
+    snapshot = {name: values for name, values in snapshot.items() if name not in gauges}
+    with open(path + ".tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(path + ".tmp", path)
+
+STAGE_SECONDS = registry.histogram("stage_seconds", "Time spent in each pipeline stage.", ("stage",))
+STAGE_ERRORS = registry.counter("stage_errors_total", "Pipeline stages that raised.", ("stage",))
+BACKEND_ERRORS = registry.counter("backend_errors_total", "Failed calls to OCR and extraction backends.", ("backend",))
+
+
+class _NullTimer:
+    """Returned by `stage_timer` when metrics are disabled; shared, so disabled timing allocates nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, stage=self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.stage)
+        return False
+
+
+def stage_timer(stage: str):
+    """Context manager recording the duration of a pipeline stage (and errors raised in it)."""
+    if not registry.enabled:
+        return _NULL_TIMER
+    return _StageTimer(stage)
+
@@ -0,0 +1,70 @@
+"""Load ML models before gunicorn forks its workers so their weights are shared copy-on-write."""
+
+import gc
+import os
+from typing import Any, Iterable
+
+from services.logger import logger
+
+
+def worker_torch_threads(workers: int) -> int:
+    """Return the number of intra-op torch threads each worker should use."""
+    configured = os.environ.get("TORCH_NUM_THREADS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def set_torch_threads(num_threads: int) -> None:
+    """Set torch intra-op threads if torch is installed."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(num_threads)
+    logger.info(f"[ModelPreload] torch.set_num_threads({num_threads}) in pid {os.getpid()}")
+
+
+def _torch_modules(obj: Any) -> Iterable[Any]:
+    """Yield the torch modules held by a pipeline or SentenceTransformer object."""
+    try:
+        import torch
+    except ImportError:
+        return []
+    candidates = [obj, getattr(obj, "model", None), getattr(obj, "_model", None)]
+    return [c for c in candidates if isinstance(c, torch.nn.Module)]
+
+
+def freeze_weights(obj: Any) -> None:
+    """
+    Put the model in eval mode and mark every parameter as not requiring grad.
+    Nothing writes to the weight tensors afterwards, so forked workers keep sharing their pages.
+    """
+    for module in _torch_modules(obj):
+        module.eval()
+        for param in module.parameters():
+            param.requires_grad_(False)
+
+
+def preload_models() -> None:
+    """Load the NER extractor, the embedding model and the URLconf, then freeze the heap."""
+    from django.urls import get_resolver
+
+    from ml_pipeline.dataset.embeddings import get_embedding_function
+    from ml_pipeline.entity_extractor.extractor import get_entity_extractor
+
+    extractor = get_entity_extractor()
+    freeze_weights(getattr(extractor, "ner_pipeline", None))
+    freeze_weights(getattr(extractor, "llm_pipeline", None))
+
+    embedding_function = get_embedding_function()
+    freeze_weights(getattr(embedding_function, "_model", None))
+
+    # Importing the URLconf imports the views, which build their module-level extractor.
+    get_resolver().urlconf_module
+
+    # Move everything allocated so far into the permanent generation, so the
+    # cyclic GC in the workers never touches (and copies) these object headers.
+    gc.collect()
+    gc.freeze()
+    logger.info(f"[ModelPreload] Models preloaded in pid {os.getpid()}, {gc.get_freeze_count()} objects frozen")
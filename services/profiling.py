@@ -0,0 +1,310 @@
+"""
+On-demand request profiling.
+
+`RequestProfiler.profile` wraps a request that was picked for profiling, either by the sampling
+rate or by a matching profile token sent by the client. Two modes are supported:
+
+- "sample" (default): a background thread records the stacks of the profiled threads every
+  `interval` seconds and writes them as collapsed stacks, one `frame;frame;frame count` line
+  per stack. flamegraph.pl and speedscope read that format directly.
+- "cprofile": each profiled thread runs under cProfile, and the merged stats are written as a
+  .pstats file (exact call counts, with more overhead).
+
+The request thread is always profiled. Pool threads working for the request join through
+`bind_context` (services/admission.py). Each profile also gets a JSON summary with its
+duration, labels and top functions. `ProfileStore` keeps at most `max_files` profiles and
+`max_bytes` in total, deleting the oldest first.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from services.logger import logger
+from services.metrics import registry
+
+PROFILE_MODES = ("sample", "cprofile")
+SUMMARY_SUFFIX = ".json"
+
+PROFILES_CAPTURED = registry.counter("profiles_captured_total", "Requests profiled, by trigger.", ("trigger",))
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stacks of registered threads from a background thread and counts collapsed stacks."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+
+    def add_thread(self, ident: int, name: str) -> None:
+        self._threads[ident] = name
+
+    def remove_thread(self, ident: int) -> None:
+        self._threads.pop(ident, None)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, name in list(self._threads.items()):
+                frame = frames.get(ident)
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if labels:
+                    labels.append(name)
+                    self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+
+def top_functions(stacks: Dict[str, int], limit: int = 10) -> List[Tuple[str, int, int]]:
+    """(frame, self samples, total samples) for the frames with the most self samples."""
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]  # the first entry is the thread name
+        if frames:
+            self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+    return [(frame, count, total_counts[frame]) for frame, count in self_counts.most_common(limit)]
+
+
+class RequestProfile:
+    """One request's profile; `labels` (path, status, ...) end up in the summary."""
+
+    def __init__(self, profile_id: str, mode: str = "sample", interval: float = 0.005, trigger: str = "sample"):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+        self.profile_id = profile_id
+        self.mode = mode
+        self.trigger = trigger
+        self.labels: Dict[str, Any] = {}
+        self.sampler = StackSampler(interval) if mode == "sample" else None
+        self._profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.seconds = 0.0
+
+    @contextlib.contextmanager
+    def thread(self) -> Iterator[None]:
+        """Profile the calling thread for the duration of the block."""
+        current = threading.current_thread()
+        if self.sampler is not None:
+            self.sampler.add_thread(current.ident, current.name)
+            try:
+                yield
+            finally:
+                self.sampler.remove_thread(current.ident)
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process; another request holds it
+            yield
+            return
+        with self._lock:
+            self._profilers.append(profiler)
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    @contextlib.contextmanager
+    def run(self) -> Iterator["RequestProfile"]:
+        """Profile the calling thread, and pool threads that join via `bind_context`, until the block exits."""
+        token = _current_profile.set(self)
+        start = time.perf_counter()
+        if self.sampler is not None:
+            self.sampler.start()
+        try:
+            with self.thread():
+                yield self
+        finally:
+            self.seconds = time.perf_counter() - start
+            if self.sampler is not None:
+                self.sampler.stop()
+            _current_profile.reset(token)
+
+    def summary(self, limit: int = 10) -> Dict[str, Any]:
+        summary = {
+            "id": self.profile_id,
+            "mode": self.mode,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "seconds": round(self.seconds, 4),
+            "labels": self.labels,
+        }
+        if self.sampler is not None:
+            summary["samples"] = self.sampler.samples
+            summary["top"] = [{"frame": frame, "self": own, "total": total}
+                              for frame, own, total in top_functions(self.sampler.stacks, limit)]
+        else:
+            stats = self.stats()
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+            summary["top"] = [{"frame": f"{name} ({os.path.basename(path)}:{line})", "self_seconds": round(tottime, 4),
+                               "total_seconds": round(cumtime, 4), "calls": calls}
+                              for (path, line, name), (_, calls, tottime, cumtime, _) in rows]
+        return summary
+
+    def stats(self) -> pstats.Stats:
+        with self._lock:
+            profilers = list(self._profilers)
+        if not profilers:
+            raise ValueError(f"Profile {self.profile_id} has no cProfile data")
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """The profile of the request being processed, or None when it is not profiled."""
+    return _current_profile.get()
+
+
+class ProfileStore:
+    """A directory of profiles (`<id>.json` summary plus `<id>.collapsed` or `<id>.pstats`), pruned oldest first."""
+
+    def __init__(self, directory: str, max_files: int = 200, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = str(directory)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+
+    def save(self, profile: RequestProfile) -> str:
+        """Write a finished profile and prune the directory; returns the summary path."""
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.profile_id)
+        if profile.sampler is not None:
+            with open(base + ".collapsed", "w") as f:
+                for stack, count in profile.sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        else:
+            profile.stats().dump_stats(base + ".pstats")
+        # The summary is written last: its presence marks a complete profile
+        with open(base + SUMMARY_SUFFIX + ".tmp", "w") as f:
+            json.dump(profile.summary(), f, indent=2)
+        os.replace(base + SUMMARY_SUFFIX + ".tmp", base + SUMMARY_SUFFIX)
+        self.prune()
+        return base + SUMMARY_SUFFIX
+
+    def _groups(self) -> Dict[str, List[os.DirEntry]]:
+        groups: Dict[str, List[os.DirEntry]] = {}
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                groups.setdefault(entry.name.split(".", 1)[0], []).append(entry)
+        return groups
+
+    def prune(self) -> int:
+        """Delete the oldest profiles beyond `max_files` or `max_bytes`; returns how many were deleted."""
+        if not os.path.isdir(self.directory):
+            return 0
+        groups = sorted(self._groups().values(), key=lambda entries: max(e.stat().st_mtime for e in entries), reverse=True)
+        kept_bytes = 0
+        deleted = 0
+        for index, entries in enumerate(groups):
+            size = sum(e.stat().st_size for e in entries)
+            if index < self.max_files and kept_bytes + size <= self.max_bytes:
+                kept_bytes += size
+                continue
+            for entry in entries:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(entry.path)
+            deleted += 1
+        return deleted
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, slowest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUMMARY_SUFFIX):
+                try:
+                    with open(entry.path) as f:
+                        summaries.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # being written or pruned concurrently
+        return sorted(summaries, key=lambda summary: summary.get("seconds", 0), reverse=True)
+
+    def data_path(self, profile_id: str) -> Optional[str]:
+        """The .collapsed or .pstats file of a stored profile."""
+        for suffix in (".collapsed", ".pstats"):
+            path = os.path.join(self.directory, profile_id + suffix)
+            if os.path.isfile(path):
+                return path
+        return None
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and stores their profiles.
+
+    A request is profiled when the client sends `token` (compared in constant time; an empty
+    token disables this) or, otherwise, with probability `sample_rate`.
+    """
+
+    def __init__(self, store: ProfileStore, sample_rate: float = 0.0, token: str = "", mode: str = "sample",
+                 interval: float = 0.005):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.token = token
+        self.mode = mode
+        self.interval = interval
+
+    def trigger(self, token: Optional[str]) -> Optional[str]:
+        """Why this request is profiled ("header" or "sample"), or None if it is not."""
+        if self.token and token and hmac.compare_digest(token.encode(), self.token.encode()):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    @contextlib.contextmanager
+    def profile(self, token: Optional[str] = None, **labels) -> Iterator[Optional[RequestProfile]]:
+        """Profile the block if the request is picked (yields the profile), else yield None."""
+        trigger = self.trigger(token)
+        if trigger is None:
+            yield None
+            return
+        profile = RequestProfile(f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}", self.mode, self.interval, trigger)
+        profile.labels.update(labels)
+        try:
+            with profile.run():
+                yield profile
+        finally:
+            PROFILES_CAPTURED.inc(trigger=trigger)
+            try:
+                self.store.save(profile)
+            except (OSError, ValueError) as e:
+                logger.error(f"[RequestProfiler] Could not store profile {profile.profile_id}: {e}")
@@ -0,0 +1,122 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from services.admission import (
+    AdmissionController,
+    Deadline,
+    DeadlineExceeded,
+    Overloaded,
+    bind_context,
+    call_timeout,
+    check_deadline,
+    current_deadline,
+    deadline_scope,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline(unittest.TestCase):
+    def test_remaining_timeout_and_check(self):
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        self.assertEqual(deadline.remaining(), 10)
+        self.assertEqual(deadline.timeout(60), 10)
+        self.assertEqual(deadline.timeout(4), 4)
+        deadline.check("ocr")
+        clock.now += 11
+        self.assertTrue(deadline.expired)
+        self.assertEqual(deadline.remaining(), 0)
+        with self.assertRaises(DeadlineExceeded) as raised:
+            deadline.check("extract")
+        self.assertEqual(raised.exception.stage, "extract")
+
+    def test_scope_and_thread_propagation(self):
+        self.assertIsNone(current_deadline())
+        self.assertEqual(call_timeout(30), 30)
+        check_deadline("ocr")  # no deadline: never raises
+        deadline = Deadline(5)
+        with deadline_scope(deadline), ThreadPoolExecutor(max_workers=1) as pool:
+            self.assertIs(current_deadline(), deadline)
+            self.assertLessEqual(call_timeout(30), 5)
+            self.assertIs(pool.submit(bind_context(current_deadline)).result(), deadline)
+            self.assertIsNone(pool.submit(current_deadline).result())
+        self.assertIsNone(current_deadline())
+
+    def test_degrade_records_mode_once(self):
+        deadline = Deadline(5)
+        deadline.degrade("skip_llm")
+        deadline.degrade("skip_llm")
+        self.assertEqual(deadline.degraded, {"skip_llm"})
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_rejects_when_queue_is_full(self):
+        controller = AdmissionController(max_concurrent=1, max_queued=0, max_wait=1)
+        with controller.admit():
+            with self.assertRaises(Overloaded) as raised:
+                with controller.admit():
+                    pass
+        self.assertEqual(raised.exception.status, 429)
+        self.assertEqual(raised.exception.reason, "queue_full")
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        with controller.admit():
+            self.assertEqual(controller.in_flight, 1)
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_queued_request_times_out(self):
+        controller = AdmissionController(max_concurrent=1, max_queued=1, max_wait=0.05)
+        with controller.admit():
+            with self.assertRaises(Overloaded) as raised:
+                with controller.admit():
+                    pass
+        self.assertEqual(raised.exception.status, 503)
+        self.assertEqual(raised.exception.reason, "queue_timeout")
+        self.assertEqual(controller.queued, 0)
+
+    def test_rejects_without_waiting_when_deadline_is_too_close(self):
+        controller = AdmissionController(max_concurrent=1, max_queued=4, max_wait=30, min_service_seconds=5)
+        with controller.admit():
+            with self.assertRaises(Overloaded) as raised:
+                with controller.admit(Deadline(3)):
+                    pass
+        self.assertEqual(raised.exception.reason, "deadline")
+
+    def test_queued_request_gets_freed_slot(self):
+        controller = AdmissionController(max_concurrent=1, max_queued=1, max_wait=5)
+        release = threading.Event()
+        admitted = threading.Event()
+
+        def holder():
+            with controller.admit():
+                release.wait()
+
+        def waiter():
+            with controller.admit():
+                admitted.set()
+
+        first = threading.Thread(target=holder)
+        first.start()
+        while controller.in_flight == 0:
+            pass
+        second = threading.Thread(target=waiter)
+        second.start()
+        while controller.queued == 0:
+            pass
+        self.assertFalse(admitted.is_set())
+        release.set()
+        self.assertTrue(admitted.wait(5))
+        first.join()
+        second.join()
+        self.assertEqual((controller.in_flight, controller.queued), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from unittest.mock import MagicMock
+from ml_pipeline.dataset.chunking import ChunkIndex, chunk_text
+
+class TestChunking(unittest.TestCase):
+    def test_chunk_text_overlapping_windows(self):
+        text = " ".join(str(i) for i in range(10))
+        self.assertEqual(chunk_text(text, window_words=4, overlap_words=1), ["0 1 2 3", "3 4 5 6", "6 7 8 9"])
+        self.assertEqual(chunk_text("short text", window_words=4, overlap_words=1), ["short text"])
+        self.assertEqual(chunk_text("   "), [])
+        with self.assertRaises(ValueError):
+            chunk_text(text, window_words=4, overlap_words=4)
+
+    def test_index_stores_chunks_with_parent_ids(self):
+        collection = MagicMock()
+        index = ChunkIndex(collection, {"window_words": 4, "overlap_words": 1, "batch_size": 2})
+        count = index.index("a.pdf", " ".join(str(i) for i in range(10)), {"class": "memo", "entities": "{}"})
+        self.assertEqual(count, 3)
+        collection.delete.assert_called_once_with(where={"parent_id": "a.pdf"})
+        self.assertEqual(collection.upsert.call_count, 2)
+        ids = [i for call in collection.upsert.call_args_list for i in call.kwargs["ids"]]
+        self.assertEqual(ids, ["a.pdf#0", "a.pdf#1", "a.pdf#2"])
+        metadata = collection.upsert.call_args_list[0].kwargs["metadatas"][0]
+        self.assertEqual(metadata, {"class": "memo", "parent_id": "a.pdf", "chunk_index": 0})
+
+    def test_query_aggregates_per_parent(self):
+        collection = MagicMock()
+        collection.query.return_value = {
+            "metadatas": [[{"parent_id": "a"}, {"parent_id": "b"}, {"parent_id": "a"}]],
+            "distances": [[0.5, 0.2, 0.1]],
+        }
+        parents = ChunkIndex(collection).query("query text", n_results=5)
+        self.assertEqual([p["id"] for p in parents], ["a", "b"])
+        self.assertAlmostEqual(parents[0]["distance"], 0.1)
+
+    def test_backfill_chunks_unindexed_documents(self):
+        chunks = MagicMock()
+        chunks.get.return_value = {"metadatas": [{"parent_id": "a", "chunk_index": 0}]}
+        documents = MagicMock()
+        documents.get.side_effect = [
+            {"ids": ["a", "b"]},
+            {"ids": ["b"], "documents": ["one two three"], "metadatas": [{"class": "memo"}]},
+        ]
+        counts = ChunkIndex(chunks).backfill(documents, batch_size=10)
+        self.assertEqual(counts, {"documents": 2, "indexed": 1})
+        documents.get.assert_called_with(ids=["b"], include=["documents", "metadatas"])
+        self.assertEqual(chunks.upsert.call_args.kwargs["ids"], ["b#0"])
+
+if __name__ == "__main__":
+    unittest.main()
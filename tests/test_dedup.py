@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from ml_pipeline.dataset.dedup import SIGNATURE_LOG, SIGNATURES_FILE, NearDuplicateIndex, content_key
+
+BASE = " ".join(f"word{i}" for i in range(400))
+NEAR = BASE.replace("word100 ", "wordx ").replace("word300 ", "wordy ")
+OTHER = " ".join(f"token{i}" for i in range(400))
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    def test_content_key_is_stable(self):
+        self.assertEqual(content_key("same text"), content_key("same text"))
+        self.assertNotEqual(content_key("same text"), content_key("other text"))
+
+    def test_query_finds_near_duplicates_only(self):
+        index = NearDuplicateIndex()
+        index.add("base", index.hasher.signature(BASE))
+        key, similarity = index.query(index.hasher.signature(NEAR))
+        self.assertEqual(key, "base")
+        self.assertGreaterEqual(similarity, index.threshold)
+        self.assertIsNone(index.query(index.hasher.signature(OTHER)))
+        self.assertIsNone(index.query(index.hasher.signature(BASE), exclude="base"))
+
+    def test_blank_text_has_no_signature(self):
+        index = NearDuplicateIndex()
+        self.assertIsNone(index.hasher.signature(""))
+        self.assertIsNone(index.hasher.signature("  \n\t "))
+        self.assertIsNotNone(index.hasher.signature("one word"))
+
+    def test_save_merges_entries_from_other_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first, second = NearDuplicateIndex(directory), NearDuplicateIndex(directory)
+            first.add("base", first.hasher.signature(BASE))
+            first.save()
+            second.add("other", second.hasher.signature(OTHER))
+            second.save()
+            reloaded = NearDuplicateIndex(directory)
+            self.assertEqual(sorted(reloaded.keys), ["base", "other"])
+            self.assertEqual(reloaded.query(reloaded.hasher.signature(NEAR))[0], "base")
+
+    def test_flush_appends_to_the_log_without_rewriting_the_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first, second = NearDuplicateIndex(directory), NearDuplicateIndex(directory)
+            first.add("base", first.hasher.signature(BASE))
+            first.save()
+            snapshot = os.stat(os.path.join(directory, SIGNATURES_FILE))
+            first.add("other", first.hasher.signature(OTHER))
+            first.flush()
+            second.add("near", second.hasher.signature(NEAR))
+            second.flush()
+            self.assertEqual(os.stat(os.path.join(directory, SIGNATURES_FILE)).st_mtime_ns, snapshot.st_mtime_ns)
+            # Each flush merges what others logged
+            self.assertEqual(sorted(second.keys), ["base", "near", "other"])
+            self.assertEqual(sorted(NearDuplicateIndex(directory).keys), ["base", "near", "other"])
+            # A partial record from an interrupted writer is skipped
+            with open(os.path.join(directory, SIGNATURE_LOG), "a") as f:
+                f.write("broken\tabc")
+            self.assertEqual(len(NearDuplicateIndex(directory)), 3)
+
+    def test_flush_compacts_a_long_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            index = NearDuplicateIndex(directory, compact_after=2)
+            index.add("base", index.hasher.signature(BASE))
+            index.flush()
+            self.assertFalse(os.path.exists(os.path.join(directory, SIGNATURES_FILE)))
+            index.add("other", index.hasher.signature(OTHER))
+            index.flush()
+            self.assertEqual(os.path.getsize(os.path.join(directory, SIGNATURE_LOG)), 0)
+            self.assertEqual(sorted(NearDuplicateIndex(directory).keys), ["base", "other"])
+
+if __name__ == "__main__":
+    unittest.main()
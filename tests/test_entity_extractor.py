@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch
 from ml_pipeline.entity_extractor.extractor import EntityExtractor
+from services.admission import Deadline, deadline_scope
 
 class TestEntityExtractor(unittest.TestCase):
     def test_initialization(self):
@@ -33,5 +34,23 @@ class TestEntityExtractor(unittest.TestCase):
         result = extractor.extract_entities("Invoice from AcmeCorp dated 2023-01-01 for $1000.", "invoice")
         self.assertIsInstance(result, dict)
 
+    @patch("ml_pipeline.entity_extractor.extractor.requests.post")
+    def test_skips_ollama_close_to_deadline(self, mock_post):
+        extractor = EntityExtractor(use_ollama=True, llm_min_seconds=10)
+        deadline = Deadline(2)
+        with deadline_scope(deadline):
+            result = extractor.extract_entities("Invoice 123 dated 2023-01-01 for $1,000.00", "invoice")
+        mock_post.assert_not_called()
+        self.assertEqual(result, {"date": "2023-01-01", "total_amount": "$1,000.00", "invoice_number": "123"})
+        self.assertEqual(deadline.degraded, {"skip_llm"})
+
+    @patch("ml_pipeline.entity_extractor.extractor.requests.post")
+    def test_ollama_timeout_follows_deadline(self, mock_post):
+        mock_post.return_value.json.return_value = {"response": '{"date": "2023-01-01"}'}
+        extractor = EntityExtractor(use_ollama=True, ollama_timeout=120, llm_min_seconds=1)
+        with deadline_scope(Deadline(30)):
+            self.assertEqual(extractor.extract_entities("Invoice", "invoice"), {"date": "2023-01-01"})
+        self.assertLessEqual(mock_post.call_args.kwargs["timeout"], 30)
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
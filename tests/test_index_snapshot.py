@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from ml_pipeline.dataset.dedup import NearDuplicateIndex
+from ml_pipeline.dataset.snapshot import (
+    SnapshotError, export_snapshot, import_snapshot, read_snapshot_entities, resolve_snapshot, restore_dedup_index,
+    verify_snapshot,
+)
+
+class FakeCollection:
+    def __init__(self, rows=None, client=None, name=None):
+        self.rows = dict(rows or {})
+        self.client, self.name = client, name
+
+    def get(self, ids=None, include=None):
+        ids = list(self.rows) if ids is None else ids
+        return {
+            "ids": ids,
+            "embeddings": [self.rows[i][0] for i in ids],
+            "documents": [self.rows[i][1] for i in ids],
+            "metadatas": [self.rows[i][2] for i in ids],
+        }
+
+    def add(self, ids, embeddings, documents, metadatas):
+        if self.client.fail_adds:
+            raise RuntimeError("disk full")
+        for row in zip(ids, embeddings, documents, metadatas):
+            self.rows[row[0]] = row[1:]
+
+    def modify(self, name):
+        self.client.collections[name] = self.client.collections.pop(self.name)
+        self.name = name
+
+class FakeClient:
+    def __init__(self):
+        self.fail_adds = False
+        self.collections = {
+            "documents": FakeCollection({"stale": ([0.0, 0.0, 0.0], "old", {"class": "memo"})}, self, "documents"),
+        }
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+    def get_or_create_collection(self, name, embedding_function=None):
+        return self.collections.setdefault(name, FakeCollection(client=self, name=name))
+
+class TestIndexSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.collections = {
+            "documents": FakeCollection({
+                f"doc-{i}": ([float(i), 0.5, -1.0], f"text {i}", {"class": "invoice", "filename": f"{i}.png"}) for i in range(5)
+            }),
+            "document_chunks": FakeCollection(),
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_export_verify_import_round_trip(self):
+        snapshot_dir = export_snapshot(self.collections, self.tmp.name, "all-MiniLM-L6-v2", batch_size=2)
+        self.assertEqual(resolve_snapshot(self.tmp.name), snapshot_dir)
+        manifest = verify_snapshot(snapshot_dir, "all-MiniLM-L6-v2")
+        self.assertEqual(manifest["collections"]["documents"]["count"], 5)
+        self.assertEqual(manifest["collections"]["documents"]["dim"], 3)
+        embeddings = np.load(os.path.join(snapshot_dir, "documents.embeddings.npy"), mmap_mode="r")
+        self.assertEqual(embeddings.dtype, np.float32)
+
+        client = FakeClient()
+        import_snapshot(snapshot_dir, client, None, "all-MiniLM-L6-v2", batch_size=2)
+        documents = client.collections["documents"].rows
+        self.assertNotIn("stale", documents)
+        self.assertEqual(sorted(documents), [f"doc-{i}" for i in range(5)])
+        self.assertEqual(documents["doc-3"][0], [3.0, 0.5, -1.0])
+        self.assertEqual(documents["doc-3"][2]["filename"], "3.png")
+        self.assertEqual(client.collections["document_chunks"].rows, {})
+        self.assertEqual(sorted(client.collections), ["document_chunks", "documents"])
+
+    def test_failed_import_keeps_live_collection(self):
+        snapshot_dir = export_snapshot(self.collections, self.tmp.name, "all-MiniLM-L6-v2")
+        client = FakeClient()
+        client.fail_adds = True
+        with self.assertRaisesRegex(RuntimeError, "disk full"):
+            import_snapshot(snapshot_dir, client, None, "all-MiniLM-L6-v2")
+        self.assertEqual(list(client.collections), ["documents"])
+        self.assertEqual(list(client.collections["documents"].rows), ["stale"])
+
+    def test_entities_and_dedup_round_trip(self):
+        dedup_dir = os.path.join(self.tmp.name, "dedup")
+        os.makedirs(dedup_dir)
+        np.save(os.path.join(dedup_dir, "signatures.npy"), np.arange(8, dtype=np.uint64).reshape(2, 4))
+        with open(os.path.join(dedup_dir, "keys.json"), "w") as f:
+            f.write('["doc-0", "doc-1"]')
+        rows = [{"document_id": "doc-0", "document_type": "invoice", "field": "total_amount", "value": "$10",
+                 "value_text": "$10", "value_number": 10.0, "value_date": None}]
+        snapshot_dir = export_snapshot(self.collections, os.path.join(self.tmp.name, "out"), "all-MiniLM-L6-v2",
+                                       entities=rows, dedup_dir=dedup_dir)
+        manifest = verify_snapshot(snapshot_dir)
+        self.assertEqual((manifest["entities"]["count"], manifest["dedup"]["count"]), (1, 2))
+        self.assertEqual(list(read_snapshot_entities(snapshot_dir)), rows)
+
+        restored = os.path.join(self.tmp.name, "restored")
+        self.assertTrue(restore_dedup_index(snapshot_dir, restored))
+        self.assertEqual(np.load(os.path.join(restored, "signatures.npy")).shape, (2, 4))
+        # Signatures logged against the replaced index are dropped with it
+        open(os.path.join(restored, "signatures.log"), "w").close()
+        self.assertTrue(restore_dedup_index(snapshot_dir, restored))
+        self.assertFalse(os.path.exists(os.path.join(restored, "signatures.log")))
+
+        with open(os.path.join(snapshot_dir, "dedup.keys.json"), "a") as f:
+            f.write(" ")
+        with self.assertRaisesRegex(SnapshotError, "Checksum mismatch"):
+            verify_snapshot(snapshot_dir)
+
+    def test_export_includes_logged_dedup_signatures(self):
+        dedup_dir = os.path.join(self.tmp.name, "dedup")
+        index = NearDuplicateIndex(dedup_dir)
+        index.add("doc-0", index.hasher.signature("first document text"))
+        index.flush()
+        snapshot_dir = export_snapshot(self.collections, os.path.join(self.tmp.name, "out"), "all-MiniLM-L6-v2", dedup_dir=dedup_dir)
+        self.assertEqual(verify_snapshot(snapshot_dir)["dedup"]["count"], 1)
+
+    def test_snapshot_without_extras(self):
+        snapshot_dir = export_snapshot(self.collections, self.tmp.name, "all-MiniLM-L6-v2",
+                                       dedup_dir=os.path.join(self.tmp.name, "missing"))
+        manifest = verify_snapshot(snapshot_dir)
+        self.assertNotIn("entities", manifest)
+        self.assertNotIn("dedup", manifest)
+        self.assertEqual(list(read_snapshot_entities(snapshot_dir)), [])
+        self.assertFalse(restore_dedup_index(snapshot_dir, os.path.join(self.tmp.name, "restored")))
+
+    def test_verification_failures(self):
+        snapshot_dir = export_snapshot(self.collections, self.tmp.name, "all-MiniLM-L6-v2")
+        with self.assertRaises(SnapshotError):
+            verify_snapshot(snapshot_dir, "another-model")
+        with open(os.path.join(snapshot_dir, "documents.records.jsonl"), "a") as f:
+            f.write("{}\n")
+        with self.assertRaisesRegex(SnapshotError, "Checksum mismatch"):
+            verify_snapshot(snapshot_dir)
+
+    def test_missing_snapshot(self):
+        with self.assertRaises(SnapshotError):
+            resolve_snapshot(self.tmp.name)
+
+if __name__ == "__main__":
+    unittest.main()
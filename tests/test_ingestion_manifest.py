@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from ml_pipeline.dataset.manifest import STATUS_DONE, STATUS_DUPLICATE, STATUS_ERROR, IngestionManifest, file_hash
+
+class TestIngestionManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_path = os.path.join(self.temp_dir.name, "manifest.sqlite3")
+        self.file_path = os.path.join(self.temp_dir.name, "a.png")
+        with open(self.file_path, "wb") as f:
+            f.write(b"first version")
+
+    def record_done(self, manifest):
+        stat = os.stat(self.file_path)
+        content_hash = manifest.check("invoice/a.png", self.file_path, stat)
+        manifest.record("invoice/a.png", stat, content_hash, STATUS_DONE, "doc-1")
+        manifest.close()
+
+    def test_new_file_needs_processing_and_is_persisted(self):
+        manifest = IngestionManifest(self.db_path, "v1")
+        self.assertEqual(manifest.check("invoice/a.png", self.file_path, os.stat(self.file_path)), file_hash(self.file_path))
+        self.record_done(manifest)
+        reopened = IngestionManifest(self.db_path, "v1")
+        self.assertIsNone(reopened.check("invoice/a.png", self.file_path, os.stat(self.file_path)))
+        self.assertEqual(reopened.entries["invoice/a.png"].document_id, "doc-1")
+
+    def test_touched_file_with_same_content_is_skipped(self):
+        self.record_done(IngestionManifest(self.db_path, "v1"))
+        stat = os.stat(self.file_path)
+        os.utime(self.file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        manifest = IngestionManifest(self.db_path, "v1")
+        self.assertIsNone(manifest.check("invoice/a.png", self.file_path, os.stat(self.file_path)))
+        self.assertEqual(manifest.entries["invoice/a.png"].mtime_ns, os.stat(self.file_path).st_mtime_ns)
+
+    def test_changed_file_version_or_error_needs_processing(self):
+        self.record_done(IngestionManifest(self.db_path, "v1"))
+        self.assertIsNotNone(IngestionManifest(self.db_path, "v2").check("invoice/a.png", self.file_path, os.stat(self.file_path)))
+        with open(self.file_path, "ab") as f:
+            f.write(b" edited")
+        manifest = IngestionManifest(self.db_path, "v1")
+        self.assertEqual(manifest.check("invoice/a.png", self.file_path, os.stat(self.file_path)), file_hash(self.file_path))
+        manifest.record("invoice/a.png", os.stat(self.file_path), file_hash(self.file_path), STATUS_ERROR, error="boom")
+        self.assertIsNotNone(manifest.check("invoice/a.png", self.file_path, os.stat(self.file_path)))
+
+    def test_references_follow_recorded_entries(self):
+        self.record_done(IngestionManifest(self.db_path, "v1"))
+        manifest = IngestionManifest(self.db_path, "v1")
+        self.addCleanup(manifest.close)
+        stat = os.stat(self.file_path)
+        manifest.record("memo/a.png", stat, "hash", STATUS_DUPLICATE, "doc-1")
+        self.assertEqual(manifest.references("doc-1"), 2)
+        manifest.record("invoice/a.png", stat, "hash", STATUS_DONE, "doc-2")
+        self.assertEqual((manifest.references("doc-1"), manifest.references("doc-2")), (1, 1))
+        manifest.record("memo/a.png", stat, "hash", STATUS_ERROR, error="boom")
+        self.assertEqual(manifest.references("doc-1"), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import patch
+from ml_pipeline.entity_extractor.extractor import EntityExtractor
+from ml_pipeline.entity_extractor.layout import LayoutExtractor, build_segments
+from ml_pipeline.ocr.base import BoundingBox, TextBlock
+
+INVOICE_FIELDS = ["invoice_number", "date", "total_amount", "customer_name", "customer_email"]
+
+def words(line, x, y, page=1):
+    """Word blocks for a line of text starting at (x, y), 12px per character."""
+    blocks = []
+    for word in line.split():
+        blocks.append(TextBlock(word, 0.9, BoundingBox(x, y, 12 * len(word), 24), page, "word"))
+        x += 12 * (len(word) + 1)
+    return blocks
+
+def invoice_blocks():
+    return (
+        words("INVOICE", 40, 40)
+        + words("Invoice #", 40, 80) + words("INV-10432", 400, 82)
+        + words("Date:", 40, 120) + words("2023-01-01", 400, 120)
+        + words("Bill To:", 40, 160)
+        + words("Acme Corporation", 40, 190)
+        + words("Total Amount Due: $1,000.00", 40, 260)
+    )
+
+class TestLayoutExtractor(unittest.TestCase):
+    def test_right_below_and_inline_values(self):
+        found = LayoutExtractor().extract(invoice_blocks(), INVOICE_FIELDS)
+        self.assertEqual(found, {
+            "invoice_number": "INV-10432",
+            "date": "2023-01-01",
+            "customer_name": "Acme Corporation",
+            "total_amount": "$1,000.00",
+        })
+
+    def test_words_split_into_segments_at_wide_gaps(self):
+        segments = build_segments(words("Date:", 40, 120) + words("2023-01-01", 400, 121) + words("Due soon", 40, 160))
+        self.assertEqual([s.text for s in segments], ["Date:", "2023-01-01", "Due soon"])
+
+    def test_values_must_match_field_patterns(self):
+        blocks = words("Total of 3 items shipped", 40, 40) + words("Date:", 40, 80) + words("pending", 400, 80)
+        self.assertEqual(LayoutExtractor().extract(blocks, ["total_amount", "date"]), {})
+
+    def test_labels_are_not_values(self):
+        blocks = words("Customer:", 40, 40) + words("Date: 2023-01-01", 40, 70)
+        self.assertEqual(LayoutExtractor().extract(blocks, ["customer_name", "date"]), {"date": "2023-01-01"})
+
+    def test_line_blocks_without_words(self):
+        blocks = [TextBlock("Invoice No: 77", 0.9, None, 1, "line"), TextBlock("Status: paid", 0.9, None, 1, "line")]
+        self.assertEqual(LayoutExtractor().extract(blocks, ["invoice_number", "status"]), {"invoice_number": "77", "status": "paid"})
+
+def complete_invoice_blocks():
+    return (
+        invoice_blocks()
+        + words("Address: 12 Main Street", 40, 300)
+        + words("Email: billing@acme.com", 40, 330)
+        + words("Phone: 555-0199", 40, 360)
+        + words("Vendor: Globex", 40, 390)
+        + words("Client: Acme Labs", 40, 420)
+        + words("Product: Consulting", 40, 450)
+    )
+
+class TestEntityExtractorLayout(unittest.TestCase):
+    @patch("ml_pipeline.entity_extractor.extractor.requests.post")
+    def test_complete_layout_skips_the_model(self, mock_post):
+        extractor = EntityExtractor(use_ollama=True)
+        entities = extractor.extract_entities("invoice text", "invoice", blocks=complete_invoice_blocks())
+        self.assertEqual(set(entities), set(extractor.entity_mapping["invoice"]))
+        self.assertEqual(entities["customer_email"], "billing@acme.com")
+        mock_post.assert_not_called()
+
+    @patch("ml_pipeline.entity_extractor.extractor.requests.post")
+    def test_model_still_called_for_fields_the_layout_misses(self, mock_post):
+        mock_post.return_value.json.return_value = {"response": '{"customer_address": "12 Main Street", "product": "Consulting"}'}
+        extractor = EntityExtractor(use_ollama=True)
+        entities = extractor.extract_entities("invoice text", "invoice", blocks=invoice_blocks())
+        mock_post.assert_called_once()
+        self.assertEqual(entities["invoice_number"], "INV-10432")
+        self.assertEqual(entities["customer_address"], "12 Main Street")
+        self.assertEqual(entities["product"], "Consulting")
+
+    @patch("ml_pipeline.entity_extractor.extractor.requests.post")
+    def test_partial_layout_is_merged_over_model_output(self, mock_post):
+        mock_post.return_value.json.return_value = {"response": '{"invoice_number": "wrong", "client": "Acme"}'}
+        extractor = EntityExtractor(use_ollama=True)
+        results = extractor.extract_entities_batch(
+            ["a", "b", "c"], ["invoice", "invoice", "memo"],
+            blocks=[invoice_blocks(), words("Invoice #", 40, 40) + words("INV-1", 300, 40), None],
+        )
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(results[0]["invoice_number"], "INV-10432")
+        self.assertEqual(results[0]["client"], "Acme")
+        self.assertEqual(results[1], {"invoice_number": "INV-1", "client": "Acme"})
+        self.assertEqual(results[2], {"invoice_number": "wrong", "client": "Acme"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import logging
+import unittest
+from services.logger import JSONFormatter, SamplingFilter, TextFormatter, parse_sample_rates, trim
+
+def make_record(msg, *args, level=logging.INFO, **extra):
+    record = logging.LogRecord("document_processing", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSamplingFilter(unittest.TestCase):
+    def test_rate_limit_per_event_and_suppressed_count(self):
+        clock = FakeClock()
+        sampling = SamplingFilter(rate_limit=2, clock=clock)
+        passed = [sampling.filter(make_record("Skipping %s", i, event="file_skipped")) for i in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        # Other events have their own bucket
+        self.assertTrue(sampling.filter(make_record("OCR completed for %s", "a.pdf")))
+        clock.now = 1.0
+        record = make_record("Skipping %s", 6, event="file_skipped")
+        self.assertTrue(sampling.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+    def test_warnings_always_pass(self):
+        sampling = SamplingFilter({"failed": 0.0}, rate_limit=1, clock=FakeClock())
+        for _ in range(5):
+            self.assertTrue(sampling.filter(make_record("failed", level=logging.ERROR, event="failed")))
+
+    def test_sample_rate_zero_drops_info(self):
+        sampling = SamplingFilter({"request": 0.0}, rate_limit=0)
+        self.assertFalse(sampling.filter(make_record("%s %s", "GET", "/search", event="request")))
+        self.assertTrue(sampling.filter(make_record("%s %s", "GET", "/search", event="upload")))
+
+    def test_parse_sample_rates(self):
+        self.assertEqual(parse_sample_rates("file_skipped=0.01, request=0.5,"), {"file_skipped": 0.01, "request": 0.5})
+        self.assertEqual(parse_sample_rates(""), {})
+
+class TestFormatters(unittest.TestCase):
+    def test_json_formatter_includes_event_and_extra_fields(self):
+        record = make_record("Processed %s", "a.pdf", event="file_processed", class_name="invoice", suppressed=2)
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertEqual(entry["message"], "Processed a.pdf")
+        self.assertEqual(entry["event"], "file_processed")
+        self.assertEqual(entry["class_name"], "invoice")
+        self.assertEqual(entry["suppressed"], 2)
+        self.assertEqual(entry["level"], "INFO")
+
+    def test_long_messages_are_trimmed(self):
+        self.assertEqual(trim("abcdef", 3), "abc... [3 chars trimmed]")
+        entry = json.loads(JSONFormatter(max_message_chars=10).format(make_record("x" * 50)))
+        self.assertTrue(entry["message"].startswith("x" * 10 + "..."))
+        text = TextFormatter(max_message_chars=10).format(make_record("y" * 50, suppressed=4))
+        self.assertIn("[40 chars trimmed] (4 similar messages suppressed)", text)
+
+if __name__ == "__main__":
+    unittest.main()
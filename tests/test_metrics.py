@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from services import metrics as metrics_module
+from services.metrics import MetricsRegistry, mark_process_dead, registry, stage_timer, STAGE_SECONDS, STAGE_ERRORS
+
+class TestMetrics(unittest.TestCase):
+    def test_render_counter_gauge_and_histogram(self):
+        metrics = MetricsRegistry()
+        pages = metrics.counter("pages_total", "Pages.", ("source_type",))
+        pages.inc(source_type="pdf")
+        pages.inc(2, source_type="pdf")
+        metrics.gauge("queue_depth", "Queue depth.").set(4)
+        latency = metrics.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+        latency.observe(0.05, stage="ocr")
+        latency.observe(0.5, stage="ocr")
+        text = metrics.render()
+        self.assertIn('document_processing_pages_total{source_type="pdf"} 3', text)
+        self.assertIn("document_processing_queue_depth 4", text)
+        self.assertIn('document_processing_latency_seconds_bucket{stage="ocr",le="0.1"} 1', text)
+        self.assertIn('document_processing_latency_seconds_bucket{stage="ocr",le="+Inf"} 2', text)
+        self.assertIn('document_processing_latency_seconds_count{stage="ocr"} 2', text)
+        self.assertIn("# TYPE document_processing_latency_seconds histogram", text)
+        self.assertIs(metrics.counter("pages_total", "Pages.", ("source_type",)), pages)
+
+    def test_disabled_registry_records_nothing(self):
+        metrics = MetricsRegistry(enabled=False)
+        counter = metrics.counter("errors_total", "Errors.")
+        counter.inc()
+        self.assertEqual(counter.value(), 0)
+
+    def test_stage_timer(self):
+        before = STAGE_SECONDS.count(stage="test_stage")
+        errors_before = STAGE_ERRORS.value(stage="test_stage")
+        with stage_timer("test_stage"):
+            pass
+        with self.assertRaises(ValueError):
+            with stage_timer("test_stage"):
+                raise ValueError("boom")
+        self.assertEqual(STAGE_SECONDS.count(stage="test_stage"), before + 2)
+        self.assertEqual(STAGE_ERRORS.value(stage="test_stage"), errors_before + 1)
+
+    def test_render_all_adds_other_processes(self):
+        metrics = MetricsRegistry()
+        pages = metrics.counter("pages_total", "Pages.", ("source_type",))
+        depth = metrics.gauge("queue_depth", "Queue depth.")
+        latency = metrics.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        pages.inc(2, source_type="pdf")
+        depth.set(1)
+        latency.observe(0.05)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "999999.json"), "w") as f:
+                json.dump({
+                    "document_processing_pages_total": [[["pdf"], 3], [["png"], 1]],
+                    "document_processing_queue_depth": [[[], 4]],
+                    "document_processing_latency_seconds": [[[], [[0, 1, 0], 0.5, 1]]],
+                    "document_processing_unknown_total": [[[], 7]],
+                }, f)
+            metrics.write_snapshot(directory)  # this process's own file is replaced by its live values
+            pages.inc(source_type="pdf")
+            text = metrics.render_all(directory)
+            self.assertIn('document_processing_pages_total{source_type="pdf"} 6', text)
+            self.assertIn('document_processing_pages_total{source_type="png"} 1', text)
+            self.assertIn("document_processing_queue_depth 5", text)
+            self.assertIn('document_processing_latency_seconds_bucket{le="0.1"} 1', text)
+            self.assertIn('document_processing_latency_seconds_bucket{le="1"} 2', text)
+            self.assertIn("document_processing_latency_seconds_count 2", text)
+            self.assertNotIn("unknown", text)
+
+            with patch.object(metrics_module, "registry", metrics):
+                mark_process_dead(directory, 999999)
+            text = metrics.render_all(directory)
+            self.assertIn("document_processing_queue_depth 1", text)
+            self.assertIn('document_processing_pages_total{source_type="pdf"} 6', text)
+
+    def test_disabled_stage_timer_is_shared_noop(self):
+        registry.enabled = False
+        try:
+            self.assertIs(stage_timer("a"), stage_timer("b"))
+        finally:
+            registry.enabled = True
+
+if __name__ == "__main__":
+    unittest.main()
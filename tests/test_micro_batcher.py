@@ -0,0 +1,32 @@
+import threading
+import unittest
+from ml_pipeline.inference.batcher import MicroBatcher
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_results_returned_in_order(self):
+        batcher = MicroBatcher(lambda items: [i * 2 for i in items], max_batch_size=4, max_wait_ms=1.0)
+        self.assertEqual(batcher.map([1, 2, 3, 4, 5]), [2, 4, 6, 8, 10])
+
+    def test_concurrent_requests_share_batches(self):
+        batch_sizes = []
+        def batch_fn(items):
+            batch_sizes.append(len(items))
+            return items
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50.0)
+        threads = [threading.Thread(target=batcher.map, args=([i],)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sum(batch_sizes), 8)
+        self.assertLess(len(batch_sizes), 8)
+
+    def test_batch_failure_propagates(self):
+        def batch_fn(items):
+            raise RuntimeError("model failed")
+        batcher = MicroBatcher(batch_fn, max_wait_ms=1.0)
+        with self.assertRaises(RuntimeError):
+            batcher.submit("text").result(timeout=5)
+
+if __name__ == "__main__":
+    unittest.main()
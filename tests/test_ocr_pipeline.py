@@ -0,0 +1,66 @@
+import io
+import unittest
+from unittest.mock import MagicMock
+from PIL import Image
+from ml_pipeline.ocr.base import OCRResult, TextBlock
+from ml_pipeline.ocr.page_source import open_page_source
+from ml_pipeline.ocr.pipeline import OCRPipeline
+
+def make_multipage_tiff(pages: int) -> bytes:
+    frames = [Image.new("L", (40, 20), color=i * 40) for i in range(pages)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="TIFF", save_all=True, append_images=frames[1:])
+    return buffer.getvalue()
+
+class TestOCRPipeline(unittest.TestCase):
+    def setUp(self):
+        self.processor = MagicMock()
+        self.processor.extract_text.side_effect = lambda image: OCRResult(
+            text=f"page {image.getpixel((0, 0))}",
+            confidence=0.5,
+            blocks=[TextBlock(text="word", confidence=0.5)],
+        )
+        self.pipeline = OCRPipeline(self.processor)
+
+    def test_page_source_streams_tiff_frames(self):
+        source = open_page_source(make_multipage_tiff(3))
+        self.assertEqual(source.source_type, "tiff")
+        self.assertEqual(source.page_count, 3)
+        self.assertEqual([page.getpixel((0, 0)) for page in source.iter_pages()], [0, 40, 80])
+
+    def test_page_source_closes_only_images_it_opened(self):
+        opened = open_page_source(make_multipage_tiff(1))
+        with opened:
+            self.assertEqual(len(list(opened.iter_pages())), 1)
+        self.assertIsNone(getattr(opened.image, "fp", None))
+        image = Image.new("L", (40, 20))
+        with open_page_source(image) as source:
+            list(source.iter_pages())
+        self.assertEqual(image.getpixel((0, 0)), 0)
+
+    def test_multipage_tiff_ocr_per_page(self):
+        result = self.pipeline.process_file(make_multipage_tiff(3))
+        self.assertEqual(self.processor.extract_text.call_count, 3)
+        self.assertEqual(result.page_count, 3)
+        self.assertEqual(result.text, "page 0\npage 40\npage 80")
+        self.assertEqual([b.page_number for b in result.blocks], [1, 2, 3])
+        self.assertEqual(result.metadata["type"], "tiff")
+
+    def test_iter_page_results_in_order_with_prefetch(self):
+        pages = list(self.pipeline.iter_page_results(make_multipage_tiff(4), prefetch=3))
+        self.assertEqual([p.text for p in pages], ["page 0", "page 40", "page 80", "page 120"])
+        self.assertEqual([p.blocks[0].page_number for p in pages], [1, 2, 3, 4])
+        combined = OCRPipeline.combine_pages(pages)
+        self.assertEqual(combined.text, "page 0\npage 40\npage 80\npage 120")
+        self.assertEqual(combined.metadata["type"], "tiff")
+
+    def test_single_image_bytes_passed_to_processor_untouched(self):
+        data = make_multipage_tiff(1)
+        self.processor.extract_text.side_effect = None
+        self.processor.extract_text.return_value = OCRResult(text="page", confidence=0.5)
+        result = self.pipeline.process_file(data)
+        self.processor.extract_text.assert_called_once_with(data)
+        self.assertEqual(result.page_count, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import os
+import tempfile
+import unittest
+from PIL import Image
+from ml_pipeline.ocr.payload import encode_image, sniff_format, to_payload
+
+def encoded(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+class TestImagePayload(unittest.TestCase):
+    def setUp(self):
+        self.photo = Image.radial_gradient("L").convert("RGB")
+
+    def test_sniff_format(self):
+        self.assertEqual(sniff_format(encoded(self.photo, "JPEG")), "jpeg")
+        self.assertEqual(sniff_format(encoded(self.photo, "PNG")), "png")
+        self.assertEqual(sniff_format(encoded(self.photo, "TIFF")), "tiff")
+        self.assertIsNone(sniff_format(b"not an image"))
+
+    def test_accepted_bytes_pass_through(self):
+        data = encoded(self.photo, "JPEG")
+        payload = to_payload(data, accepted_formats=["jpeg", "png"])
+        self.assertIs(payload.data, data)
+        self.assertFalse(payload.transcoded)
+
+    def test_file_and_view_payloads_are_bytes(self):
+        data = encoded(self.photo, "PNG")
+        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.remove, f.name)
+        payload = to_payload(f.name, accepted_formats=["png"])
+        self.assertEqual((payload.data, payload.format, payload.transcoded), (data, "png", False))
+        self.assertIsInstance(to_payload(memoryview(data), accepted_formats=["png"]).data, bytes)
+
+    def test_unaccepted_format_is_transcoded(self):
+        payload = to_payload(encoded(self.photo, "TIFF"), accepted_formats=["jpeg", "png"])
+        self.assertTrue(payload.transcoded)
+        self.assertEqual(payload.format, "jpeg")
+        self.assertEqual(sniff_format(payload.data), "jpeg")
+
+    def test_bilevel_page_encoded_as_png(self):
+        page = self.photo.convert("L").point(lambda v: 255 if v > 128 else 0)
+        self.assertEqual(encode_image(page).format, "png")
+
+    def test_size_cap(self):
+        noisy = Image.effect_noise((800, 800), 64).convert("RGB")
+        payload = encode_image(noisy, "jpeg", max_bytes=20_000)
+        self.assertLessEqual(payload.size, 20_000)
+
+if __name__ == "__main__":
+    unittest.main()
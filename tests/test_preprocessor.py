@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+from PIL import Image, ImageDraw
+from ml_pipeline.ocr.preprocessor import OCRPreprocessor, binarize_adaptive, estimate_skew, otsu_threshold
+
+def text_like_page(angle: float = 0.0) -> Image.Image:
+    image = Image.new("L", (600, 400), color=255)
+    draw = ImageDraw.Draw(image)
+    for y in range(40, 360, 30):
+        draw.rectangle([40, y, 560, y + 6], fill=0)
+    return image.rotate(angle, expand=False, fillcolor=255)
+
+class TestOCRPreprocessor(unittest.TestCase):
+    def test_otsu_threshold_separates_modes(self):
+        gray = np.array([[20] * 50 + [220] * 50], dtype=np.uint8)
+        threshold = otsu_threshold(gray)
+        self.assertTrue(20 <= threshold < 220)
+
+    def test_adaptive_binarization_shape_and_values(self):
+        gray = np.asarray(text_like_page(), dtype=np.uint8)
+        binary = binarize_adaptive(gray, window=15, offset=10)
+        self.assertEqual(binary.shape, gray.shape)
+        self.assertEqual(set(np.unique(binary)), {0, 255})
+
+    def test_estimate_skew_recovers_rotation(self):
+        # PIL rotates counter-clockwise, so the skew to undo is the negated angle.
+        angle = estimate_skew(np.asarray(text_like_page(angle=2.0)))
+        self.assertAlmostEqual(angle, -2.0, delta=0.5)
+
+    def test_steps_can_be_disabled(self):
+        page = text_like_page().convert("RGB")
+        result = OCRPreprocessor({"downscale": False, "grayscale": False, "deskew": False, "binarize": None}).process(page)
+        self.assertIs(result, page)
+
+    def test_downscale_respects_max_dimension(self):
+        page = Image.new("RGB", (4000, 2000), color="white")
+        result = OCRPreprocessor({"max_dimension": 1000, "deskew": False}).process(page)
+        self.assertEqual(result.size, (1000, 500))
+        self.assertEqual(result.mode, "L")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from services.admission import bind_context
+from services.profiling import ProfileStore, RequestProfile, RequestProfiler, current_profile, top_functions
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def work_in_pool():
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(bind_context(busy), 0.1).result()
+
+
+class TestRequestProfile(unittest.TestCase):
+    def test_sampler_covers_request_and_pool_threads(self):
+        profile = RequestProfile("p1", interval=0.002)
+        with profile.run():
+            self.assertIs(current_profile(), profile)
+            busy(0.1)
+            work_in_pool()
+        self.assertIsNone(current_profile())
+        pool_stacks = [s for s in profile.sampler.stacks if s.startswith("ThreadPoolExecutor") and "busy (" in s]
+        self.assertTrue(pool_stacks)
+        self.assertTrue(any("work_in_pool (" not in s and "busy (" in s for s in profile.sampler.stacks))
+        self.assertIn("busy", profile.summary()["top"][0]["frame"])
+
+    def test_cprofile_merges_threads(self):
+        profile = RequestProfile("p2", mode="cprofile")
+        with profile.run():
+            work_in_pool()
+        functions = {name for _, _, name in profile.stats().stats}
+        self.assertIn("busy", functions)
+        self.assertIn("work_in_pool", functions)
+
+    def test_top_functions(self):
+        stacks = {"main;a;b": 3, "main;a": 1, "main;c;b": 2}
+        self.assertEqual(top_functions(stacks, limit=2), [("b", 5, 5), ("a", 1, 4)])
+
+
+class TestProfileStore(unittest.TestCase):
+    def test_save_list_and_prune(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = ProfileStore(directory, max_files=2)
+            for i, seconds in enumerate([0.2, 0.5, 0.1]):
+                profile = RequestProfile(f"p{i}", interval=0.001)
+                with profile.run():
+                    busy(0.01)
+                profile.seconds = seconds
+                store.save(profile)
+            self.assertEqual([s["id"] for s in store.summaries()], ["p1", "p2"])
+            self.assertIsNone(store.data_path("p0"))
+            self.assertTrue(store.data_path("p1").endswith(".collapsed"))
+
+
+class TestRequestProfiler(unittest.TestCase):
+    def test_triggers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = RequestProfiler(ProfileStore(directory), sample_rate=0.0, token="secret")
+            self.assertIsNone(profiler.trigger(None))
+            self.assertIsNone(profiler.trigger("wrong"))
+            self.assertEqual(profiler.trigger("secret"), "header")
+            self.assertEqual(RequestProfiler(ProfileStore(directory), sample_rate=1.0).trigger(None), "sample")
+            self.assertIsNone(RequestProfiler(ProfileStore(directory)).trigger(""))
+
+            with profiler.profile("secret", path="/api/documents/process/") as profile:
+                busy(0.01)
+            with profiler.profile(None) as skipped:
+                self.assertIsNone(skipped)
+            summary = ProfileStore(directory).summaries()[0]
+            self.assertEqual(summary["id"], profile.profile_id)
+            self.assertEqual(summary["labels"], {"path": "/api/documents/process/"})
+            self.assertEqual(summary["trigger"], "header")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from ml_pipeline.dataset.dedup import NearDuplicateIndex, content_key
+from ml_pipeline.dataset.manifest import IngestionManifest, ManifestEntry
+from ml_pipeline.dataset.sharded import AnalyzedFile, ShardedIngestor, _PendingFile
+
+class TestShardedIngestorWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.manifest = IngestionManifest(os.path.join(self.temp_dir.name, "manifest.sqlite3"), "v1")
+        self.addCleanup(self.manifest.close)
+        self.generator = MagicMock()
+        self.generator.dedup_index = None
+        self.generator.document_metadata.side_effect = lambda key, class_name, filename, ocr_result, entities: {"class": class_name}
+        self.ingestor = ShardedIngestor(self.generator, processes=2, write_batch_size=2)
+        self.stat = os.stat(self.temp_dir.name)
+
+    def pending(self, name):
+        return _PendingFile("invoice", name, self.stat, f"hash-{name}", None)
+
+    def test_results_are_written_in_batches(self):
+        batch, counts = [], {"processed": 0, "duplicate": 0, "error": 0}
+        for name in ("a.png", "b.png"):
+            self.assertIsNone(self.ingestor._accept(self.manifest, AnalyzedFile(key=f"invoice/{name}", cleaned_text=name, entities={}), self.pending(name), batch))
+        self.ingestor._flush(self.manifest, batch, counts)
+        self.assertEqual(counts["processed"], 2)
+        self.assertEqual(batch, [])
+        self.generator.upsert_many.assert_called_once()
+        self.assertEqual(len(self.generator.upsert_many.call_args.args[0]), 2)
+        self.assertEqual(self.generator.record_stored.call_count, 2)
+
+    def test_worker_errors_are_recorded(self):
+        outcome = self.ingestor._accept(self.manifest, AnalyzedFile(key="invoice/bad.png", error="OCRProcessingError: boom"), self.pending("bad.png"), [])
+        self.assertEqual(outcome, "error")
+        self.assertEqual(self.manifest.entries["invoice/bad.png"].status, "error")
+
+    def test_failed_write_marks_batch_as_errors(self):
+        self.generator.upsert_many.side_effect = RuntimeError("chroma down")
+        batch, counts = [], {"processed": 0, "duplicate": 0, "error": 0}
+        self.ingestor._accept(self.manifest, AnalyzedFile(key="invoice/a.png", cleaned_text="a", entities={}), self.pending("a.png"), batch)
+        self.ingestor._flush(self.manifest, batch, counts)
+        self.assertEqual(counts, {"processed": 0, "duplicate": 0, "error": 1})
+        self.assertEqual(self.manifest.entries["invoice/a.png"].error, "chroma down")
+
+    def use_dedup(self):
+        self.generator.dedup_index = NearDuplicateIndex()
+        hasher = self.generator.dedup_index.hasher
+        self.generator.find_duplicate.side_effect = lambda text, exclude=None: (None, 0.0, hasher.signature(text))
+
+    def test_near_duplicates_within_a_batch_are_stored_once(self):
+        self.use_dedup()
+        words = " ".join(f"word{i}" for i in range(300))
+        batch, counts = [], {"processed": 0, "duplicate": 0, "error": 0}
+        for name, text in (("a.png", words), ("b.png", words.replace("word150", "other150"))):
+            self.assertIsNone(self.ingestor._accept(self.manifest, AnalyzedFile(key=f"invoice/{name}", cleaned_text=text, entities={}), self.pending(name), batch))
+        self.ingestor._flush(self.manifest, batch, counts)
+        self.assertEqual(counts, {"processed": 1, "duplicate": 1, "error": 0})
+        self.assertEqual(len(self.generator.upsert_many.call_args.args[0]), 1)
+        self.assertEqual(self.generator.record_duplicate.call_args.args[1::4], ("invoice/b.png", content_key(words)))
+
+    def test_edited_file_excludes_its_previous_document(self):
+        self.use_dedup()
+        previous = ManifestEntry("invoice/a.png", self.stat.st_size, self.stat.st_mtime_ns, "hash-old", "v1", "done", "doc-old")
+        self.generator.own_document_id.return_value = "doc-old"
+        item = _PendingFile("invoice", "a.png", self.stat, "hash-a.png", previous)
+        self.ingestor._accept(self.manifest, AnalyzedFile(key="invoice/a.png", cleaned_text="edited text", entities={}), item, [])
+        self.generator.own_document_id.assert_called_once_with(self.manifest, previous)
+        self.assertEqual(self.generator.find_duplicate.call_args.kwargs["exclude"], "doc-old")
+
+if __name__ == "__main__":
+    unittest.main()
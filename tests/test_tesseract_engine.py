@@ -0,0 +1,158 @@
+import sys
+import threading
+import types
+import unittest
+from unittest.mock import patch
+
+from PIL import Image
+
+from ml_pipeline.ocr.tesseract import TesseractOCRProcessor
+from ml_pipeline.ocr.tesseract_engine import TesseractEnginePool, TesseractEngineOCRProcessor, parse_tesseract_config
+from services.admission import Deadline, DeadlineExceeded, deadline_scope
+
+WORDS = [("Invoice", 96.0, (10, 10, 90, 30)), ("", 95.0, (0, 0, 0, 0)), ("noise", -1.0, (0, 0, 5, 5)),
+         ("#123", 88.0, (100, 10, 150, 30))]
+
+
+class FakeWord:
+    def __init__(self, text, conf, box):
+        self.text, self.conf, self.box = text, conf, box
+
+    def GetUTF8Text(self, level):
+        return self.text
+
+    def Confidence(self, level):
+        return self.conf
+
+    def BoundingBox(self, level):
+        return self.box
+
+
+class FakeAPI:
+    created = []
+
+    def __init__(self, lang, psm=None, oem=None):
+        self.kwargs = {"lang": lang, "psm": psm, "oem": oem}
+        self.variables = {}
+        self.cleared = 0
+        self.recognize_timeouts = []
+        FakeAPI.created.append(self)
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+        return True
+
+    def SetImage(self, image):
+        self.image = image
+
+    def Recognize(self, timeout=0):
+        self.recognize_timeouts.append(timeout)
+        return True
+
+    def GetIterator(self):
+        return [FakeWord(*word) for word in WORDS]
+
+    def Clear(self):
+        self.cleared += 1
+
+
+def fake_tesserocr():
+    module = types.ModuleType("tesserocr")
+    module.PyTessBaseAPI = FakeAPI
+    module.RIL = types.SimpleNamespace(WORD=3)
+    module.iterate_level = lambda iterator, level: iter(iterator)
+    return module
+
+
+class TestParseTesseractConfig(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_tesseract_config("--oem 3 --psm 6"), (6, 3, {}))
+        self.assertEqual(parse_tesseract_config("--psm 4 -c preserve_interword_spaces=1"),
+                         (4, None, {"preserve_interword_spaces": "1"}))
+        self.assertEqual(parse_tesseract_config(""), (None, None, {}))
+        self.assertEqual(parse_tesseract_config("--dpi 300 --psm 11"), (11, None, {"user_defined_dpi": "300"}))
+
+
+class TestTesseractEngines(unittest.TestCase):
+    def setUp(self):
+        FakeAPI.created = []
+        patcher = patch.dict(sys.modules, {"tesserocr": fake_tesserocr()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_reuses_engines_and_grows_to_size(self):
+        pool = TesseractEnginePool("eng", "--oem 1 --psm 6 -c tessedit_do_invert=0", size=2)
+        with pool.engine() as first:
+            pass
+        with pool.engine() as again:
+            self.assertIs(again, first)
+        with pool.engine() as a, pool.engine() as b:
+            self.assertIsNot(a, b)
+        self.assertEqual(len(FakeAPI.created), 2)
+        self.assertEqual(first.kwargs, {"lang": "eng", "psm": 6, "oem": 1})
+        self.assertEqual(first.variables, {"tessedit_do_invert": "0"})
+        self.assertEqual(first.cleared, 3)
+
+        # A third concurrent borrower waits for a returned engine instead of creating one
+        borrowed = []
+        with pool.engine() as a, pool.engine() as b:
+            waiter = threading.Thread(target=lambda: borrowed.append(pool.engine().__enter__()))
+            waiter.start()
+            waiter.join(0.05)
+            self.assertEqual(borrowed, [])
+        waiter.join(1)
+        self.assertIn(borrowed[0], (a, b))
+        self.assertEqual(len(FakeAPI.created), 2)
+
+    def test_extract_text_returns_word_blocks(self):
+        processor = TesseractEngineOCRProcessor({"language": "eng", "tesseract_config": "--psm 6", "pool_size": 1})
+        result = processor.extract_text(Image.new("L", (200, 50), 255))
+        self.assertEqual(result.text, "Invoice #123")
+        self.assertEqual([b.block_type for b in result.blocks], ["word", "word"])
+        self.assertEqual(result.blocks[1].bounding_box.x, 100)
+        self.assertEqual(result.blocks[1].bounding_box.width, 50)
+        self.assertAlmostEqual(result.confidence, 0.92)
+        self.assertEqual(result.raw_response["tesseract_data"]["text"], ["Invoice", "#123"])
+        self.assertEqual(result.metadata["engine"], "tesserocr")
+        self.assertEqual(FakeAPI.created[0].recognize_timeouts, [0])
+
+    def test_deadline_timeouts(self):
+        processor = TesseractEngineOCRProcessor({"language": "eng", "pool_size": 1})
+        page = Image.new("L", (200, 50), 255)
+        with deadline_scope(Deadline(2.5)):
+            processor.extract_text(page)
+        # Expires between the check and the call: the smallest timeout, never 0 ("no timeout")
+        with deadline_scope(Deadline(1, clock=iter([0, 0.5, 2]).__next__)):
+            processor.extract_text(page)
+        timeouts = FakeAPI.created[0].recognize_timeouts
+        self.assertTrue(0 < timeouts[0] <= 2500)
+        self.assertEqual(timeouts[1], 1)
+        with deadline_scope(Deadline(0)), self.assertRaises(DeadlineExceeded):
+            processor.extract_text(page)
+        self.assertEqual(len(timeouts), 2)
+
+
+class TestTesseractSubprocessTimeout(unittest.TestCase):
+    def setUp(self):
+        self.processor = TesseractOCRProcessor()
+        patcher = patch.object(self.processor.pytesseract, "image_to_data", return_value={
+            "text": ["Invoice"], "conf": ["96"], "left": [1], "top": [2], "width": [3], "height": [4], "level": [5]})
+        self.image_to_data = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.page = Image.new("L", (20, 20), 255)
+
+    def test_no_deadline_means_no_timeout(self):
+        self.assertEqual(self.processor.extract_text(self.page).text, "Invoice")
+        self.assertEqual(self.image_to_data.call_args.kwargs["timeout"], 0)
+
+    def test_deadline_timeouts(self):
+        with deadline_scope(Deadline(1, clock=iter([0, 0.5, 2]).__next__)):
+            self.processor.extract_text(self.page)
+        self.assertEqual(self.image_to_data.call_args.kwargs["timeout"], 0.001)
+        with deadline_scope(Deadline(0)), self.assertRaises(DeadlineExceeded):
+            self.processor.extract_text(self.page)
+        self.assertEqual(self.image_to_data.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
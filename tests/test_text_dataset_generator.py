@@ -1,7 +1,29 @@
 import unittest
 from unittest.mock import MagicMock, patch
+from ml_pipeline.dataset.dedup import NearDuplicateIndex
 from ml_pipeline.dataset.generator import TextDatasetGenerator
 
+WORDS = " ".join(f"word{i}" for i in range(300))
+
+
+class FakeCollection:
+    """Stores upserted documents so re-runs see what earlier runs wrote."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, documents, metadatas, ids):
+        self.rows.update(zip(ids, zip(documents, metadatas)))
+
+    def get(self, ids=None, include=None):
+        ids = [i for i in (self.rows if ids is None else ids) if i in self.rows]
+        return {"ids": ids, "metadatas": [self.rows[i][1] for i in ids]}
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+
 class TestTextDatasetGenerator(unittest.TestCase):
     def setUp(self):
         self.input_dir = "test_data"
@@ -30,5 +52,150 @@ class TestTextDatasetGenerator(unittest.TestCase):
                 # Should skip file, so no exception should be raised
                 pass  # The actual skipping is in the generate() method
 
+    def _make_tree(self, temp_dir):
+        import os
+        input_dir = os.path.join(temp_dir, "docs")
+        os.makedirs(os.path.join(input_dir, "invoice"))
+        os.makedirs(os.path.join(input_dir, "memo"))
+        for path in ("invoice/a.png", "memo/a.png"):
+            with open(os.path.join(input_dir, path), "wb") as f:
+                f.write(path.encode())
+        return input_dir
+
+    def _pipeline(self):
+        from ml_pipeline.ocr.base import OCRResult
+        pipeline = MagicMock()
+        pipeline.processor.get_supported_formats.return_value = ["png"]
+        pipeline.process_file.side_effect = lambda path: OCRResult(text=f"text of {path}", confidence=0.9, metadata={})
+        return pipeline
+
+    @patch("ml_pipeline.dataset.generator.EntityExtractor")
+    @patch("ml_pipeline.dataset.generator.chromadb.PersistentClient")
+    def test_rerun_processes_only_new_or_changed_files(self, mock_chroma, mock_extractor):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = self._make_tree(temp_dir)
+            pipeline = self._pipeline()
+            mock_extractor.return_value.extract_entities.return_value = {}
+            mock_chroma.return_value.get_or_create_collection.return_value.get.return_value = {"ids": [], "metadatas": []}
+            config = {"ocr_processor_pipeline": pipeline, "manifest_path": os.path.join(temp_dir, "manifest.sqlite3")}
+
+            counts = TextDatasetGenerator(input_dir, config).generate()
+            # Same filename in two class folders: both are processed
+            self.assertEqual(counts, {"processed": 2, "skipped": 0, "duplicate": 0, "error": 0})
+            self.assertEqual(pipeline.process_file.call_count, 2)
+
+            counts = TextDatasetGenerator(input_dir, config).generate()
+            self.assertEqual(counts, {"processed": 0, "skipped": 2, "duplicate": 0, "error": 0})
+            self.assertEqual(pipeline.process_file.call_count, 2)
+
+            with open(os.path.join(input_dir, "memo/a.png"), "ab") as f:
+                f.write(b" edited")
+            counts = TextDatasetGenerator(input_dir, config).generate()
+            self.assertEqual(counts, {"processed": 1, "skipped": 1, "duplicate": 0, "error": 0})
+            self.assertEqual(pipeline.process_file.call_count, 3)
+
+    @patch("ml_pipeline.dataset.generator.EntityExtractor")
+    @patch("ml_pipeline.dataset.generator.chromadb.PersistentClient")
+    def test_legacy_files_adopted_by_class_and_filename(self, mock_chroma, mock_extractor):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = self._make_tree(temp_dir)
+            pipeline = self._pipeline()
+            mock_extractor.return_value.extract_entities.return_value = {}
+            collection = mock_chroma.return_value.get_or_create_collection.return_value
+            # Only invoice/a.png was ingested before the manifest existed, keyed by filename
+            collection.get.return_value = {"ids": ["a.png"], "metadatas": [{"class": "invoice", "filename": "a.png"}]}
+            config = {"ocr_processor_pipeline": pipeline, "manifest_path": os.path.join(temp_dir, "manifest.sqlite3")}
+
+            counts = TextDatasetGenerator(input_dir, config).generate()
+            self.assertEqual(counts, {"processed": 1, "skipped": 1, "duplicate": 0, "error": 0})
+            pipeline.process_file.assert_called_once_with(os.path.join(input_dir, "memo", "a.png"))
+
+            # Editing the adopted file replaces its filename-keyed document
+            with open(os.path.join(input_dir, "invoice/a.png"), "ab") as f:
+                f.write(b" edited")
+            counts = TextDatasetGenerator(input_dir, config).generate()
+            self.assertEqual(counts["processed"], 1)
+            collection.delete.assert_called_once_with(ids=["a.png"])
+
+    @patch("ml_pipeline.dataset.generator.EntityExtractor")
+    @patch("ml_pipeline.dataset.generator.chromadb.PersistentClient")
+    def test_edited_file_is_not_a_duplicate_of_itself(self, mock_chroma, mock_extractor):
+        import os
+        import tempfile
+        from ml_pipeline.ocr.base import OCRResult
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "docs", "memo"))
+            path = os.path.join(temp_dir, "docs", "memo", "a.png")
+            with open(path, "w") as f:
+                f.write(WORDS)
+            pipeline = self._pipeline()
+            pipeline.process_file.side_effect = lambda p: OCRResult(text=open(p).read(), confidence=0.9, metadata={})
+            mock_extractor.return_value.extract_entities.return_value = {}
+            collection = FakeCollection()
+            mock_chroma.return_value.get_or_create_collection.return_value = collection
+            config = {"ocr_processor_pipeline": pipeline, "dedup_index": NearDuplicateIndex(),
+                      "manifest_path": os.path.join(temp_dir, "manifest.sqlite3")}
+
+            TextDatasetGenerator(os.path.join(temp_dir, "docs"), config).generate()
+            # One word changed: a near-duplicate of the file's own stored version
+            with open(path, "w") as f:
+                f.write(WORDS.replace("word150 ", "edited150 "))
+            counts = TextDatasetGenerator(os.path.join(temp_dir, "docs"), config).generate()
+            self.assertEqual(counts, {"processed": 1, "skipped": 0, "duplicate": 0, "error": 0})
+            self.assertEqual([text for text, _ in collection.rows.values()], [WORDS.replace("word150 ", "edited150 ")])
+
+            # A second file with near-identical text is still a duplicate of the stored one
+            with open(os.path.join(temp_dir, "docs", "memo", "b.png"), "w") as f:
+                f.write(WORDS.replace("word150 ", "other150 "))
+            counts = TextDatasetGenerator(os.path.join(temp_dir, "docs"), config).generate()
+            self.assertEqual(counts, {"processed": 0, "skipped": 1, "duplicate": 1, "error": 0})
+
+            # b.png points at a.png's document, but a.png still owns it and may be edited again
+            with open(path, "w") as f:
+                f.write(WORDS.replace("word150 ", "again150 "))
+            counts = TextDatasetGenerator(os.path.join(temp_dir, "docs"), config).generate()
+            self.assertEqual(counts, {"processed": 1, "skipped": 1, "duplicate": 0, "error": 0})
+            # The old document stays for b.png
+            self.assertEqual(len(collection.rows), 2)
+
+    @patch("ml_pipeline.dataset.generator.EntityExtractor")
+    @patch("ml_pipeline.dataset.generator.chromadb.PersistentClient")
+    def test_version_bump_reprocesses_with_dedup(self, mock_chroma, mock_extractor):
+        import os
+        import tempfile
+        from ml_pipeline.ocr.base import OCRResult
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "docs")
+            os.makedirs(os.path.join(input_dir, "memo"))
+            for name in ("a.png", "b.png"):
+                with open(os.path.join(input_dir, "memo", name), "w") as f:
+                    f.write(WORDS.replace("word0 ", f"{name} "))
+            pipeline = self._pipeline()
+            ocr_changes = {}
+            pipeline.process_file.side_effect = lambda p: OCRResult(
+                text=open(p).read().replace(*ocr_changes.get("v2", ("", ""))), confidence=0.9, metadata={})
+            mock_extractor.return_value.extract_entities.return_value = {}
+            collection = FakeCollection()
+            mock_chroma.return_value.get_or_create_collection.return_value = collection
+            config = {"ocr_processor_pipeline": pipeline, "dedup_index": NearDuplicateIndex(), "processor_version": "v1",
+                      "manifest_path": os.path.join(temp_dir, "manifest.sqlite3")}
+            # The two files are near-duplicates: only one is stored
+            counts = TextDatasetGenerator(input_dir, config).generate()
+            self.assertEqual(counts, {"processed": 1, "skipped": 0, "duplicate": 1, "error": 0})
+            stored = dict(collection.rows)
+
+            # The new version reads the same files slightly differently
+            ocr_changes["v2"] = ("word299", "changed299")
+            config["processor_version"] = "v2"
+            counts = TextDatasetGenerator(input_dir, config).generate()
+            self.assertEqual(counts, {"processed": 1, "skipped": 0, "duplicate": 1, "error": 0})
+            self.assertEqual(len(collection.rows), 1)
+            self.assertNotEqual(collection.rows, stored)
+            self.assertTrue(all("changed299" in text for text, _ in collection.rows.values()))
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
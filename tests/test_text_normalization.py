@@ -0,0 +1,56 @@
+import unittest
+from ml_pipeline.dataset.utils import clean_text, renormalize_documents
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = dict(documents)
+        self.updates = []
+
+    def get(self, ids=None, include=None):
+        ids = list(self.documents) if ids is None else ids
+        return {"ids": ids, "documents": [self.documents[i] for i in ids], "metadatas": [{"class": "memo"} for _ in ids]}
+
+    def update(self, ids, documents):
+        self.updates.append(list(ids))
+        self.documents.update(zip(ids, documents))
+
+class FakeChunkIndex:
+    def __init__(self):
+        self.indexed = []
+
+    def index(self, parent_id, text, metadata):
+        self.indexed.append((parent_id, text, metadata["class"]))
+
+class TestCleanText(unittest.TestCase):
+    def test_ascii(self):
+        self.assertEqual(clean_text("  Hello,   WORLD!  This is a test.\n\n"), "hello, world! this is a test.")
+        self.assertEqual(clean_text("Total: $1,000.00\tDue\r\n2023-01-01"), "total 1,000.00 due 20230101")
+
+    def test_removed_characters_do_not_leave_double_spaces(self):
+        self.assertEqual(clean_text("a - b"), "a b")
+
+    def test_unicode(self):
+        self.assertEqual(clean_text("Café Müller\x0cﬁnal RÉSUMÉ — naïve"), "cafe muller final resume naive")
+        self.assertEqual(clean_text("日本語 テキスト"), "日本語 テキスト")
+
+    def test_idempotent(self):
+        text = "INVOICE № 42\nCafé  total: €1.234,50!"
+        self.assertEqual(clean_text(clean_text(text)), clean_text(text))
+
+class TestRenormalizeDocuments(unittest.TestCase):
+    def test_updates_only_changed_documents_and_rebuilds_chunks(self):
+        collection = FakeCollection({"a": "already clean.", "b": "Needs  Cleaning!", "c": "café"})
+        chunk_index = FakeChunkIndex()
+        counts = renormalize_documents(collection, chunk_index=chunk_index, batch_size=2)
+        self.assertEqual(counts, {"documents": 3, "changed": 2})
+        self.assertEqual(collection.documents, {"a": "already clean.", "b": "needs cleaning!", "c": "cafe"})
+        self.assertEqual(collection.updates, [["b"], ["c"]])
+        self.assertEqual(chunk_index.indexed, [("b", "needs cleaning!", "memo"), ("c", "cafe", "memo")])
+
+    def test_dry_run(self):
+        collection = FakeCollection({"a": "Dirty  Text"})
+        self.assertEqual(renormalize_documents(collection, dry_run=True), {"documents": 1, "changed": 1})
+        self.assertEqual(collection.updates, [])
+
+if __name__ == "__main__":
+    unittest.main()
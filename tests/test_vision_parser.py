@@ -0,0 +1,65 @@
+import json
+import unittest
+from google.cloud import vision
+from google.protobuf import json_format
+from ml_pipeline.ocr.vision_parser import parse_text_annotation
+from benchmarks.fakes import vision_annotation
+from benchmarks.vision_parse import FIXTURE, load_fixture
+
+def to_proto(annotation):
+    """Parse a Vision REST JSON fullTextAnnotation into the raw protobuf, as `response._pb.full_text_annotation`."""
+    response = json_format.Parse(json.dumps({"fullTextAnnotation": annotation}), vision.AnnotateImageResponse.pb()())
+    return response.full_text_annotation
+
+class TestVisionParser(unittest.TestCase):
+    def setUp(self):
+        annotation = vision_annotation("Invoice Number: INV-1\nTotal: $10.00\n\nThank you", lines_per_block=2)
+        annotation["pages"][0]["blocks"].append({"blockType": "PICTURE", "paragraphs": []})
+        self.annotation = to_proto(annotation)
+
+    def test_blocks_and_confidence(self):
+        parsed = parse_text_annotation(self.annotation)
+        self.assertEqual([b.text for b in parsed.blocks], ["Invoice Number: INV-1 Total: $10.00", "Thank you"])
+        self.assertEqual({b.block_type for b in parsed.blocks}, {"text"})
+        self.assertAlmostEqual(parsed.confidence, 0.97, places=5)
+        self.assertEqual(parsed.page_count, 1)
+        self.assertEqual(parsed.detected_languages, ["en"])
+        box = parsed.blocks[0].bounding_box
+        self.assertEqual((box.x, box.y, box.height), (40.0, 40.0, 54.0))
+
+    def test_line_and_word_boxes(self):
+        parsed = parse_text_annotation(self.annotation, ("line", "word"))
+        lines = [b for b in parsed.blocks if b.block_type == "line"]
+        words = [b for b in parsed.blocks if b.block_type == "word"]
+        self.assertEqual([line.text for line in lines], ["Invoice Number: INV-1", "Total: $10.00", "Thank you"])
+        self.assertEqual(len(words), 7)
+        self.assertEqual((words[1].text, words[1].bounding_box.x), ("Number:", 136.0))
+        self.assertEqual(lines[1].bounding_box.y, 70.0)
+        self.assertEqual(lines[1].bounding_box.width, words[4].bounding_box.x + words[4].bounding_box.width - 40)
+
+    def test_hyphen_break_ends_line(self):
+        annotation = vision_annotation("pre- paid\nTotal", lines_per_block=2)
+        first_word = annotation["pages"][0]["blocks"][0]["paragraphs"][0]["words"][0]
+        first_word["symbols"][-1]["property"] = {"detectedBreak": {"type": "HYPHEN"}}
+        parsed = parse_text_annotation(to_proto(annotation), ("line",))
+        self.assertEqual([b.text for b in parsed.blocks], ["pre-", "paid", "Total"])
+
+    def test_recorded_fixture_lines(self):
+        annotation = load_fixture(FIXTURE).full_text_annotation
+        parsed = parse_text_annotation(annotation, ("block", "line", "word"))
+        self.assertEqual(len([b for b in parsed.blocks if b.block_type == "text"]), 3)
+        self.assertEqual(len([b for b in parsed.blocks if b.block_type == "line"]), 150)
+
+    def test_block_without_word_confidences(self):
+        annotation = vision_annotation("a b")
+        for word in annotation["pages"][0]["blocks"][0]["paragraphs"][0]["words"]:
+            del word["confidence"]
+        parsed = parse_text_annotation(to_proto(annotation))
+        self.assertEqual(parsed.confidence, 0.0)
+
+    def test_unknown_level(self):
+        with self.assertRaises(ValueError):
+            parse_text_annotation(self.annotation, ("paragraph",))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from ml_pipeline.dataset.watcher import Debouncer, IngestMetrics, InotifyWatcher, PollingWatcher, WatchIngestor
+
+def write(path, data=b"data"):
+    with open(path, "wb") as f:
+        f.write(data)
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = self.temp_dir.name
+        os.makedirs(os.path.join(self.root, "invoice"))
+
+    def test_polling_watcher_reports_new_and_modified_files(self):
+        path = os.path.join(self.root, "invoice", "a.png")
+        write(path)
+        watcher = PollingWatcher(self.root, interval=0.01)
+        self.assertEqual(watcher.poll(timeout=0.1), [])
+        new_path = os.path.join(self.root, "invoice", "b.png")
+        write(new_path)
+        write(path, b"more data")
+        self.assertEqual(sorted(watcher.poll(timeout=0.1)), [path, new_path])
+
+    @unittest.skipUnless(hasattr(os, "O_CLOEXEC") and os.path.exists("/proc/sys/fs/inotify"), "inotify not available")
+    def test_inotify_watcher_follows_new_class_folders(self):
+        watcher = InotifyWatcher(self.root)
+        self.addCleanup(watcher.close)
+        write(os.path.join(self.root, "invoice", "a.png"))
+        os.makedirs(os.path.join(self.root, "memo"))
+        changed = set(watcher.poll(timeout=1.0))
+        write(os.path.join(self.root, "memo", "b.png"))
+        changed.update(watcher.poll(timeout=1.0))
+        self.assertEqual(changed, {os.path.join(self.root, "invoice", "a.png"), os.path.join(self.root, "memo", "b.png")})
+
+    def test_debouncer_waits_for_stable_files(self):
+        path = os.path.join(self.root, "invoice", "a.png")
+        write(path)
+        debouncer = Debouncer(quiet_seconds=1.0)
+        debouncer.touch(path, now=0.0)
+        self.assertEqual(debouncer.ready(now=0.5), [])
+        write(path, b"still writing")
+        self.assertEqual(debouncer.ready(now=1.0), [])
+        self.assertEqual(debouncer.ready(now=2.0), [path])
+        self.assertEqual(len(debouncer), 0)
+
+    def test_ingestor_processes_initial_and_new_files(self):
+        first = os.path.join(self.root, "invoice", "a.png")
+        write(first)
+        processed = []
+        done = threading.Event()
+
+        def process(path):
+            processed.append(path)
+            if len(processed) == 2:
+                done.set()
+            return "processed"
+
+        ingestor = WatchIngestor(PollingWatcher(self.root, interval=0.02), process, workers=2,
+                                 queue_size=1, debounce_seconds=0.05, metrics=IngestMetrics())
+        thread = threading.Thread(target=ingestor.run, kwargs={"initial_paths": [first]})
+        thread.start()
+        time.sleep(0.1)
+        second = os.path.join(self.root, "invoice", "b.png")
+        write(second)
+        self.assertTrue(done.wait(timeout=5))
+        ingestor.stop()
+        thread.join(timeout=5)
+        self.assertEqual(sorted(processed), [first, second])
+        snapshot = ingestor.metrics.snapshot()
+        self.assertEqual(snapshot["outcomes"], {"processed": 2})
+        self.assertIsNotNone(snapshot["ingest_lag_seconds"]["p50"])
+
+    def test_stop_with_a_full_queue_releases_the_pending_path(self):
+        ingestor = WatchIngestor(PollingWatcher(self.root), lambda path: "processed", workers=1, queue_size=1)
+        ingestor._enqueue(["a.png"], measure_lag=False, now=0.0)
+        threading.Timer(0.1, ingestor.stop).start()
+        ingestor._enqueue(["b.png", "c.png"], measure_lag=False, now=0.0)
+        self.assertEqual(ingestor._in_flight, {"a.png"})
+
+if __name__ == "__main__":
+    unittest.main()